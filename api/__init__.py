@@ -0,0 +1,5 @@
+from .analytics import PriceAnalytics
+from .cache import CachedFile
+from .catalog import Catalog, CatalogCache
+
+__all__ = [CachedFile, Catalog, CatalogCache, PriceAnalytics]
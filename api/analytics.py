@@ -0,0 +1,280 @@
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from game_store import GameStore
+from .game_fields import price_info, release_value
+
+import numpy as np
+
+
+# Начальный размер колонок, при заполнении они увеличиваются вдвое
+INITIAL_CAPACITY = 1024
+
+# Платформы кодируются битами маски, неизвестные получают следующие свободные биты
+KNOWN_PLATFORMS = ["PS4", "PS5", "PS VR", "PS VR2", "PS3", "PS Vita"]
+
+
+class PriceAnalytics:
+    def __init__(self, store: GameStore) -> None:
+        """
+        Колоночное представление цен игр для аналитических запросов.
+
+        Для каждой игры хранится строка в массивах NumPy: базовая цена и цена со
+        скидкой (basePriceValue, discountedValue основного предложения), процент
+        скидки, битовая маска платформ, дата выхода (YYYYMMDD) и код издателя.
+        Запросы выполняются векторно по всем строкам сразу. При изменении
+        хранилища догружаются только игры, измененные с прошлой загрузки (по seq).
+
+        Аргументы:
+        - store (GameStore): Хранилище игр.
+
+        Методы:
+        - refresh(): Догружает игры, измененные с прошлой загрузки.
+        - top_discounts(...): Игры с наибольшей скидкой, подходящие под фильтры.
+        - publishers(...): Средняя скидка и цена по издателям.
+        - platforms(): Сводка цен и скидок по платформам.
+        """
+
+        self.store = store
+        self.__lock = Lock()
+        self.__seq = 0
+
+        self.size = 0
+        self.rows: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self.names: List[Optional[str]] = []
+        self.publisher_names: List[str] = []
+        self.publisher_codes: Dict[str, int] = {}
+        self.platform_bits: Dict[str, int] = {name: 1 << bit for bit, name in enumerate(KNOWN_PLATFORMS)}
+
+        self.base = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self.value = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self.priced = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        self.discount = np.zeros(INITIAL_CAPACITY, dtype=np.float32)
+        self.platform_mask = np.zeros(INITIAL_CAPACITY, dtype=np.uint64)
+        self.release = np.zeros(INITIAL_CAPACITY, dtype=np.int32)
+        self.publisher = np.full(INITIAL_CAPACITY, -1, dtype=np.int32)
+
+    def __grow(self) -> None:
+        for name in ("base", "value", "priced", "discount", "platform_mask", "release", "publisher"):
+            column = getattr(self, name)
+            grown = np.full(len(column) * 2, -1 if name == "publisher" else 0, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def __platforms(self, names: List[str]) -> int:
+        mask = 0
+        for name in names:
+            bit = self.platform_bits.get(name)
+            if bit is None:
+                if len(self.platform_bits) >= 64:
+                    continue
+                bit = self.platform_bits[name] = 1 << len(self.platform_bits)
+            mask |= bit
+        return mask
+
+    def __publisher(self, name: Optional[str]) -> int:
+        if not name:
+            return -1
+        code = self.publisher_codes.get(name)
+        if code is None:
+            code = self.publisher_codes[name] = len(self.publisher_names)
+            self.publisher_names.append(name)
+        return code
+
+    def __set(self, game_id: str, game: Dict[str, Any]) -> None:
+        row = self.rows.get(game_id)
+        if row is None:
+            if self.size == len(self.base):
+                self.__grow()
+            row = self.rows[game_id] = self.size
+            self.size += 1
+            self.ids.append(game_id)
+            self.names.append(None)
+
+        title = game.get("title") or {}
+        info = game.get("info") or {}
+        price = price_info(game)
+
+        base = price.get("basePriceValue") if price else None
+        value = price.get("discountedValue") if price else None
+        if value is None:
+            value = base
+
+        self.names[row] = title.get("name")
+        self.priced[row] = base is not None and value is not None
+        self.base[row] = base or 0
+        self.value[row] = value or 0
+        self.discount[row] = 100 * (base - value) / base if base and value is not None else 0
+        self.platform_mask[row] = self.__platforms(title.get("platforms") or info.get("platforms") or [])
+        self.release[row] = release_value(title.get("release") or info.get("release")) or 0
+        self.publisher[row] = self.__publisher(title.get("publisher") or info.get("publisher"))
+
+    def refresh(self) -> None:
+        """Догружает игры, измененные в хранилище с прошлой загрузки."""
+
+        with self.__lock:
+            if self.store.last_seq() <= self.__seq:
+                return
+            for seq, game_id, game in self.store.changed_since(self.__seq):
+                self.__set(game_id, game)
+                self.__seq = seq
+
+    def __mask(
+        self,
+        platform: Optional[str] = None,
+        price_min: Optional[int] = None,
+        price_max: Optional[int] = None,
+        released_after: Optional[int] = None,
+        publisher: Optional[str] = None,
+    ) -> np.ndarray:
+        """Маска строк с ценой, подходящих под фильтры."""
+
+        n = self.size
+        mask = self.priced[:n].copy()
+        if platform is not None:
+            bit = self.platform_bits.get(platform)
+            if bit is None:
+                return np.zeros(n, dtype=bool)
+            mask &= (self.platform_mask[:n] & np.uint64(bit)) != 0
+        if price_min is not None:
+            mask &= self.value[:n] >= price_min
+        if price_max is not None:
+            mask &= self.value[:n] <= price_max
+        if released_after is not None:
+            mask &= self.release[:n] >= released_after
+        if publisher is not None:
+            code = self.publisher_codes.get(publisher)
+            if code is None:
+                return np.zeros(n, dtype=bool)
+            mask &= self.publisher[:n] == code
+        return mask
+
+    def __row(self, row: int) -> Dict[str, Any]:
+        code = int(self.publisher[row])
+        return {
+            "id": self.ids[row],
+            "name": self.names[row],
+            "publisher": self.publisher_names[code] if code >= 0 else None,
+            "base_price": int(self.base[row]),
+            "price": int(self.value[row]),
+            "discount": round(float(self.discount[row]), 1),
+        }
+
+    def top_discounts(
+        self,
+        platform: Optional[str] = None,
+        price_min: Optional[int] = None,
+        price_max: Optional[int] = None,
+        released_after: Optional[int] = None,
+        publisher: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Возвращает игры с наибольшей скидкой, например топ-100 скидок на PS5 дешевле $20:
+        top_discounts(platform="PS5", price_max=2000).
+
+        Аргументы:
+        - platform (str): Платформа игры.
+        - price_min, price_max (int): Диапазон цены со скидкой в минимальных единицах валюты.
+        - released_after (int): Дата выхода не раньше, в виде YYYYMMDD.
+        - publisher (str): Издатель.
+        - limit (int): Количество игр.
+
+        Возвращает:
+        - List[Dict[str, Any]]: Игры по убыванию скидки, при равенстве - по возрастанию цены.
+        """
+
+        self.refresh()
+        with self.__lock:
+            rows = np.flatnonzero(
+                self.__mask(platform, price_min, price_max, released_after, publisher)
+                & (self.discount[:self.size] > 0)
+            )
+            if len(rows) > limit:
+                # Частичная сортировка: только кандидаты в первые limit
+                rows = rows[np.argpartition(-self.discount[rows], limit - 1)[:limit]]
+            rows = rows[np.lexsort((self.value[rows], -self.discount[rows]))]
+            return [self.__row(row) for row in rows]
+
+    def publishers(
+        self,
+        platform: Optional[str] = None,
+        min_games: int = 1,
+        sort: str = "discount",
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Возвращает по издателям количество игр с ценой, долю игр со скидкой,
+        среднюю скидку и среднюю цену.
+
+        Аргументы:
+        - platform (str): Учитывать только игры платформы.
+        - min_games (int): Минимальное количество игр издателя.
+        - sort (str): Поле сортировки по убыванию: discount, games или price.
+        - limit (int): Количество издателей.
+
+        Возвращает:
+        - List[Dict[str, Any]]: Издатели по убыванию поля sort.
+
+        Raises:
+            ValueError: Если поле сортировки недопустимо.
+        """
+
+        if sort not in ("discount", "games", "price"):
+            raise ValueError(f"Unknown sort key: {sort}.")
+
+        self.refresh()
+        with self.__lock:
+            rows = np.flatnonzero(self.__mask(platform) & (self.publisher[:self.size] >= 0))
+            codes = self.publisher[rows]
+            size = len(self.publisher_names)
+
+            games = np.bincount(codes, minlength=size)
+            on_sale = np.bincount(codes, weights=self.discount[rows] > 0, minlength=size)
+            discount = np.bincount(codes, weights=self.discount[rows], minlength=size)
+            price = np.bincount(codes, weights=self.value[rows], minlength=size)
+
+            selected = np.flatnonzero(games >= max(min_games, 1))
+            averages = {
+                "discount": discount[selected] / games[selected],
+                "games": games[selected],
+                "price": price[selected] / games[selected],
+            }
+            order = selected[np.argsort(-averages[sort], kind="stable")][:limit]
+
+            return [
+                {
+                    "publisher": self.publisher_names[code],
+                    "games": int(games[code]),
+                    "on_sale": int(on_sale[code]),
+                    "avg_discount": round(float(discount[code] / games[code]), 1),
+                    "avg_price": round(float(price[code] / games[code])),
+                }
+                for code in order
+            ]
+
+    def platforms(self) -> List[Dict[str, Any]]:
+        """Возвращает по платформам количество игр с ценой и со скидкой, среднюю и медианную цену и скидку."""
+
+        self.refresh()
+        with self.__lock:
+            n = self.size
+            result = []
+            for name, bit in self.platform_bits.items():
+                rows = self.priced[:n] & ((self.platform_mask[:n] & np.uint64(bit)) != 0)
+                count = int(rows.sum())
+                if not count:
+                    continue
+                values = self.value[:n][rows]
+                discounts = self.discount[:n][rows]
+                result.append({
+                    "platform": name,
+                    "games": count,
+                    "on_sale": int((discounts > 0).sum()),
+                    "avg_price": round(float(values.mean())),
+                    "median_price": round(float(np.median(values))),
+                    "avg_discount": round(float(discounts.mean()), 1),
+                })
+
+            return result
@@ -0,0 +1,345 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+import brotli
+import hashlib
+import orjson
+import os
+import zlib
+
+
+# Форматы выдачи списков: JSON-массив и NDJSON (объект на строку)
+MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+# Размер части ответа до сжатия: части режутся по границам элементов
+CHUNK_SIZE = 64 * 1024
+
+# Сжатие выполняется один раз на версию файла, поэтому уровни выше, чем при сжатии на лету.
+# Brotli 11 сжимает еще на 15%, но полный список сжимается им секунды
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+# Сколько вариантов ответа (поля, формат, сжатие) хранится для одной версии файла
+# помимо стандартных, которые строятся при загрузке версии
+MAX_VARIANTS = 32
+
+# Поля элементов списков ссылок в порядке выдачи
+LINK_FIELDS = ("id", "name", "url", "image")
+
+# Поля, которые нужны плитке игры во фронтенде
+TILE_FIELDS = ("id", "name", "image")
+
+# Варианты ответа, которые кодируются и сжимаются сразу при загрузке версии файла
+STANDARD_VARIANTS = tuple(
+    (fields, "json", encoding)
+    for fields in (None, TILE_FIELDS)
+    for encoding in ("identity", "gzip", "br")
+)
+
+
+def project(items: Iterable[Dict[str, Any]], fields: Optional[Tuple[str, ...]]) -> List[Dict[str, Any]]:
+    """Оставляет в элементах только поля fields (отсутствующие поля пропускаются)."""
+
+    if not fields:
+        return list(items)
+    return [{name: item[name] for name in fields if name in item} for item in items]
+
+
+def parse_fields(fields: Optional[str], known: Tuple[str, ...] = LINK_FIELDS) -> Optional[Tuple[str, ...]]:
+    """
+    Список полей из параметра вида id,name,image.
+
+    Поля проверяются по списку known и упорядочиваются как в нем, поэтому
+    одинаковые наборы полей в разном порядке дают один вариант ответа.
+    Набор из всех полей равен ответу без проекции (None).
+
+    Аргументы:
+    - fields (str, опционально): Значение параметра fields.
+    - known (Tuple[str, ...]): Допустимые поля в порядке выдачи.
+
+    Возвращает:
+    - Tuple[str, ...] или None: Поля элементов или None, если нужны все поля.
+
+    Raises:
+        ValueError: Если указано неизвестное поле.
+    """
+
+    if not fields:
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = names.difference(known)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}.")
+    if not names or names == set(known):
+        return None
+    return tuple(name for name in known if name in names)
+
+
+def accepted_encoding(accept_encoding: Optional[str]) -> str:
+    """Выбирает сжатие ответа по заголовку Accept-Encoding: br, gzip или identity."""
+
+    weights = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    for encoding in ("br", "gzip"):
+        if weights.get(encoding, weights.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def _chunks(items: List[Dict[str, Any]], fmt: str) -> List[bytes]:
+    """Кодирует элементы в части ответа размером около CHUNK_SIZE по границам элементов."""
+
+    if fmt == "ndjson":
+        start, separator, end = b"", b"\n", b"\n"
+    else:
+        start, separator, end = b"[", b",", b"]"
+
+    chunks = []
+    parts = [start]
+    size = len(start)
+    for index, item in enumerate(items):
+        encoded = orjson.dumps(item)
+        if index:
+            parts.append(separator)
+        parts.append(encoded)
+        size += len(encoded) + 1
+        if size >= CHUNK_SIZE:
+            chunks.append(b"".join(parts))
+            parts, size = [], 0
+    parts.append(end)
+    chunks.append(b"".join(parts))
+
+    return chunks
+
+
+def _compress(chunks: List[bytes], encoding: str) -> List[bytes]:
+    """
+    Сжимает части ответа одним потоком. После каждой части поток сбрасывается,
+    поэтому клиент может распаковать и разобрать часть, не дожидаясь следующих.
+    """
+
+    if encoding == "gzip":
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        compressed = [compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH) for chunk in chunks]
+        compressed[-1] += compressor.flush()
+    elif encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        compressed = [compressor.process(chunk) + compressor.flush() for chunk in chunks]
+        compressed[-1] += compressor.finish()
+    else:
+        return chunks
+
+    return compressed
+
+
+def _build_variant(data: Any, fields: Optional[Tuple[str, ...]], fmt: str, encoding: str) -> List[bytes]:
+    return _compress(_chunks(project(data, fields), fmt), encoding)
+
+
+@dataclass(frozen=True)
+class FileVersion:
+    """
+    Версия JSON-файла: разобранные данные, уже закодированный ответ и его варианты.
+    Стандартные варианты (standard) построены при загрузке, остальные (variants)
+    строятся по запросу и вытесняются по LRU.
+    """
+
+    key: Tuple[int, int, int]
+    data: Any
+    body: bytes
+    etag: str
+    last_modified: str
+    mtime: int
+    standard: Dict[tuple, List[bytes]] = field(default_factory=dict, compare=False, repr=False)
+    variants: "OrderedDict[tuple, List[bytes]]" = field(default_factory=OrderedDict, compare=False, repr=False)
+    building: Dict[tuple, Lock] = field(default_factory=dict, compare=False, repr=False)
+
+
+class CachedFile:
+    def __init__(self, path: Path) -> None:
+        """
+        Кэш JSON-файла в памяти процесса в виде готовых байтов ответа.
+
+        Файл перечитывается, только когда меняются его mtime, inode или размер
+        (например, после обновления ссылок краулером). Ответы содержат ETag и
+        Last-Modified и поддерживают условные запросы с ответом 304.
+
+        Ответ может содержать только часть полей элементов, отдаваться в виде
+        NDJSON и потоком по частям, сжатым gzip или brotli. Каждый вариант
+        кодируется и сжимается один раз на версию файла: полный список и поля
+        плитки (TILE_FIELDS) в JSON со всеми видами сжатия - сразу при загрузке
+        версии, остальные - при первом запросе.
+
+        Аргументы:
+        - path (Path): Путь к JSON-файлу.
+
+        Методы:
+        - load(): Возвращает актуальную версию файла.
+        - variant(version, fields, fmt, encoding): Возвращает части закодированного ответа.
+        - response(request, fields, fmt, stream): Возвращает HTTP-ответ с содержимым файла.
+        """
+
+        self.path = path
+        self.__version: Optional[FileVersion] = None
+        self.__lock = Lock()
+        self.__variants_lock = Lock()
+
+    def load(self) -> FileVersion:
+        stat = os.stat(self.path)
+        key = (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+
+        version = self.__version
+        if version is not None and version.key == key:
+            return version
+
+        # Блокировку ждут только запросы, которым нужна новая версия файла
+        with self.__lock:
+            # Файл мог перечитать другой поток, пока мы ждали блокировку
+            if self.__version is None or self.__version.key != key:
+                data = orjson.loads(self.path.read_bytes())
+                body = orjson.dumps(data)
+                self.__version = FileVersion(
+                    key=key,
+                    data=data,
+                    body=body,
+                    etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+                    last_modified=formatdate(stat.st_mtime, usegmt=True),
+                    mtime=int(stat.st_mtime),
+                    standard={variant: _build_variant(data, *variant) for variant in STANDARD_VARIANTS},
+                )
+            return self.__version
+
+    def variant(
+        self,
+        version: FileVersion,
+        fields: Optional[Tuple[str, ...]] = None,
+        fmt: str = "json",
+        encoding: str = "identity",
+    ) -> List[bytes]:
+        """
+        Возвращает части ответа с полями fields в формате fmt, сжатые encoding.
+
+        Нестандартный вариант строится при первом запросе и хранится, пока не
+        изменится файл. Кодирование и сжатие выполняются вне общей блокировки:
+        построение одного варианта не задерживает запросы других вариантов.
+        """
+
+        if fmt not in MEDIA_TYPES:
+            raise ValueError(f"Unknown format: {fmt}.")
+
+        key = (fields, fmt, encoding)
+        chunks = version.standard.get(key)
+        if chunks is not None:
+            return chunks
+
+        with self.__variants_lock:
+            chunks = version.variants.get(key)
+            if chunks is not None:
+                version.variants.move_to_end(key)
+                return chunks
+            building = version.building.setdefault(key, Lock())
+
+        # Один и тот же вариант строит только один поток, остальные ждут его результата
+        with building:
+            with self.__variants_lock:
+                chunks = version.variants.get(key)
+            if chunks is None:
+                if encoding == "identity":
+                    chunks = _chunks(project(version.data, fields), fmt)
+                else:
+                    chunks = _compress(self.variant(version, fields, fmt, "identity"), encoding)
+
+                with self.__variants_lock:
+                    version.variants[key] = chunks
+                    version.building.pop(key, None)
+                    if len(version.variants) > MAX_VARIANTS:
+                        version.variants.popitem(last=False)
+
+        return chunks
+
+    @staticmethod
+    def not_modified(request: Request, etag: str, mtime: int) -> bool:
+        """Проверяет условные заголовки запроса: If-None-Match, затем If-Modified-Since."""
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                return mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+
+        return False
+
+    def response(
+        self,
+        request: Request,
+        fields: Optional[Tuple[str, ...]] = None,
+        fmt: str = "json",
+        stream: bool = False,
+    ) -> Response:
+        """
+        Возвращает HTTP-ответ с содержимым файла.
+
+        Аргументы:
+        - request (Request): Запрос (условные заголовки и Accept-Encoding).
+        - fields (Tuple[str, ...], опционально): Поля элементов в ответе, по умолчанию все.
+        - fmt (str): Формат ответа: json или ndjson.
+        - stream (bool): Отдавать ответ по частям. NDJSON всегда отдается по частям.
+
+        Возвращает:
+        - Response: Ответ 200 или 304.
+        """
+
+        if fmt not in MEDIA_TYPES:
+            raise ValueError(f"Unknown format: {fmt}.")
+
+        version = self.load()
+        encoding = accepted_encoding(request.headers.get("accept-encoding"))
+
+        etag = version.etag
+        if fields is not None or fmt != "json" or encoding != "identity":
+            # У каждого варианта свой ETag, иначе кэш мог бы отдать ответ с другим сжатием или полями
+            variant_key = f"{version.etag}|{','.join(fields or ())}|{fmt}|{encoding}".encode()
+            etag = f'"{hashlib.blake2b(variant_key, digest_size=16).hexdigest()}"'
+
+        headers = {
+            "ETag": etag,
+            "Last-Modified": version.last_modified,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if self.not_modified(request, etag, version.mtime):
+            return Response(status_code=304, headers=headers)
+
+        chunks = self.variant(version, fields, fmt, encoding)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        if stream or fmt == "ndjson":
+            return StreamingResponse(iter(chunks), media_type=MEDIA_TYPES[fmt], headers=headers)
+        return Response(content=b"".join(chunks), media_type=MEDIA_TYPES[fmt], headers=headers)
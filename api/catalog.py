@@ -0,0 +1,400 @@
+from bisect import bisect_left, bisect_right
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from game_store import GameIds, GameStore
+from .cache import LINK_FIELDS, CachedFile
+from .game_fields import price_info, release_value
+
+import base64
+import json
+import sys
+
+
+# Ключи сортировки каталога и поля, по которым сортируются игры
+SORT_FIELDS = {
+    "name": "name_key",
+    "price": "price",
+    "discount": "discount",
+    "release": "release",
+}
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def game_summary(game: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Поля игры, по которым строятся индексы каталога. Повторяющиеся строки
+    (платформы, жанры, категория, валюта) интернируются, списки хранятся кортежами.
+    """
+
+    title = (game or {}).get("title") or {}
+    info = (game or {}).get("info") or {}
+    price = price_info(game) if game else None
+
+    base = price.get("basePriceValue") if price else None
+    value = price.get("discountedValue") if price else None
+    if value is None:
+        value = base
+    discount = None
+    if base and value is not None:
+        discount = round(100 * (base - value) / base)
+
+    return {
+        "platforms": tuple(map(_intern, title.get("platforms") or info.get("platforms") or ())),
+        "genres": tuple(map(_intern, info.get("genres") or ())),
+        "category": _intern(title.get("category")),
+        "price": value,
+        "currency": _intern(price.get("currencyCode")) if price else None,
+        "discount": discount,
+        "release": release_value(title.get("release") or info.get("release")),
+    }
+
+
+# Поля элементов страницы каталога в порядке выдачи (для параметра fields)
+CATALOG_FIELDS = LINK_FIELDS + tuple(game_summary(None))
+
+
+def edition_summary(game: Dict[str, Any], edition: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Поля индексов для издания игры: цена, платформы, жанры и категория издания,
+    дата выхода - игры (у изданий ее нет).
+    """
+
+    title = game.get("title") or {}
+    info = game.get("info") or {}
+    return game_summary({
+        "title": {
+            **title,
+            "platforms": edition.get("platforms") or title.get("platforms"),
+            "category": edition.get("category") or title.get("category"),
+        },
+        "info": {**info, "genres": edition.get("genres") or info.get("genres")},
+        "price": edition.get("price") or [],
+    })
+
+
+def encode_cursor(sort: str, game_id: str) -> str:
+    raw = json.dumps([sort, game_id], ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    sort, game_id = json.loads(raw)
+    return sort, game_id
+
+
+class Catalog:
+    def __init__(
+        self,
+        links: Dict[str, List[Dict[str, str]]],
+        games: Iterable[Tuple[str, Dict[str, Any]]],
+        aliases: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        Каталог игр с вторичными индексами для фильтрации, сортировки и постраничной выдачи.
+
+        Индексы строятся один раз при загрузке списков ссылок и данных игр,
+        запросы отвечаются из индексов без линейного прохода по каталогу.
+
+        Аргументы:
+        - links (Dict[str, List[Dict[str, str]]]): Списки ссылок по именам ("all", "new", ...).
+        - games (Iterable[Tuple[str, Dict[str, Any]]]): Пары (ID, данные игры) из хранилища.
+        - aliases (Dict[str, str], опционально): Соответствие ID ссылок ключам хранилища
+          (GameIds.aliases()): ссылка на продукт получает данные игры, сохраненной под концепцией.
+
+        Методы:
+        - query(...): Возвращает страницу каталога и курсор следующей страницы.
+        """
+
+        aliases = aliases or {}
+        # Ссылки на продукт, который сохранен как издание другой игры (Deluxe в списке
+        # скидок): у них своя цена и скидка, а не цены основного продукта игры
+        edition_links = {
+            link["id"]
+            for items in links.values()
+            for link in items
+            if aliases.get(link["id"], link["id"]) != link["id"]
+        }
+
+        # Из данных игр остаются только поля для индексов, сами игры в памяти не держатся
+        summaries = {}
+        editions = {}
+        for game_id, game in games:
+            summaries[game_id] = game_summary(game)
+            for edition in game.get("editions") or []:
+                if edition.get("id") in edition_links:
+                    editions[edition["id"]] = edition_summary(game, edition)
+        empty = game_summary(None)
+
+        # Позиция в items - внутренний номер игры во всех индексах
+        self.items: List[Dict[str, Any]] = []
+        self.positions: Dict[str, int] = {}
+
+        self.platforms: Dict[str, Set[int]] = {}
+        self.genres: Dict[str, Set[int]] = {}
+        self.categories: Dict[str, Set[int]] = {}
+        self.lists: Dict[str, Set[int]] = {}
+
+        for list_name, items in links.items():
+            for link in items:
+                position = self.positions.get(link["id"])
+                if position is None:
+                    summary = editions.get(link["id"]) or summaries.get(aliases.get(link["id"], link["id"]), empty)
+                    position = self.__add(link, summary)
+                self.lists.setdefault(list_name, set()).add(position)
+
+        # Отсортированные (значение, позиция) для диапазонных фильтров
+        self.ranges: Dict[str, List[Tuple[int, int]]] = {
+            field: sorted(
+                (item[field], position)
+                for position, item in enumerate(self.items)
+                if item[field] is not None
+            )
+            for field in ("price", "discount", "release")
+        }
+
+        # Ключи сортировки: игры без значения всегда в конце, при равенстве - по ID
+        self.orders: Dict[Tuple[str, bool], List[Tuple]] = {}
+        self.sort_keys: Dict[Tuple[str, bool], List[Tuple]] = {}
+        for sort, field in SORT_FIELDS.items():
+            values = sorted({item[field] for item in self.items if item[field] is not None})
+            rank = {value: index for index, value in enumerate(values)}
+            for descending in (False, True):
+                keys = []
+                for item in self.items:
+                    value = item[field]
+                    if value is None:
+                        keys.append((1, 0, item["id"]))
+                    else:
+                        keys.append((0, -rank[value] if descending else rank[value], item["id"]))
+                self.sort_keys[(sort, descending)] = keys
+                self.orders[(sort, descending)] = sorted(
+                    (key, position) for position, key in enumerate(keys)
+                )
+
+    def __add(self, link: Dict[str, str], summary: Dict[str, Any]) -> int:
+        position = len(self.items)
+        self.positions[link["id"]] = position
+
+        item = {
+            **link,
+            "name_key": link["name"].casefold(),
+            **summary,
+        }
+        self.items.append(item)
+
+        for platform in item["platforms"]:
+            self.platforms.setdefault(platform, set()).add(position)
+        for genre in item["genres"]:
+            self.genres.setdefault(genre.casefold(), set()).add(position)
+        if item["category"]:
+            self.categories.setdefault(item["category"], set()).add(position)
+
+        return position
+
+    def __range(self, field: str, low: Optional[int], high: Optional[int]) -> Tuple[int, int]:
+        """Границы среза отсортированного индекса field для значений в диапазоне [low, high]."""
+
+        values = self.ranges[field]
+        start = 0 if low is None else bisect_left(values, (low, -1))
+        end = len(values) if high is None else bisect_right(values, (high, len(self.items)))
+        return start, end
+
+    def query(
+        self,
+        platforms: Optional[List[str]] = None,
+        genres: Optional[List[str]] = None,
+        category: Optional[str] = None,
+        list_name: Optional[str] = None,
+        price_min: Optional[int] = None,
+        price_max: Optional[int] = None,
+        discount_min: Optional[int] = None,
+        released_after: Optional[int] = None,
+        released_before: Optional[int] = None,
+        sort: str = "name",
+        descending: bool = False,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Возвращает страницу каталога, удовлетворяющую фильтрам.
+
+        Аргументы:
+        - platforms, genres (List[str]): Игра подходит, если есть хотя бы одно совпадение.
+        - category (str): Категория игры (Title.category).
+        - list_name (str): Список ссылок, в котором есть игра ("new", "preorder", "deals").
+        - price_min, price_max (int): Диапазон цены в минимальных единицах валюты.
+        - discount_min (int): Минимальная скидка в процентах.
+        - released_after, released_before (int): Диапазон даты выхода в виде YYYYMMDD.
+        - sort (str): Ключ сортировки: name, price, discount или release.
+        - descending (bool): Сортировка по убыванию.
+        - limit (int): Количество игр на странице.
+        - cursor (str): Курсор, полученный с предыдущей страницы.
+
+        Возвращает:
+        - Dict[str, Any]: {"items": [...], "next_cursor": str или None}.
+
+        Raises:
+            ValueError: Если ключ сортировки или курсор недопустимы.
+        """
+
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Unknown sort key: {sort}.")
+
+        # Условия фильтра: (оценка числа подходящих игр, кандидаты из индекса, проверка игры)
+        conditions: List[Tuple[int, Callable[[], Iterable[int]], Callable[[Dict[str, Any]], bool]]] = []
+        if platforms:
+            sets = [self.platforms.get(item, set()) for item in platforms]
+            wanted = set(platforms)
+            conditions.append((
+                sum(map(len, sets)),
+                lambda sets=sets: set().union(*sets),
+                lambda item, wanted=wanted: not wanted.isdisjoint(item["platforms"]),
+            ))
+        if genres:
+            sets = [self.genres.get(item.casefold(), set()) for item in genres]
+            wanted = {item.casefold() for item in genres}
+            conditions.append((
+                sum(map(len, sets)),
+                lambda sets=sets: set().union(*sets),
+                lambda item, wanted=wanted: any(genre.casefold() in wanted for genre in item["genres"]),
+            ))
+        if category:
+            positions = self.categories.get(category, set())
+            conditions.append((len(positions), lambda positions=positions: positions, lambda item: item["category"] == category))
+        if list_name:
+            positions = self.lists.get(list_name, set())
+            conditions.append((len(positions), lambda positions=positions: positions, lambda item, positions=positions: self.positions[item["id"]] in positions))
+        for field, low, high in (
+            ("price", price_min, price_max),
+            ("discount", discount_min, None),
+            ("release", released_after, released_before),
+        ):
+            if low is None and high is None:
+                continue
+            start, end = self.__range(field, low, high)
+            conditions.append((
+                end - start,
+                lambda field=field, start=start, end=end: (position for _, position in self.ranges[field][start:end]),
+                lambda item, field=field, low=low, high=high: (
+                    item[field] is not None
+                    and (low is None or item[field] >= low)
+                    and (high is None or item[field] <= high)
+                ),
+            ))
+
+        def matches(position: int) -> bool:
+            item = self.items[position]
+            return all(check(item) for _, _, check in conditions)
+
+        keys = self.sort_keys[(sort, descending)]
+        order = self.orders[(sort, descending)]
+        cursor_sort = f"{'-' if descending else ''}{sort}"
+
+        start_key = None
+        if cursor:
+            try:
+                sort_name, game_id = decode_cursor(cursor)
+            except (TypeError, ValueError) as error:
+                raise ValueError("Invalid cursor.") from error
+            if sort_name != cursor_sort or game_id not in self.positions:
+                raise ValueError("Invalid cursor.")
+            start_key = keys[self.positions[game_id]]
+
+        page: List[int] = []
+        smallest = min(conditions, key=lambda condition: condition[0], default=None)
+        if smallest is not None and smallest[0] * 8 < len(self.items):
+            # Самый избирательный индекс дает мало кандидатов: проверяем и сортируем только их
+            candidates = sorted(
+                (keys[position], position)
+                for position in smallest[1]()
+                if matches(position)
+            )
+            start = 0 if start_key is None else bisect_right(candidates, (start_key, len(self.items)))
+            page = [position for _, position in candidates[start:start + limit + 1]]
+        else:
+            # Подходящих игр много: идем по готовому порядку и пропускаем неподходящие
+            start = 0 if start_key is None else bisect_right(order, (start_key, len(self.items)))
+            for index in range(start, len(order)):
+                position = order[index][1]
+                if matches(position):
+                    page.append(position)
+                    if len(page) > limit:
+                        break
+
+        has_next = len(page) > limit
+        page = page[:limit]
+
+        items = []
+        for position in page:
+            item = dict(self.items[position])
+            del item["name_key"]
+            items.append(item)
+
+        return {
+            "items": items,
+            "next_cursor": (
+                encode_cursor(cursor_sort, items[-1]["id"])
+                if has_next
+                else None
+            ),
+        }
+
+
+class CatalogCache:
+    def __init__(
+        self,
+        files: Dict[str, CachedFile],
+        store: GameStore,
+        refresh_interval: float = 30.0,
+        ids: Optional[GameIds] = None,
+    ) -> None:
+        """
+        Каталог, который перестраивается при изменении списков ссылок или хранилища игр.
+
+        Изменения проверяются не чаще раза в refresh_interval секунд, чтобы во время
+        работы краулера каталог не перестраивался на каждый запрос.
+
+        Аргументы:
+        - files (Dict[str, CachedFile]): Списки ссылок по именам ("all", "new", ...).
+        - store (GameStore): Хранилище игр.
+        - refresh_interval (float): Минимальный интервал между проверками в секундах.
+        - ids (GameIds, опционально): Соответствие концепций и продуктов ключам хранилища.
+        """
+
+        self.files = files
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self.ids = ids
+
+        self.__catalog: Optional[Catalog] = None
+        self.__key = None
+        self.__checked = 0.0
+        self.__lock = Lock()
+
+    def get(self) -> Catalog:
+        if self.__catalog is not None and monotonic() - self.__checked < self.refresh_interval:
+            return self.__catalog
+
+        with self.__lock:
+            if self.__catalog is None or monotonic() - self.__checked >= self.refresh_interval:
+                versions = {name: file.load() for name, file in self.files.items()}
+                key = (
+                    tuple(version.key for version in versions.values()),
+                    self.store.data_version(),
+                )
+                if key != self.__key:
+                    self.__catalog = Catalog(
+                        {name: version.data for name, version in versions.items()},
+                        self.store.items(),
+                        self.ids.aliases() if self.ids is not None else None,
+                    )
+                    self.__key = key
+                self.__checked = monotonic()
+
+            return self.__catalog
@@ -0,0 +1,21 @@
+from typing import Any, Dict, Optional
+
+
+def release_value(release: Optional[str]) -> Optional[int]:
+    """Дата выхода в виде числа YYYYMMDD из строки вида 2024-01-01T00:00:00Z."""
+
+    if not release or len(release) < 10:
+        return None
+    try:
+        return int(release[:4] + release[5:7] + release[8:10])
+    except ValueError:
+        return None
+
+
+def price_info(game: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Цена основного предложения игры (первый PriceType1) или None."""
+
+    for price in game.get("price") or []:
+        if price.get("info"):
+            return price["info"]
+    return None
@@ -0,0 +1,76 @@
+"""
+Задержка выдачи страницы каталога в зависимости от размера каталога.
+
+Запуск:
+    python -m benchmarks.bench_catalog --sizes 1000 10000 100000
+
+Каталог генерируется синтетически. Для каждого размера печатается среднее
+время построения индексов и время выдачи страницы для нескольких запросов.
+"""
+
+from api import Catalog
+
+from time import perf_counter
+from typing import Dict, List
+
+import argparse
+import json
+import random
+
+
+QUERIES = {
+    "first_page": {},
+    "platform_sorted_by_price": {"platforms": ["PS5"], "sort": "price"},
+    "deals_under_20": {"list_name": "deals", "price_max": 2000, "discount_min": 30, "sort": "discount", "descending": True},
+    "genre_released_2020s": {"genres": ["Action"], "released_after": 20200101, "sort": "release", "descending": True},
+}
+
+
+def make_catalog(size: int) -> Catalog:
+    rng = random.Random(size)
+    links, games = [], []
+    for index in range(size):
+        game_id = f"UP{index:04d}-PPSA{index:05d}_00-GAME{index:07d}"
+        base = rng.randint(199, 6999)
+        value = base if rng.random() < 0.6 else int(base * rng.uniform(0.2, 0.9))
+        links.append({"id": game_id, "name": f"Game {rng.random():.8f}", "url": "", "image": ""})
+        games.append((game_id, {
+            "title": {"platforms": rng.choice([["PS5"], ["PS4"], ["PS4", "PS5"]]), "category": "GAME", "release": f"20{rng.randint(10, 24)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}"},
+            "info": {"genres": rng.sample(["Action", "Adventure", "Sport", "Puzzle", "Shooter"], 2)},
+            "price": [{"type": "ADD_TO_CART", "info": {"basePriceValue": base, "discountedValue": value, "currencyCode": "USD"}}],
+        }))
+
+    deals = [link for link in links if rng.random() < 0.2]
+    return Catalog({"all": links, "deals": deals}, games)
+
+
+def run(sizes: List[int], limit: int, repeat: int) -> Dict[int, dict]:
+    report = {}
+    for size in sizes:
+        start = perf_counter()
+        catalog = make_catalog(size)
+        build = perf_counter() - start
+
+        timings = {}
+        for name, query in QUERIES.items():
+            # Первая страница и страница, полученная по курсору
+            cursor = catalog.query(limit=limit, **query)["next_cursor"]
+            start = perf_counter()
+            for _ in range(repeat):
+                catalog.query(limit=limit, **query)
+                catalog.query(limit=limit, cursor=cursor, **query)
+            timings[name] = (perf_counter() - start) / (repeat * 2) * 1000
+
+        report[size] = {"build_sec": build, "page_ms": timings}
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Размеры каталога")
+    parser.add_argument("--limit", type=int, default=50, help="Игр на странице")
+    parser.add_argument("--repeat", type=int, default=20, help="Количество повторов запроса")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.sizes, args.limit, args.repeat), indent=2))
@@ -0,0 +1,50 @@
+"""
+Сравнение профилей браузера Fetch на одном наборе ссылок.
+
+Запуск:
+    python -m benchmarks.bench_fetch --urls urls.txt --profiles default scrape
+
+В файле ссылок одна ссылка на строку. Для каждого профиля печатается
+количество страниц в минуту и средний объем полученных по сети данных на страницу
+(encodedDataLength событий Network.loadingFinished, включая сторонние ресурсы).
+"""
+
+from fetch_utils import Fetch, RateLimiter
+
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List
+
+import argparse
+import json
+
+
+def run(urls: List[str], profile: str) -> Dict[str, float]:
+    # Ограничение частоты отключено, чтобы измерять только сам браузер
+    fetch = Fetch(profile=profile, rate_limit=RateLimiter(0, 0), track_transfer=True)
+    fetch.open()
+    try:
+        start = perf_counter()
+        for url in urls:
+            fetch.get(url)
+        elapsed = perf_counter() - start
+    finally:
+        fetch.close()
+
+    transferred = sum(size for _, size in fetch.transfer_sizes)
+    return {
+        "pages": len(urls),
+        "pages_per_minute": len(urls) / elapsed * 60,
+        "bytes_per_page": transferred / len(urls),
+        "mean_ready_sec": sum(item[1] for item in fetch.ready_times) / len(urls),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=Path, required=True, help="Файл со ссылками")
+    parser.add_argument("--profiles", nargs="+", default=["default", "scrape"], help="Профили браузера")
+    args = parser.parse_args()
+
+    urls = [line.strip() for line in args.urls.read_text().splitlines() if line.strip()]
+    print(json.dumps({profile: run(urls, profile) for profile in args.profiles}, indent=2))
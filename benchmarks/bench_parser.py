@@ -0,0 +1,93 @@
+"""
+Сравнение способов разбора страниц: BeautifulSoup (html.parser) и быстрый путь.
+
+Запуск:
+    python -m benchmarks.bench_parser --pages path/to/saved/pages --repeat 5
+
+По умолчанию используются сохраненные страницы из tests/fixtures/pages.
+
+В каталоге должны лежать сохраненные HTML-страницы игр и каталога (*.html).
+Для каждой страницы проверяется, что оба способа дают одинаковый результат.
+"""
+
+from game_info import PSClient
+from game_links import parse_game_tiles
+
+from bs4 import BeautifulSoup
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict, List
+
+import argparse
+import json
+
+
+def parse_detail_soup(html: str) -> dict:
+    return PSClient(BeautifulSoup(html, "html.parser")).data().model_dump(exclude={"info_date"})
+
+
+def parse_detail_fast(html: str) -> dict:
+    return PSClient(html=html).data().model_dump(exclude={"info_date"})
+
+
+def measure(parse: Callable[[str], object], pages: List[str], repeat: int) -> float:
+    """Возвращает лучшее за repeat прогонов время разбора всех страниц в секундах."""
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        for html in pages:
+            parse(html)
+        best = min(best, perf_counter() - start)
+
+    return best
+
+
+def run(pages_dir: Path, repeat: int) -> Dict[str, dict]:
+    detail, browse = [], []
+    for path in sorted(pages_dir.glob("*.html")):
+        html = path.read_text()
+        (detail if "data-mfe-name" in html else browse).append(html)
+
+    cases = {
+        "detail": (detail, parse_detail_soup, parse_detail_fast),
+        "browse": (
+            browse,
+            lambda html: parse_game_tiles(html, "soup"),
+            lambda html: parse_game_tiles(html, "fast"),
+        ),
+    }
+
+    report = {}
+    for name, (pages, soup_parse, fast_parse) in cases.items():
+        if not pages:
+            continue
+
+        for html in pages:
+            if soup_parse(html) != fast_parse(html):
+                raise AssertionError(f"{name}: результаты soup и fast отличаются")
+
+        soup_time = measure(soup_parse, pages, repeat)
+        fast_time = measure(fast_parse, pages, repeat)
+        report[name] = {
+            "pages": len(pages),
+            "soup_ms_per_page": soup_time / len(pages) * 1000,
+            "fast_ms_per_page": fast_time / len(pages) * 1000,
+            "speedup": soup_time / fast_time,
+        }
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--pages",
+        type=Path,
+        default=Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "pages",
+        help="Каталог с сохраненными страницами",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Количество прогонов")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.pages, args.repeat), indent=2))
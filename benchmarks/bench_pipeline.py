@@ -0,0 +1,269 @@
+"""
+Поэтапные замеры разбора страниц: PSClient.data() и извлечение плиток каталога.
+
+Запуск:
+    python -m benchmarks.bench_pipeline --pages path/to/saved/pages --repeat 5 --output bench.json
+    python -m benchmarks.bench_pipeline --pages path/to/saved/pages --compare bench.json
+
+В каталоге должны лежать сохраненные HTML-страницы (*.html): страницы продуктов,
+концептов, страницы старого формата и страницы каталога. Вид страницы
+определяется автоматически.
+
+Для страниц игр замеряются этапы PSClient.data(): поиск script-тегов, декодирование
+JSON, определение product_id, каждый __get_* и валидация модели Game. Для страниц
+каталога - parse_game_tiles каждым способом разбора. Время этапа - лучшее за repeat
+прогонов для каждой страницы. Отдельным прогоном под tracemalloc замеряются пиковая
+память на страницу, количество блоков памяти, живых в конце разбора и оставшихся
+после него, и количество сборок мусора поколения 0 (мера числа выделений объектов).
+
+Результат печатается (или пишется в --output) в JSON. С --compare печатается
+отношение времени и памяти к сохраненному ранее результату (> 1 - стало медленнее).
+"""
+
+from game_info import PSClient
+from game_info.game_model import Game
+from game_links.get_game_links import PARSE_ENGINES, parse_game_tiles
+
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import argparse
+import gc
+import hashlib
+import json
+import logging
+import platform
+import subprocess
+import sys
+import tracemalloc
+
+
+# Методы PSClient, которые вызывает data(), в порядке вызова
+GETTERS = ["image", "title", "price", "content_rating", "addons", "editions", "info"]
+
+
+def page_kind(html: str) -> str:
+    """Вид страницы: browse, product, concept или legacy (данные берутся из HTML старого формата)."""
+
+    if "data-mfe-name" not in html:
+        return "browse"
+
+    client = PSClient(html=html)
+    client.data()
+    if client._PSClient__soup is not None:
+        return "legacy"
+    return client.product_id[0]
+
+
+def detail_stages(html: str) -> Dict[str, float]:
+    """Разбирает страницу игры по этапам PSClient.data() и возвращает время каждого этапа."""
+
+    times = {}
+
+    start = perf_counter()
+    client = PSClient(html=html)
+    # Имени нет на странице, поэтому документ просматривается целиком
+    "" in client.scripts
+    times["script_lookup"] = perf_counter() - start
+
+    start = perf_counter()
+    for data_name in list(client.scripts._ScriptIndex__initial):
+        try:
+            client.scripts.get(data_name)
+        except (KeyError, ValueError):
+            pass
+    times["json_decode"] = perf_counter() - start
+
+    start = perf_counter()
+    client._PSClient__load()
+    times["product_id"] = perf_counter() - start
+
+    fields = {}
+    for name in GETTERS:
+        start = perf_counter()
+        fields[name] = getattr(client, f"_PSClient__get_{name}")()
+        times[f"get_{name}"] = perf_counter() - start
+
+    start = perf_counter()
+    Game(
+        id=client.id,
+        product_id=client.product_id,
+        info_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        **fields,
+    )
+    times["validate"] = perf_counter() - start
+
+    return times
+
+
+def tile_stages(html: str) -> Dict[str, float]:
+    """Время извлечения плиток страницы каталога каждым способом разбора."""
+
+    times = {}
+    for engine in PARSE_ENGINES:
+        start = perf_counter()
+        parse_game_tiles(html, engine)
+        times[f"tiles_{engine}"] = perf_counter() - start
+
+    return times
+
+
+def measure(
+    stages: Callable[[str], Dict[str, float]],
+    pages: List[str],
+    repeat: int,
+    total: bool = True,
+) -> Dict[str, dict]:
+    """
+    Лучшее время каждого этапа на каждой странице, сложенное по страницам.
+    При total добавляется сумма этапов (для этапов одного конвейера).
+    """
+
+    best: List[Dict[str, float]] = [{} for _ in pages]
+    for _ in range(repeat):
+        for page, html in zip(best, pages):
+            for stage, seconds in stages(html).items():
+                page[stage] = min(page.get(stage, float("inf")), seconds)
+
+    report = {}
+    for stage in best[0]:
+        seconds = sum(page[stage] for page in best)
+        report[stage] = {
+            "ms_per_page": seconds / len(pages) * 1000,
+            "pages_per_sec": len(pages) / seconds if seconds else None,
+        }
+
+    if total:
+        seconds = sum(sum(page.values()) for page in best)
+        report["total"] = {
+            "ms_per_page": seconds / len(pages) * 1000,
+            "pages_per_sec": len(pages) / seconds if seconds else None,
+        }
+    return report
+
+
+def memory(parse: Callable[[str], object], pages: List[str]) -> Dict[str, float]:
+    """
+    Память разбора страниц под tracemalloc: пик на страницу, блоки, живые в конце
+    разбора, блоки, оставшиеся после освобождения результата, и сборки мусора.
+    """
+
+    peak = 0
+    retained = 0
+    collections = 0
+    allocated = 0
+    for html in pages:
+        gc.collect()
+        before_blocks = sys.getallocatedblocks()
+        before_gc = gc.get_stats()[0]["collections"]
+
+        tracemalloc.start()
+        result = parse(html)
+        snapshot = tracemalloc.take_snapshot()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+        allocated += sum(stat.count for stat in snapshot.statistics("filename"))
+        collections += gc.get_stats()[0]["collections"] - before_gc
+        del result, snapshot
+        gc.collect()
+        retained += sys.getallocatedblocks() - before_blocks
+
+    return {
+        "peak_kb_per_page": peak / 1024,
+        "live_blocks_per_page": allocated / len(pages),
+        "retained_blocks_per_page": retained / len(pages),
+        "gc_gen0_per_page": collections / len(pages),
+    }
+
+
+def environment(pages: List[Tuple[str, str]]) -> Dict[str, Optional[str]]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    corpus = hashlib.sha256()
+    for name, html in pages:
+        corpus.update(name.encode())
+        corpus.update(hashlib.sha256(html.encode()).digest())
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "corpus": corpus.hexdigest()[:16],
+    }
+
+
+def run(pages_dir: Path, repeat: int) -> dict:
+    pages = [(path.name, path.read_text()) for path in sorted(pages_dir.glob("*.html"))]
+
+    groups: Dict[str, List[str]] = {}
+    for _, html in pages:
+        groups.setdefault(page_kind(html), []).append(html)
+
+    report = {"meta": environment(pages), "kinds": {}}
+    for kind, htmls in sorted(groups.items()):
+        if kind == "browse":
+            stages = measure(tile_stages, htmls, repeat, total=False)
+            mem = {
+                engine: memory(lambda html, engine=engine: parse_game_tiles(html, engine), htmls)
+                for engine in PARSE_ENGINES
+            }
+        else:
+            stages = measure(detail_stages, htmls, repeat)
+            mem = {"data": memory(lambda html: PSClient(html=html).data(), htmls)}
+
+        report["kinds"][kind] = {"pages": len(htmls), "stages": stages, "memory": mem}
+
+    return report
+
+
+def compare(current: dict, baseline: dict) -> Dict[str, Dict[str, float]]:
+    """Отношение метрик текущего результата к сохраненному по каждому виду страниц."""
+
+    ratios = {}
+    for kind, data in current["kinds"].items():
+        base = baseline.get("kinds", {}).get(kind)
+        if base is None:
+            continue
+
+        kind_ratios = {}
+        for stage, values in data["stages"].items():
+            old = base["stages"].get(stage, {}).get("ms_per_page")
+            if old:
+                kind_ratios[f"{stage}.ms_per_page"] = round(values["ms_per_page"] / old, 3)
+        for name, values in data["memory"].items():
+            old = base["memory"].get(name, {}).get("peak_kb_per_page")
+            if old:
+                kind_ratios[f"{name}.peak_kb_per_page"] = round(values["peak_kb_per_page"] / old, 3)
+
+        ratios[kind] = kind_ratios
+
+    return {"baseline": baseline.get("meta"), "current": current["meta"], "ratios": ratios}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=Path, required=True, help="Каталог с сохраненными страницами")
+    parser.add_argument("--repeat", type=int, default=5, help="Количество прогонов")
+    parser.add_argument("--output", type=Path, default=None, help="Файл для записи результата")
+    parser.add_argument("--compare", type=Path, default=None, help="Результат предыдущего запуска для сравнения")
+    args = parser.parse_args()
+
+    # Предупреждения о плитках без картинок повторялись бы на каждом прогоне
+    logging.getLogger("game_links").setLevel(logging.ERROR)
+
+    report = run(args.pages, args.repeat)
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.compare is not None:
+        print(json.dumps(compare(report, json.loads(args.compare.read_text())), indent=2))
+    elif args.output is None:
+        print(json.dumps(report, indent=2))
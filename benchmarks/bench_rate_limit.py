@@ -0,0 +1,191 @@
+"""
+Ограничители частоты запросов против локальной заглушки магазина с ограничением запросов.
+
+Запуск:
+    python -m benchmarks.bench_rate_limit --duration 60 --workers 4 --capacity 8 --mode challenge
+
+Заглушка отдает страницы игр (/en-us/product/N) с div data-mfe-name. Ее пропускная
+способность - capacity запросов в секунду: при перегрузке растет задержка ответа,
+а клиенту, превысившему частоту, отвечают 429 с Retry-After (mode=429) или
+страницей проверки без data-mfe-name (mode=challenge). После нескольких превышений
+подряд клиент блокируется на penalty секунд.
+
+HttpFetch с каждым ограничителем (fixed - интервал 2-3 секунды на воркер, adaptive -
+AdaptiveRateLimiter на всех) загружает страницы duration секунд. Печатается
+количество страниц в час, блокировок и ошибок и итоговая частота ограничителя.
+"""
+
+from fetch_utils import AdaptiveRateLimiter, HttpFetch, RateLimiter
+from fetch_utils.rate_limit import BLOCKED, ERROR, OK
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from threading import Lock, Thread
+from time import monotonic, sleep
+from typing import Callable, Dict
+
+import argparse
+import json
+import logging
+
+
+PAGE = '<html><body><div data-mfe-name="ctaWithPrice" data-initial="cta"></div><script id="cta">{}</script></body></html>'
+CHALLENGE = "<html><body>Checking your browser...</body></html>"
+
+
+class StoreStub:
+    def __init__(self, capacity: float, mode: str, latency: float = 0.05, strikes: int = 5, penalty: float = 10.0) -> None:
+        """
+        Заглушка магазина: ведро токенов на capacity запросов в секунду на сервере.
+        Без токена запрос получает отказ (429 или страницу проверки), после strikes
+        отказов подряд все запросы отклоняются penalty секунд.
+        """
+
+        self.capacity = capacity
+        self.mode = mode
+        self.latency = latency
+        self.strikes = strikes
+        self.penalty = penalty
+
+        self.tokens = capacity
+        self.updated = monotonic()
+        self.rejected = 0
+        self.blocked_until = 0.0
+        self.in_flight = 0
+        self.lock = Lock()
+
+    def admit(self) -> bool:
+        with self.lock:
+            now = monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity)
+            self.updated = now
+
+            if now < self.blocked_until:
+                return False
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.rejected = 0
+                return True
+
+            self.rejected += 1
+            if self.rejected >= self.strikes:
+                self.blocked_until = now + self.penalty
+            return False
+
+    def serve(self, handler: BaseHTTPRequestHandler) -> None:
+        with self.lock:
+            self.in_flight += 1
+            # Задержка растет с количеством одновременных запросов, как у перегруженного сервера
+            delay = self.latency * (1 + self.in_flight / max(self.capacity / 4, 1))
+
+        try:
+            sleep(delay)
+            if self.admit():
+                status, body, headers = 200, PAGE, {}
+            elif self.mode == "429":
+                status, body, headers = 429, "", {"Retry-After": "5"}
+            else:
+                status, body, headers = 200, CHALLENGE, {}
+
+            data = body.encode()
+            handler.send_response(status)
+            for name, value in headers.items():
+                handler.send_header(name, value)
+            handler.send_header("Content-Type", "text/html")
+            handler.send_header("Content-Length", str(len(data)))
+            handler.end_headers()
+            handler.wfile.write(data)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def start_stub(stub: StoreStub) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            stub.serve(self)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(make_limit: Callable[[], RateLimiter], shared: bool, base_url: str, workers: int, duration: float) -> Dict[str, float]:
+    outcomes = {OK: 0, BLOCKED: 0, ERROR: 0}
+    lock = Lock()
+    pages = count()
+    deadline = monotonic() + duration
+    shared_limit = make_limit() if shared else None
+
+    def worker() -> None:
+        limit = shared_limit or make_limit()
+        fetch = HttpFetch(timeout=10.0, rate_limit=limit)
+        fetch.open()
+        try:
+            while monotonic() < deadline:
+                url = f"{base_url}/en-us/product/UP0000-GAME{next(pages):07d}"
+                try:
+                    html = fetch.get(url)
+                    outcome = BLOCKED if "data-mfe-name" not in html else OK
+                except Exception as error:
+                    outcome = BLOCKED if "429" in str(error) else ERROR
+                with lock:
+                    outcomes[outcome] += 1
+        finally:
+            fetch.close()
+
+    threads = [Thread(target=worker) for _ in range(workers)]
+    start = monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = monotonic() - start
+
+    report = {
+        "pages_per_hour": outcomes[OK] / elapsed * 3600,
+        "ok": outcomes[OK],
+        "blocked": outcomes[BLOCKED],
+        "errors": outcomes[ERROR],
+    }
+    if isinstance(shared_limit, AdaptiveRateLimiter):
+        report["final_rate"] = round(shared_limit.rate, 3)
+        report["final_concurrency"] = int(shared_limit.concurrency)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=60.0, help="Длительность прогона каждого ограничителя в секундах")
+    parser.add_argument("--workers", type=int, default=4, help="Количество воркеров")
+    parser.add_argument("--capacity", type=float, default=8.0, help="Пропускная способность заглушки, запросов в секунду")
+    parser.add_argument("--mode", choices=["429", "challenge"], default="challenge", help="Ответ заглушки при превышении частоты")
+    parser.add_argument("--cooldown", type=float, default=5.0, help="Пауза адаптивного ограничителя после блокировки")
+    parser.add_argument("--limiters", nargs="+", default=["fixed", "adaptive"], help="Ограничители для сравнения")
+    args = parser.parse_args()
+
+    # Предупреждения ограничителя об уменьшении частоты повторялись бы при каждой блокировке
+    logging.getLogger("fetch_utils").setLevel(logging.ERROR)
+
+    limiters = {
+        "fixed": (lambda: RateLimiter(2.0, 3.0), False),
+        "adaptive": (lambda: AdaptiveRateLimiter(max_rate=50.0, max_concurrency=args.workers, cooldown=args.cooldown), True),
+    }
+
+    report = {}
+    for name in args.limiters:
+        # Для каждого ограничителя своя заглушка, чтобы блокировка одного не влияла на другой
+        server = start_stub(StoreStub(args.capacity, args.mode))
+        try:
+            make_limit, shared = limiters[name]
+            report[name] = run(make_limit, shared, f"http://127.0.0.1:{server.server_address[1]}", args.workers, args.duration)
+        finally:
+            server.shutdown()
+
+    print(json.dumps(report, indent=2))
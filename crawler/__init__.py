@@ -0,0 +1,5 @@
+from .engine import collapse_links, crawl_games, load_links
+from .replay import check_snapshots
+from .scheduler import RecrawlScheduler, RecrawlTask, load_list_membership
+
+__all__ = [collapse_links, crawl_games, check_snapshots, load_links, RecrawlScheduler, RecrawlTask, load_list_membership]
@@ -0,0 +1,182 @@
+from configs import configure_logging
+from fetch_utils import FetchPool, default_pool, run_pipeline
+from game_info import PSClient
+from game_store import GameIds, GameStore
+from game_store.prices import INFO_DATE_FORMAT
+from metrics import counter
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import logging
+import json
+
+
+log = logging.getLogger(__name__)
+configure_logging()
+
+# Результаты обхода страниц игр (время стадий пишет конвейер run_pipeline)
+CRAWL_PAGES = counter("psgames_crawl_pages_total", "Страницы игр по результату обхода", ("result",))
+
+
+def load_links(paths: Iterable[Path]) -> List[Dict[str, str]]:
+    """
+    Загружает ссылки на игры из файлов *_game_links.json в один список без повторов.
+
+    Аргументы:
+    - paths (Iterable[Path]): Пути к файлам со ссылками.
+
+    Возвращает:
+    - List[Dict[str, str]]: Ссылки на игры в порядке первого появления.
+    """
+
+    links = {}
+    for path in paths:
+        with open(path, "r") as file:
+            for item in json.load(file):
+                links.setdefault(item["id"], item)
+
+    return list(links.values())
+
+
+def collapse_links(links: Iterable[Dict[str, str]], aliases: Dict[str, str]) -> List[Dict[str, str]]:
+    """
+    Объединяет ссылки разных списков на одну игру (концепция и ее продукты) в одну задачу обхода.
+
+    ID каждой ссылки заменяется ключом игры в хранилище по соответствию
+    GameIds.aliases(), поэтому игра загружается один раз за обход и сохраняется
+    под тем же ключом. Из ссылок на одну игру загружается та, чей ID совпадает
+    с ключом (эта страница уже разбиралась), иначе первая. Ссылки на игры,
+    которых еще нет в соответствии, остаются как есть.
+
+    Аргументы:
+    - links (Iterable[Dict[str, str]]): Ссылки на игры.
+    - aliases (Dict[str, str]): Соответствие ID ключам хранилища.
+
+    Возвращает:
+    - List[Dict[str, str]]: Ссылки с ключами хранилища в порядке первого появления игры.
+    """
+
+    chosen: Dict[str, Dict[str, str]] = {}
+    total = 0
+    for item in links:
+        total += 1
+        key = aliases.get(item["id"], item["id"])
+        if key not in chosen or (item["id"] == key and chosen[key]["id"] != key):
+            chosen[key] = item
+
+    collapsed = total - len(chosen)
+    if collapsed:
+        CRAWL_PAGES.labels("collapsed").inc(collapsed)
+        log.info(f"Plan: Ссылок на уже известные игры объединено: {collapsed}, осталось {len(chosen)}.")
+
+    return [dict(item, id=key) for key, item in chosen.items()]
+
+
+def parse_game(html: str) -> Dict[str, Any]:
+    """
+    Парсит HTML страницы игры и возвращает данные игры в виде словаря.
+    Данные парсера выгружаются без повторной валидации pydantic (PSClient.dump).
+    """
+
+    return PSClient(html=html).dump()
+
+
+def crawl_games(
+    links: Iterable[Dict[str, str]],
+    store: GameStore,
+    workers: int = 4,
+    pool: Optional[FetchPool] = None,
+    refresh: bool = False,
+    parsers: int = 0,
+    queue_size: int = 16,
+    ids: Optional[GameIds] = None,
+    fetched_at: Optional[Callable[[str], Optional[float]]] = None,
+) -> Dict[str, int]:
+    """
+    Загружает страницы игр и сохраняет результаты в хранилище через конвейер run_pipeline.
+
+    Каждый поток-загрузчик берет из пула свой объект загрузки (браузер или HTTP-клиент)
+    и забирает ссылки из общей очереди. Страницы разбираются в процессах-парсерах
+    (или в потоках-загрузчиках при parsers=0), запись в хранилище выполняется
+    только в вызывающем потоке.
+
+    С ids игра сохраняется под ключом, с которым уже связана ее концепция или
+    один из продуктов. Так ссылки на одну новую игру из разных списков, которые
+    нельзя было объединить до загрузки, не создают в хранилище дублей.
+
+    С fetched_at (при разборе снимков страниц) info_date игры равна времени
+    загрузки снимка, а не времени разбора: иначе старые цены попали бы в историю
+    цен как текущие, а планировщик повторного обхода счел бы игру только что
+    обойденной. Снимок старше данных игры в хранилище не записывается.
+
+    Аргументы:
+    - links (Iterable[Dict[str, str]]): Ссылки на игры.
+    - store (GameStore): Хранилище игр.
+    - workers (int): Количество параллельных загрузчиков.
+    - pool (FetchPool, опционально): Пул объектов загрузки, по умолчанию общий пул браузеров.
+    - refresh (bool): Загружать заново игры, которые уже есть в хранилище (план RecrawlScheduler).
+    - parsers (int): Количество процессов-парсеров, 0 - разбор в потоках-загрузчиках.
+    - queue_size (int): Сколько загруженных страниц может ждать разбора.
+    - ids (GameIds, опционально): Соответствие концепций и продуктов ключам хранилища.
+    - fetched_at (Callable[[str], Optional[float]], опционально): Время загрузки страницы
+      по URL (секунды Unix), например SnapshotStore.fetched_at.
+
+    Возвращает:
+    - Dict[str, int]: Количество добавленных, обновленных, пропущенных и ошибочных игр.
+    """
+
+    stats = {"added": 0, "updated": 0, "skipped": 0, "errors": 0}
+
+    tasks = []
+    for item in links:
+        stored = (ids.resolve(item["id"]) if ids is not None else None) or item["id"]
+        if stored in store and not refresh:
+            stats["skipped"] += 1
+            CRAWL_PAGES.labels("skipped").inc()
+            continue
+        tasks.append(item)
+
+    def write(item: Dict[str, str], game: Optional[Dict[str, Any]], error: Optional[BaseException]) -> None:
+        if error is not None:
+            stats["errors"] += 1
+            CRAWL_PAGES.labels("error").inc()
+            log.error(f"Error: Игра {item["name"]} не загружена: {error!r}")
+            return
+
+        key = ids.key(item["id"], game) if ids is not None else item["id"]
+        timestamp = fetched_at(item["url"]) if fetched_at is not None else None
+        if timestamp is not None:
+            game["info_date"] = datetime.fromtimestamp(timestamp).strftime(INFO_DATE_FORMAT)
+            stored = store.get(key)
+            if stored is not None and (stored.get("info_date") or "") > game["info_date"]:
+                stats["skipped"] += 1
+                CRAWL_PAGES.labels("skipped").inc()
+                log.info(f"Skip: Снимок игры {item["name"]} старше данных в хранилище.")
+                return
+
+        exists = key in store
+        store.upsert(key, game)
+        if exists:
+            stats["updated"] += 1
+            CRAWL_PAGES.labels("updated").inc()
+            log.info(f"UpdateDB: Игра {item["name"]} обновлена.")
+        else:
+            stats["added"] += 1
+            CRAWL_PAGES.labels("added").inc()
+            log.info(f"AddDB: Игра {item["name"]} добавлена.")
+
+    if tasks:
+        run_pipeline(
+            pool or default_pool(),
+            tasks,
+            url=lambda item: item["url"],
+            parse=parse_game,
+            write=write,
+            fetchers=workers,
+            parsers=parsers,
+            queue_size=queue_size,
+        )
+
+    return stats
@@ -0,0 +1,71 @@
+from configs import configure_logging
+from fetch_utils import SnapshotStore
+from game_store import GameIds, GameStore
+from .engine import parse_game
+
+from typing import Dict, Iterable, Optional
+
+import logging
+import json
+
+
+log = logging.getLogger(__name__)
+configure_logging()
+
+# Поля, добавленные в Game позже: у игр, сохраненных до их появления, их нет, и это не расхождение парсера
+NEW_FIELDS = {"concept_id"}
+
+
+def check_snapshots(
+    links: Iterable[Dict[str, str]],
+    store: GameStore,
+    snapshots: SnapshotStore,
+    ids: Optional[GameIds] = None,
+) -> Dict[str, int]:
+    """
+    Парсит последние снимки страниц игр текущим парсером и сравнивает результат
+    с данными игр в хранилище (без info_date). Снимки служат регрессионными
+    данными: после изменения PSClient расхождения показывают, какие игры и поля
+    парсятся иначе.
+
+    Аргументы:
+    - links (Iterable[Dict[str, str]]): Ссылки на игры.
+    - store (GameStore): Хранилище игр с ожидаемыми данными.
+    - snapshots (SnapshotStore): Хранилище снимков.
+    - ids (GameIds, опционально): Соответствие концепций и продуктов ключам хранилища:
+      ссылка на продукт сравнивается с игрой, сохраненной под ключом концепции.
+
+    Возвращает:
+    - Dict[str, int]: Количество совпавших, отличающихся, ошибочных игр и игр без снимка.
+    """
+
+    stats = {"same": 0, "changed": 0, "errors": 0, "missing": 0}
+
+    for item in links:
+        expected = store.get((ids.resolve(item["id"]) if ids is not None else None) or item["id"])
+        if expected is None or item["url"] not in snapshots:
+            stats["missing"] += 1
+            continue
+
+        try:
+            # Кортежи модели приводятся к спискам, как после сохранения в хранилище
+            game = json.loads(json.dumps(parse_game(snapshots.latest(item["url"])), ensure_ascii=False))
+        except Exception as error:
+            stats["errors"] += 1
+            log.error(f"Check: Игра {item["name"]} не разобрана: {error!r}")
+            continue
+
+        fields = [
+            key
+            for key in game.keys() | expected.keys()
+            if key != "info_date"
+            and not (key in NEW_FIELDS and key not in expected)
+            and game.get(key) != expected.get(key)
+        ]
+        if fields:
+            stats["changed"] += 1
+            log.warning(f"Check: Игра {item["name"]} отличается в полях: {", ".join(sorted(fields))}.")
+        else:
+            stats["same"] += 1
+
+    return stats
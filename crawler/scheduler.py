@@ -0,0 +1,193 @@
+from configs import configure_logging
+from game_store import GameStore, PriceHistory
+from game_store.prices import INFO_DATE_FORMAT
+
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import logging
+import json
+import math
+
+
+log = logging.getLogger(__name__)
+configure_logging()
+
+# Ожидаемое количество изменений страницы в сутки для игр из каждого списка
+LIST_CHANGE_RATES = {
+    "deals": 0.5,
+    "preorder": 0.3,
+    "new": 0.2,
+    "all": 0.02,
+}
+DEFAULT_CHANGE_RATE = LIST_CHANGE_RATES["all"]
+
+# За какой период учитываются изменения цен и какой вес (в сутках наблюдения) у оценки по списку
+VOLATILITY_WINDOW = timedelta(days=90)
+PRIOR_DAYS = 14.0
+
+# Приоритеты, которые идут раньше вероятности изменения (она не больше 1)
+PRIORITY_DISCOUNT_ENDING = 3.0
+PRIORITY_NEW = 2.0
+
+
+@dataclass
+class RecrawlTask:
+    item: Dict[str, str]
+    priority: float
+    reason: str
+    # Окончание скидки (мс Unix), из-за которого игра попала в план
+    end_time: Optional[int] = None
+
+
+def load_list_membership(paths: Iterable[Path], aliases: Optional[Dict[str, str]] = None) -> Dict[str, Set[str]]:
+    """
+    Возвращает списки, в которых состоит каждая игра: {id: {"deals", "all", ...}}.
+    Имя списка берется из имени файла *_game_links.json. С aliases (GameIds.aliases())
+    списки концепции и ее продуктов объединяются под ключом игры в хранилище,
+    как ссылки в collapse_links.
+    """
+
+    aliases = aliases or {}
+    membership: Dict[str, Set[str]] = {}
+    for path in paths:
+        name = path.stem.removesuffix("_game_links")
+        with open(path, "r") as file:
+            for item in json.load(file):
+                membership.setdefault(aliases.get(item["id"], item["id"]), set()).add(name)
+
+    return membership
+
+
+def _end_times(game: Dict[str, Any]) -> List[int]:
+    """Окончания скидок игры и ее изданий в миллисекундах Unix."""
+
+    prices = list(game.get("price") or [])
+    for edition in game.get("editions") or []:
+        prices += edition.get("price") or []
+
+    end_times = []
+    for price in prices:
+        end_time = (price.get("info") or {}).get("endTime") if isinstance(price, dict) else None
+        if end_time and str(end_time).isdigit():
+            end_times.append(int(end_time))
+
+    return end_times
+
+
+class RecrawlScheduler:
+    def __init__(
+        self,
+        store: GameStore,
+        prices: Optional[PriceHistory] = None,
+        min_probability: float = 0.1,
+    ) -> None:
+        """
+        Планировщик повторного обхода страниц игр.
+
+        Для каждой игры оценивается вероятность того, что ее страница изменилась
+        с прошлого обхода: 1 - exp(-rate * age), где age - время с info_date,
+        а rate - ожидаемое количество изменений в сутки. rate складывается из
+        оценки по спискам игры (скидки и предзаказы меняются часто, остальной
+        каталог - редко) и наблюдаемых изменений цены из истории цен.
+
+        Раньше всех идут игры, у которых после прошлого обхода закончилась скидка
+        или закончится до конца обхода (horizon), по времени окончания: их цена
+        меняется наверняка. Затем игры, которых еще нет в хранилище, затем
+        остальные по убыванию вероятности изменения. Игры с вероятностью ниже
+        min_probability не обходятся.
+
+        Аргументы:
+        - store (GameStore): Хранилище игр.
+        - prices (PriceHistory, опционально): История цен для оценки частоты изменений.
+        - min_probability (float): Минимальная вероятность изменения для повторного обхода.
+
+        Методы:
+        - plan(links, membership, budget, now, horizon): Возвращает задачи обхода в порядке приоритета.
+        """
+
+        self.store = store
+        self.prices = prices
+        self.min_probability = min_probability
+
+    def change_rate(self, lists: Set[str], changes: int = 0, observed_days: float = 0.0) -> float:
+        """
+        Ожидаемое количество изменений в сутки: оценка по спискам, уточненная
+        количеством изменений цены за observed_days суток наблюдения.
+        """
+
+        prior = max((LIST_CHANGE_RATES.get(name, DEFAULT_CHANGE_RATE) for name in lists), default=DEFAULT_CHANGE_RATE)
+        return (prior * PRIOR_DAYS + changes) / (PRIOR_DAYS + observed_days)
+
+    def plan(
+        self,
+        links: Iterable[Dict[str, str]],
+        membership: Dict[str, Set[str]],
+        budget: Optional[int] = None,
+        now: Optional[datetime] = None,
+        horizon: Optional[timedelta] = None,
+    ) -> List[RecrawlTask]:
+        """
+        Составляет план обхода.
+
+        Аргументы:
+        - links (Iterable[Dict[str, str]]): Ссылки на игры.
+        - membership (Dict[str, Set[str]]): Списки каждой игры (load_list_membership).
+        - budget (int, опционально): Максимальное количество страниц, по умолчанию без ограничения.
+        - now (datetime, опционально): Текущий момент, по умолчанию datetime.now().
+        - horizon (timedelta, опционально): Длительность обхода: скидки, которые закончатся
+          за это время, тоже идут первыми. По умолчанию только уже закончившиеся.
+
+        Возвращает:
+        - List[RecrawlTask]: Задачи по убыванию приоритета, не больше budget.
+        """
+
+        now = now or datetime.now()
+        now_ms = now.timestamp() * 1000
+        horizon_ms = now_ms + (horizon.total_seconds() * 1000 if horizon else 0.0)
+        stats = self.prices.change_stats(now - VOLATILITY_WINDOW) if self.prices else {}
+
+        tasks = []
+        for item in links:
+            game = self.store.get(item["id"]) if item["id"] in self.store else None
+            if game is None:
+                tasks.append(RecrawlTask(item, PRIORITY_NEW, "new"))
+                continue
+
+            try:
+                crawled = datetime.strptime(game["info_date"], INFO_DATE_FORMAT)
+            except (KeyError, TypeError, ValueError):
+                crawled = datetime.min
+            crawled_ms = crawled.timestamp() * 1000 if crawled > datetime.min else 0.0
+
+            end_time = min((end for end in _end_times(game) if crawled_ms < end <= horizon_ms), default=None)
+            if end_time is not None:
+                reason = "discount_ended" if end_time <= now_ms else "discount_ending"
+                tasks.append(RecrawlTask(item, PRIORITY_DISCOUNT_ENDING, reason, end_time))
+                continue
+
+            age = max((now - crawled).total_seconds() / 86400, 0.0)
+            changes, observed_from = stats.get(item["id"], (0, now))
+            rate = self.change_rate(
+                membership.get(item["id"], set()),
+                changes,
+                max((now - observed_from).total_seconds() / 86400, 0.0),
+            )
+            probability = 1 - math.exp(-rate * age)
+            if probability >= self.min_probability:
+                tasks.append(RecrawlTask(item, probability, "stale"))
+
+        # Скидки - в порядке окончания, остальные задачи с равным приоритетом - в порядке ссылок
+        tasks.sort(key=lambda task: (-task.priority, task.end_time or 0))
+        if budget is not None:
+            tasks = tasks[:budget]
+
+        reasons = Counter(task.reason for task in tasks)
+        log.info(
+            f"Plan: В плане {len(tasks)} страниц: с закончившейся скидкой {reasons["discount_ended"]}, "
+            f"с заканчивающейся {reasons["discount_ending"]}, новых {reasons["new"]}, устаревших {reasons["stale"]}."
+        )
+        return tasks
@@ -0,0 +1,31 @@
+from .base import BaseFetch
+from .browser import Fetch
+from .http_fetch import HttpFetch
+from .pipeline import run_pipeline
+from .pool import FetchPool, default_pool
+from .rate_limit import AdaptiveRateLimiter, RateLimiter
+from .snapshot import ReplayFetch, SnapshotFetch, SnapshotMissing, SnapshotStore
+
+
+# Доступные способы загрузки страниц
+FETCH_BACKENDS = {
+    "browser": Fetch,
+    "http": HttpFetch,
+    "replay": ReplayFetch,
+}
+
+__all__ = [
+    AdaptiveRateLimiter,
+    BaseFetch,
+    Fetch,
+    FetchPool,
+    HttpFetch,
+    RateLimiter,
+    ReplayFetch,
+    SnapshotFetch,
+    SnapshotMissing,
+    SnapshotStore,
+    FETCH_BACKENDS,
+    default_pool,
+    run_pipeline,
+]
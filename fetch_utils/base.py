@@ -0,0 +1,67 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from metrics import counter, gauge, histogram
+
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# Метрики загрузки страниц, общие для всех способов загрузки
+FETCH_SECONDS = histogram(
+    "psgames_fetch_seconds",
+    "Время загрузки страницы без ожидания ограничителя частоты",
+    ("backend", "kind"),
+)
+FETCH_ERRORS = counter("psgames_fetch_errors_total", "Ошибки загрузки страниц", ("backend", "kind"))
+FETCH_IN_FLIGHT = gauge("psgames_fetch_in_flight", "Страницы, которые загружаются прямо сейчас", ("backend",))
+
+
+def page_kind(url: str) -> str:
+    """Определяет тип страницы магазина по ссылке: "detail" или "browse"."""
+
+    return "detail" if "/product/" in url or "/concept/" in url else "browse"
+
+
+def is_blocked_page(url: str, html: str) -> bool:
+    """
+    Проверяет, что вместо страницы игры отдана страница проверки или заглушка:
+    у страницы игры нет JSON-данных (div с data-mfe-name), которые нужны PSClient.
+    """
+
+    return page_kind(url) == "detail" and "data-mfe-name" not in html
+
+
+class BaseFetch(ABC):
+    """
+    Общий интерфейс загрузки страниц магазина.
+
+    Методы:
+    - open(): Подготавливает ресурсы (браузер, HTTP-клиент).
+    - get(url): Возвращает HTML страницы.
+    - close(): Освобождает ресурсы.
+    - alive(): Проверяет, что ресурсы работоспособны (браузер не упал).
+    - memory_usage(): Возвращает занятую память в байтах, если ее можно измерить.
+    """
+
+    def open(self) -> None:
+        pass
+
+    @abstractmethod
+    def get(self, url: str) -> str:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def alive(self) -> bool:
+        return True
+
+    def memory_usage(self) -> Optional[int]:
+        return None
+
+    def __enter__(self) -> "BaseFetch":
+        self.open()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,237 @@
+from collections import deque
+from time import perf_counter
+from typing import Deque, Iterable, Optional, Sequence, Tuple
+
+import json
+import logging
+import psutil
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+
+from metrics import histogram
+
+from .base import BaseFetch, FETCH_ERRORS, FETCH_IN_FLIGHT, FETCH_SECONDS, USER_AGENT, is_blocked_page, page_kind
+from .rate_limit import BLOCKED, ERROR, OK, RateLimiter
+
+
+log = logging.getLogger(__name__)
+
+# Этапы загрузки страницы браузером: переход, ожидание готовности данных и чтение HTML
+BROWSER_STAGE_SECONDS = histogram("psgames_browser_stage_seconds", "Время этапов загрузки страницы браузером", ("stage",))
+
+# Страница игры готова, когда на месте script-теги всех div с data-mfe-name
+DETAIL_READY_JS = """
+const divs = document.querySelectorAll('div[data-mfe-name][data-initial]');
+return divs.length > 0 && Array.from(divs).every((div) => document.getElementById(div.dataset.initial) !== null);
+"""
+
+# Состояние страницы каталога: отрисован ли список плиток и загружен ли документ
+BROWSE_STATE_JS = """
+return [
+    document.querySelector('div#__next > main#main ul li a[data-telemetry-meta]') !== null,
+    document.readyState === 'complete',
+];
+"""
+
+
+# Запросы к хостам магазина, которые блокируются в профиле scrape: картинки, шрифты и медиа
+BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3",
+]
+
+# Хосты магазина (страницы, скрипты и API). В профиле scrape все остальные хосты
+# (трекеры, реклама, виджеты) не резолвятся, какими бы они ни были
+FIRST_PARTY_HOSTS = ("playstation.com", "*.playstation.com", "*.playstation.net")
+
+
+def host_resolver_rules(hosts: Iterable[str]) -> str:
+    """Правило --host-resolver-rules Chrome: не резолвить все хосты, кроме hosts и localhost."""
+
+    return ", ".join(["MAP * ~NOTFOUND", "EXCLUDE localhost", *(f"EXCLUDE {host}" for host in hosts)])
+
+
+def encoded_data_length(entries: Iterable[dict]) -> int:
+    """
+    Байты, полученные по сети, по событиям Network.loadingFinished из performance-лога
+    chromedriver. В отличие от transferSize из Resource Timing, encodedDataLength
+    учитывает и сторонние ресурсы без заголовка Timing-Allow-Origin.
+    """
+
+    total = 0
+    for entry in entries:
+        message = json.loads(entry["message"])["message"]
+        if message.get("method") == "Network.loadingFinished":
+            total += int(message["params"].get("encodedDataLength") or 0)
+    return total
+
+
+class Fetch(BaseFetch):
+    def __init__(
+        self,
+        profile: str = "default",
+        timeout: float = 15.0,
+        empty_grace: float = 2.0,
+        rate_limit: Optional[RateLimiter] = None,
+        first_party_hosts: Sequence[str] = FIRST_PARTY_HOSTS,
+        track_transfer: bool = False,
+    ) -> None:
+        """
+        Загрузка страниц через Chrome.
+
+        Страница возвращается, как только она готова: у страницы игры на месте
+        JSON-данные (script-теги data-mfe-name), у страницы каталога отрисован
+        список плиток. Частота запросов ограничивается отдельно через RateLimiter.
+
+        Профиль "scrape" запускает Chrome в фоне без GPU и расширений, не загружает
+        картинки, шрифты и медиа, не обращается ни к каким хостам, кроме хостов
+        магазина (first_party_hosts), и не прокручивает страницы игр, которым
+        прокрутка не нужна: данные из них читаются из встроенного JSON.
+
+        Аргументы:
+        - profile (str): Профиль браузера: "default" или "scrape".
+        - timeout (float): Максимальное время ожидания готовности страницы в секундах.
+        - empty_grace (float): Сколько ждать плитки на полностью загруженной странице
+          каталога, прежде чем считать ее пустой.
+        - rate_limit (RateLimiter, опционально): Ограничитель частоты запросов,
+          по умолчанию свой с интервалом 2-3 секунды.
+        - first_party_hosts (Sequence[str]): Хосты, доступные в профиле scrape (шаблоны Chrome).
+        - track_transfer (bool): Считать полученные по сети байты страницы (performance-лог
+          chromedriver с событиями Network, для бенчмарков).
+
+        Атрибуты:
+        - ready_times: Последние замеры (url, время до готовности в секундах, готова ли страница).
+        - transfer_sizes: Последние замеры (url, получено байт) при track_transfer.
+        """
+
+        self.profile = profile
+        self.timeout = timeout
+        self.empty_grace = empty_grace
+        self.rate_limit = rate_limit or RateLimiter()
+        self.first_party_hosts = tuple(first_party_hosts)
+        self.track_transfer = track_transfer
+        self.ready_times: Deque[Tuple[str, float, bool]] = deque(maxlen=1000)
+        self.transfer_sizes: Deque[Tuple[str, int]] = deque(maxlen=1000)
+
+    def open(self) -> None:
+        chrome_options = Options()  # Настройки для Chrome
+        # chrome_options.add_argument("--headless")  # Запуск в фоновом режиме
+        chrome_options.add_argument("--disable-blink-features=AutomationControlled")  # Скрыть факт автоматизации
+        chrome_options.add_argument(f"user-agent={USER_AGENT}")
+        chrome_options.add_argument('--ignore-certificate-errors')
+        chrome_options.add_argument('--ignore-ssl-errors')
+
+        if self.profile == "scrape":
+            chrome_options.add_argument("--headless=new")
+            chrome_options.add_argument("--disable-gpu")
+            chrome_options.add_argument("--disable-extensions")
+            chrome_options.add_argument("--mute-audio")
+            chrome_options.add_argument(f"--host-resolver-rules={host_resolver_rules(self.first_party_hosts)}")
+            chrome_options.add_experimental_option(
+                "prefs",
+                {
+                    "profile.managed_default_content_settings.images": 2,
+                    "profile.managed_default_content_settings.media_stream": 2,
+                },
+            )
+
+        if self.track_transfer:
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+            chrome_options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+
+        self.browser = webdriver.Chrome(options=chrome_options)
+
+        if self.profile == "scrape":
+            # Картинки, шрифты и медиа с хостов магазина блокируются на уровне сети через DevTools
+            self.browser.execute_cdp_cmd("Network.enable", {})
+            self.browser.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+
+    def __wait_ready(self, url: str, start: float) -> bool:
+        kind = page_kind(url)
+
+        def ready(driver) -> bool:
+            if kind == "detail":
+                return driver.execute_script(DETAIL_READY_JS)
+
+            has_tiles, complete = driver.execute_script(BROWSE_STATE_JS)
+            # Пустая страница (за последней) плиток не получит никогда
+            return has_tiles or (complete and perf_counter() - start > self.empty_grace)
+
+        try:
+            WebDriverWait(self.browser, self.timeout, poll_frequency=0.1).until(ready)
+        except TimeoutException:
+            return False
+        return True
+
+    def get(self, url: str) -> str:
+        self.rate_limit.wait()
+
+        kind = page_kind(url)
+        outcome = ERROR
+        with FETCH_IN_FLIGHT.labels("browser").track():
+            start = perf_counter()
+            try:
+                html = self.__load(url, start)
+                outcome = BLOCKED if is_blocked_page(url, html) else OK
+            except Exception:
+                FETCH_ERRORS.labels("browser", kind).inc()
+                raise
+            finally:
+                elapsed = perf_counter() - start
+                FETCH_SECONDS.labels("browser", kind).observe(elapsed)
+                self.rate_limit.done(elapsed, outcome)
+
+        return html
+
+    def __load(self, url: str, start: float) -> str:
+        if self.track_transfer:
+            # События прошлой страницы, пришедшие после ее замера, не относятся к этой
+            self.browser.get_log("performance")
+
+        self.browser.get(url)
+        navigated = perf_counter()
+        BROWSER_STAGE_SECONDS.labels("navigate").observe(navigated - start)
+
+        is_ready = self.__wait_ready(url, start)
+        elapsed = perf_counter() - start
+        BROWSER_STAGE_SECONDS.labels("ready").observe(elapsed - (navigated - start))
+
+        self.ready_times.append((url, elapsed, is_ready))
+        if is_ready:
+            log.debug(f"Ready: {url} {elapsed:.3f}sec")
+        else:
+            log.warning(f"Timeout: {url} не готова за {self.timeout:.0f}sec")
+
+        if self.track_transfer:
+            self.transfer_sizes.append((url, encoded_data_length(self.browser.get_log("performance"))))
+
+        # Картинки плиток каталога подгружаются при прокрутке, страницам игр она не нужна
+        if self.profile != "scrape" or page_kind(url) == "browse":
+            self.browser.execute_script(f"window.scrollTo(0, document.body.scrollHeight);")
+
+        html = self.browser.page_source
+        BROWSER_STAGE_SECONDS.labels("source").observe(perf_counter() - start - elapsed)
+        return html
+
+    def close(self) -> None:
+        self.browser.quit()
+
+    def alive(self) -> bool:
+        try:
+            self.browser.current_url
+        except WebDriverException:
+            return False
+        return True
+
+    def memory_usage(self) -> Optional[int]:
+        # Память chromedriver и всех процессов Chrome, запущенных им
+        try:
+            process = psutil.Process(self.browser.service.process.pid)
+            processes = [process, *process.children(recursive=True)]
+            return sum(item.memory_info().rss for item in processes)
+        except (AttributeError, psutil.Error):
+            return None
@@ -0,0 +1,102 @@
+from time import perf_counter
+from typing import Optional
+
+import httpx
+import logging
+
+from .base import BaseFetch, FETCH_ERRORS, FETCH_IN_FLIGHT, FETCH_SECONDS, USER_AGENT, is_blocked_page, page_kind
+from .rate_limit import BLOCKED, ERROR, OK, RateLimiter
+
+# Ответы, которыми магазин ограничивает частоту запросов
+BLOCKED_STATUSES = {403, 429}
+
+
+# httpx пишет в INFO каждый запрос
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+class HttpFetch(BaseFetch):
+    def __init__(
+        self,
+        http2: bool = False,
+        timeout: float = 30.0,
+        max_connections: int = 10,
+        rate_limit: Optional[RateLimiter] = None,
+    ) -> None:
+        """
+        Загрузка страниц без браузера через HTTP-клиент с пулом keep-alive соединений.
+
+        Страницы магазина отдают JSON-данные игр (script-теги с data-mfe-name) уже
+        в первом ответе сервера, поэтому для их парсинга браузер не нужен.
+
+        Аргументы:
+        - http2 (bool): Использовать HTTP/2.
+        - timeout (float): Таймаут запроса в секундах.
+        - max_connections (int): Максимальное количество соединений в пуле.
+        - rate_limit (RateLimiter, опционально): Ограничитель частоты запросов.
+        """
+
+        self.http2 = http2
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.rate_limit = rate_limit
+        self.client: Optional[httpx.Client] = None
+
+    def open(self) -> None:
+        self.client = httpx.Client(
+            http2=self.http2,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            headers={
+                "User-Agent": USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml",
+                "Accept-Language": "en-US,en;q=0.9",
+            },
+        )
+
+    @staticmethod
+    def outcome(url: str, response: Optional[httpx.Response]) -> str:
+        """Исход запроса для ограничителя: ok, error (нет ответа, 5xx) или blocked."""
+
+        if response is None or response.status_code >= 500:
+            return ERROR
+        if response.status_code in BLOCKED_STATUSES:
+            return BLOCKED
+        if response.is_success and is_blocked_page(url, response.text):
+            return BLOCKED
+        return OK
+
+    def get(self, url: str) -> str:
+        if self.rate_limit is not None:
+            self.rate_limit.wait()
+
+        kind = page_kind(url)
+        response = None
+        with FETCH_IN_FLIGHT.labels("http").track():
+            start = perf_counter()
+            try:
+                response = self.client.get(url)
+                response.raise_for_status()
+                return response.text
+            except Exception:
+                FETCH_ERRORS.labels("http", kind).inc()
+                raise
+            finally:
+                elapsed = perf_counter() - start
+                FETCH_SECONDS.labels("http", kind).observe(elapsed)
+                if self.rate_limit is not None:
+                    retry_after = response.headers.get("retry-after") if response is not None else None
+                    self.rate_limit.done(
+                        elapsed,
+                        self.outcome(url, response),
+                        float(retry_after) if retry_after and retry_after.isdigit() else None,
+                    )
+
+    def close(self) -> None:
+        if self.client is not None:
+            self.client.close()
+            self.client = None
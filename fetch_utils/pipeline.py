@@ -0,0 +1,244 @@
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from queue import Queue
+from threading import Event, Lock, Semaphore, Thread
+from time import perf_counter
+from typing import Any, Callable, Iterable, Optional, Tuple, TypeVar
+
+import logging
+import multiprocessing
+
+from metrics import REGISTRY, gauge, histogram
+
+from .base import BaseFetch
+from .pool import FetchPool
+
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Маркер завершения работы стадии в очередях конвейера
+DONE = object()
+
+# Стадии конвейера: загрузка, разбор (время в процессе-парсере) и запись
+PIPELINE_STAGE_SECONDS = histogram("psgames_pipeline_stage_seconds", "Время стадий конвейера загрузки и разбора", ("stage",))
+PIPELINE_QUEUED = gauge("psgames_pipeline_queued_pages", "Загруженные страницы, ожидающие разбора")
+PIPELINE_IN_FLIGHT = gauge("psgames_pipeline_in_flight", "Страницы в работе на каждой стадии", ("stage",))
+
+
+def _timed_parse(parse: Callable[[str], Any], html: str) -> Tuple[Any, float]:
+    """Разбирает страницу в процессе-парсере и возвращает результат и время разбора."""
+
+    start = perf_counter()
+    result = parse(html)
+    return result, perf_counter() - start
+
+
+def _parse_in_child(parse: Callable[[str], Any], html: str) -> Tuple[Any, float, list]:
+    """
+    Разбирает страницу в процессе-парсере. Вместе с результатом возвращаются метрики,
+    записанные при разборе (время этапов PSClient, декодирования JSON и т.д.):
+    реестр процесса-парсера родителю не виден.
+    """
+
+    return (*_timed_parse(parse, html), REGISTRY.drain())
+
+
+def _make_executor(parsers: int) -> Executor:
+    """
+    Пул процессов-парсеров. Процессы создаются fork (где он есть) сразу, до запуска
+    потоков конвейера: так дочерние процессы не наследуют блокировки занятых потоков,
+    а главный модуль не импортируется в них повторно, как при spawn. Значения
+    метрик, унаследованные от родителя при fork, в дочернем процессе сбрасываются,
+    чтобы не учесть их дважды.
+    """
+
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    executor = ProcessPoolExecutor(max_workers=parsers, mp_context=context, initializer=REGISTRY.drain)
+    executor.submit(int).result()
+    return executor
+
+
+def run_pipeline(
+    pool: FetchPool,
+    items: Iterable[T],
+    url: Callable[[T], str],
+    parse: Callable[[str], Any],
+    write: Callable[[T, Any, Optional[BaseException]], None],
+    fetchers: int = 4,
+    parsers: int = 0,
+    queue_size: int = 16,
+) -> None:
+    """
+    Конвейер загрузки и разбора страниц: загрузчики, парсеры и один писатель.
+
+    Потоки-загрузчики берут объекты загрузки из пула и кладут HTML страниц в
+    ограниченную очередь. Диспетчер передает страницы в пул процессов-парсеров,
+    не больше parsers одновременно. Когда парсеры не успевают, очередь
+    заполняется и загрузчики ждут (обратное давление), поэтому в памяти не больше
+    queue_size + parsers страниц. Результаты (и ошибки загрузки и разбора)
+    передаются в write в вызывающем потоке, это единственный писатель.
+
+    При parsers=0 страницы разбираются в потоках-загрузчиках без процессов.
+    Функция parse должна быть доступна по имени модуля (сериализуется pickle).
+
+    Если загрузчик не получил объект загрузки из пула, задачи забирают остальные
+    загрузчики. Если не получил ни один, все необработанные задачи передаются в
+    write с ошибкой пула, чтобы они не пропали молча.
+
+    Если write выбросил исключение, загрузчики останавливаются после текущих
+    страниц. Уже загруженные страницы разбираются и записываются (чтобы работа
+    не пропала), после чего первое исключение пробрасывается. При прерывании
+    самого писателя (KeyboardInterrupt) загрузчики тоже останавливаются после
+    текущих страниц, диспетчер больше не передает страницы парсерам, а уже
+    переданные, но еще не начатые разборы отменяются.
+
+    Аргументы:
+    - pool (FetchPool): Пул объектов загрузки страниц.
+    - items (Iterable[T]): Задачи (ссылки на игры, номера страниц).
+    - url (Callable[[T], str]): Возвращает URL страницы задачи.
+    - parse (Callable[[str], Any]): Разбирает HTML страницы.
+    - write (Callable[[T, Any, Optional[BaseException]], None]): Записывает результат
+      (задача, результат разбора, ошибка).
+    - fetchers (int): Количество потоков-загрузчиков.
+    - parsers (int): Количество процессов-парсеров.
+    - queue_size (int): Размер очереди загруженных, но еще не разобранных страниц.
+    """
+
+    tasks = Queue()
+    for item in items:
+        tasks.put(item)
+    if tasks.empty():
+        return
+
+    fetchers = max(1, min(fetchers, pool.size, tasks.qsize()))
+    for _ in range(fetchers):
+        tasks.put(DONE)
+
+    pages = Queue(maxsize=max(queue_size, 1))
+    results = Queue()
+    # stop останавливает загрузчиков, cancel (прерывание писателя) - еще и разбор
+    stop = Event()
+    cancel = Event()
+    executor = _make_executor(parsers) if parsers else None
+
+    # Загрузчики, которые еще работают, и ошибки получения объектов загрузки из пула
+    alive = [fetchers]
+    alive_lock = Lock()
+    pool_errors = []
+
+    def fetch_page(fetch: BaseFetch, item: T) -> None:
+        with PIPELINE_IN_FLIGHT.labels("fetch").track(), PIPELINE_STAGE_SECONDS.labels("fetch").time():
+            html = fetch.get(url(item))
+
+        if executor is None:
+            with PIPELINE_IN_FLIGHT.labels("parse").track():
+                result, seconds = _timed_parse(parse, html)
+            PIPELINE_STAGE_SECONDS.labels("parse").observe(seconds)
+            results.put((item, result, None))
+        else:
+            pages.put((item, html))
+            PIPELINE_QUEUED.set(pages.qsize())
+
+    def fetcher() -> None:
+        try:
+            with pool.fetch() as fetch:
+                while True:
+                    item = tasks.get()
+                    if item is DONE or stop.is_set():
+                        break
+                    try:
+                        fetch_page(fetch, item)
+                    except Exception as error:
+                        results.put((item, None, error))
+        except Exception as error:
+            pool_errors.append(error)
+            log.error(f"Worker: Загрузчик остановлен с ошибкой: {error!r}")
+        finally:
+            with alive_lock:
+                alive[0] -= 1
+                last = not alive[0]
+            # Задачи остаются в очереди, только если ни один загрузчик не смог работать
+            if last and not stop.is_set():
+                while not tasks.empty():
+                    item = tasks.get_nowait()
+                    if item is not DONE:
+                        results.put((item, None, pool_errors[-1] if pool_errors else RuntimeError("No fetcher is running.")))
+            (pages if executor is not None else results).put(DONE)
+
+    def dispatcher() -> None:
+        # Не больше parsers страниц одновременно в пуле процессов, остальные ждут в очереди pages
+        slots = Semaphore(parsers)
+
+        def parsed(item: T, future: Future) -> None:
+            try:
+                result, seconds, metrics = future.result()
+                REGISTRY.merge(metrics)
+                PIPELINE_STAGE_SECONDS.labels("parse").observe(seconds)
+                results.put((item, result, None))
+            except Exception as error:
+                results.put((item, None, error))
+            finally:
+                PIPELINE_IN_FLIGHT.labels("parse").dec()
+                slots.release()
+
+        running = fetchers
+        while running:
+            page = pages.get()
+            PIPELINE_QUEUED.set(pages.qsize())
+            if page is DONE:
+                running -= 1
+                continue
+            if cancel.is_set():
+                # Результаты уже никто не запишет: загруженные страницы не разбираются
+                continue
+            item, html = page
+            slots.acquire()
+            PIPELINE_IN_FLIGHT.labels("parse").inc()
+            try:
+                future = executor.submit(_parse_in_child, parse, html)
+            except Exception as error:
+                PIPELINE_IN_FLIGHT.labels("parse").dec()
+                slots.release()
+                results.put((item, None, error))
+                continue
+            future.add_done_callback(lambda future, item=item: parsed(item, future))
+
+        # Все результаты отданы, когда освобождены все слоты
+        for _ in range(parsers):
+            slots.acquire()
+        results.put(DONE)
+
+    threads = [Thread(target=fetcher, daemon=True) for _ in range(fetchers)]
+    if executor is not None:
+        threads.append(Thread(target=dispatcher, daemon=True))
+    for thread in threads:
+        thread.start()
+
+    # Единственный писатель: сохраняет результаты по мере их поступления
+    failure = None
+    running = 1 if executor is not None else fetchers
+    try:
+        while running:
+            result = results.get()
+            if result is DONE:
+                running -= 1
+                continue
+
+            try:
+                with PIPELINE_STAGE_SECONDS.labels("write").time():
+                    write(*result)
+            except BaseException as error:
+                failure = failure or error
+                stop.set()
+    finally:
+        # Без этого при прерывании писателя загрузчики обошли бы всю очередь задач впустую
+        stop.set()
+        cancel.set()
+        for thread in threads:
+            thread.join()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    if failure is not None:
+        raise failure
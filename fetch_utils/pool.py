@@ -0,0 +1,182 @@
+from contextlib import contextmanager
+from threading import Condition, Lock
+from typing import Callable, Iterator, List, Optional
+
+import atexit
+import logging
+
+from .base import BaseFetch
+from .browser import Fetch
+
+
+log = logging.getLogger(__name__)
+
+
+class PooledFetch(BaseFetch):
+    def __init__(self, factory: Callable[[], BaseFetch], max_pages: int, max_memory: Optional[int]) -> None:
+        """
+        Объект загрузки из пула: перезапускает свой браузер после max_pages страниц,
+        при росте памяти больше max_memory байт и после падения браузера.
+        """
+
+        self.factory = factory
+        self.max_pages = max_pages
+        self.max_memory = max_memory
+        self.inner: Optional[BaseFetch] = None
+        self.pages = 0
+
+    def open(self) -> None:
+        self.inner = self.factory()
+        self.inner.open()
+        self.pages = 0
+
+    def restart(self, reason: str) -> None:
+        log.info(f"Pool: Перезапуск {type(self.inner).__name__}: {reason}.")
+        try:
+            self.inner.close()
+        except Exception as error:
+            log.warning(f"Pool: Ошибка при закрытии: {error!r}")
+        self.open()
+
+    def __recycle(self) -> None:
+        if self.pages >= self.max_pages:
+            self.restart(f"загружено {self.pages} страниц")
+        elif self.max_memory is not None and self.pages and self.pages % 10 == 0:
+            memory = self.inner.memory_usage()
+            if memory is not None and memory > self.max_memory:
+                self.restart(f"память {memory // 2**20} МБ")
+
+    def get(self, url: str) -> str:
+        self.__recycle()
+        self.pages += 1
+        try:
+            return self.inner.get(url)
+        except Exception:
+            # Упавший браузер перезапускается, и страница загружается еще раз
+            if self.inner.alive():
+                raise
+            self.restart("браузер не отвечает")
+            self.pages += 1
+            return self.inner.get(url)
+
+    def memory_usage(self) -> Optional[int]:
+        return self.inner.memory_usage()
+
+    def close(self) -> None:
+        if self.inner is not None:
+            self.inner.close()
+            self.inner = None
+
+
+class FetchPool:
+    def __init__(
+        self,
+        factory: Callable[[], BaseFetch] = Fetch,
+        size: int = 4,
+        max_pages: int = 500,
+        max_memory: Optional[int] = 1536 * 2**20,
+    ) -> None:
+        """
+        Пул прогретых объектов загрузки страниц (браузеров или HTTP-клиентов).
+
+        Объекты создаются лениво, возвращаются в пул после использования и
+        переиспользуются следующими обходами, поэтому браузер запускается один раз
+        на процесс, а не на каждый обход.
+
+        Аргументы:
+        - factory (Callable[[], BaseFetch]): Фабрика объектов загрузки.
+        - size (int): Максимальное количество одновременно выданных объектов.
+        - max_pages (int): Количество страниц, после которого браузер перезапускается.
+        - max_memory (int, опционально): Порог памяти браузера в байтах для перезапуска.
+
+        Методы:
+        - fetch(): Контекстный менеджер, выдающий объект загрузки из пула.
+        - close(): Закрывает все объекты пула.
+        """
+
+        self.factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self.max_memory = max_memory
+
+        self.__idle: List[PooledFetch] = []
+        self.__created = 0
+        self.__closed = False
+        self.__condition = Condition(Lock())
+
+    @contextmanager
+    def fetch(self) -> Iterator[BaseFetch]:
+        """
+        Выдает открытый объект загрузки из пула и возвращает его обратно после использования.
+        Если все объекты заняты, ожидает освобождения.
+        """
+
+        fetch = self.__acquire()
+        try:
+            yield fetch
+        finally:
+            self.__release(fetch)
+
+    def __acquire(self) -> PooledFetch:
+        with self.__condition:
+            while True:
+                if self.__closed:
+                    raise RuntimeError("FetchPool is closed.")
+                if self.__idle:
+                    return self.__idle.pop()
+                if self.__created < self.size:
+                    self.__created += 1
+                    break
+                self.__condition.wait()
+
+        # Браузер запускается вне блокировки, чтобы не задерживать остальные потоки
+        fetch = PooledFetch(self.factory, self.max_pages, self.max_memory)
+        try:
+            fetch.open()
+        except Exception:
+            with self.__condition:
+                self.__created -= 1
+                self.__condition.notify()
+            raise
+
+        return fetch
+
+    def __release(self, fetch: PooledFetch) -> None:
+        with self.__condition:
+            if self.__closed:
+                fetch.close()
+                return
+            self.__idle.append(fetch)
+            self.__condition.notify()
+
+    def __enter__(self) -> "FetchPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self.__condition:
+            self.__closed = True
+            idle, self.__idle = self.__idle, []
+            self.__condition.notify_all()
+
+        for fetch in idle:
+            fetch.close()
+
+
+_default_pool: Optional[FetchPool] = None
+_default_lock = Lock()
+
+
+def default_pool() -> FetchPool:
+    """
+    Возвращает общий для процесса пул браузеров. Пул закрывается при завершении процесса.
+    """
+
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = FetchPool()
+            atexit.register(_default_pool.close)
+        return _default_pool
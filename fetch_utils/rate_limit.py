@@ -0,0 +1,209 @@
+from threading import Condition, Lock
+from time import monotonic, sleep
+from typing import Optional
+
+import logging
+import random
+
+from metrics import counter, gauge, histogram
+
+
+log = logging.getLogger(__name__)
+
+# Время, которое запросы проводят в ожидании ограничителя (паузы между запросами)
+RATE_LIMIT_WAIT_SECONDS = histogram("psgames_rate_limit_wait_seconds", "Ожидание ограничителя частоты запросов")
+RATE_LIMIT_OUTCOMES = counter("psgames_rate_limit_outcomes_total", "Исходы запросов, которые видит ограничитель", ("outcome",))
+RATE_LIMIT_RATE = gauge("psgames_rate_limit_rate", "Текущая допустимая частота запросов в секунду")
+RATE_LIMIT_CONCURRENCY = gauge("psgames_rate_limit_concurrency", "Текущий предел одновременных запросов")
+
+# Исходы запроса для RateLimiter.done()
+OK = "ok"
+ERROR = "error"
+BLOCKED = "blocked"
+
+
+class RateLimiter:
+    def __init__(self, min_interval: float = 2.0, max_interval: float = 3.0) -> None:
+        """
+        Ограничитель частоты запросов к магазину.
+
+        Между началами соседних запросов выдерживается случайный интервал от
+        min_interval до max_interval секунд. Один ограничитель можно передать
+        нескольким объектам загрузки, тогда интервал соблюдается для всех вместе.
+
+        Аргументы:
+        - min_interval (float): Минимальный интервал между запросами в секундах.
+        - max_interval (float): Максимальный интервал между запросами в секундах.
+        """
+
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.__next = 0.0
+        self.__lock = Lock()
+
+    def wait(self) -> None:
+        """Ожидает, пока не наступит время следующего запроса, и резервирует его."""
+
+        with self.__lock:
+            now = monotonic()
+            start = max(now, self.__next)
+            self.__next = start + random.uniform(self.min_interval, self.max_interval)
+
+        RATE_LIMIT_WAIT_SECONDS.observe(max(start - now, 0.0))
+        if start > now:
+            sleep(start - now)
+
+    def done(self, latency: float, outcome: str = OK, retry_after: Optional[float] = None) -> None:
+        """
+        Сообщает о завершении запроса, начатого после wait(). Фиксированный
+        интервал от исхода не зависит, метод нужен для совместимости с AdaptiveRateLimiter.
+        """
+
+        RATE_LIMIT_OUTCOMES.labels(outcome).inc()
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    def __init__(
+        self,
+        rate: float = 0.4,
+        min_rate: float = 0.05,
+        max_rate: float = 5.0,
+        concurrency: float = 1.0,
+        max_concurrency: int = 8,
+        rate_increase: float = 0.05,
+        slow_start: float = 1.0,
+        backoff: float = 0.5,
+        latency_factor: float = 3.0,
+        error_threshold: float = 0.2,
+        cooldown: float = 30.0,
+        jitter: float = 0.2,
+    ) -> None:
+        """
+        Общий ограничитель запросов к магазину, который подстраивает частоту и
+        количество одновременных запросов под ответы магазина (AIMD).
+
+        Частота задается ведром токенов: запрос начинается, когда есть токен и
+        свободное место среди concurrency одновременных запросов. После каждого
+        запроса сообщается его исход (done):
+        - Успешный быстрый ответ: до первого уменьшения (медленный старт, как в TCP)
+          частота удваивается каждые slow_start секунд, но не больше чем вдвое
+          за ответ. После уменьшения - аддитивно, на rate_increase за каждые rate
+          успешных запросов (примерно за секунду). Предел одновременных запросов
+          растет на 1 за concurrency ответов.
+        - Блокировка (429/403 или страница игры без data-mfe-name, то есть
+          страница проверки): частота и предел умножаются на backoff, запросы
+          приостанавливаются на cooldown секунд (или Retry-After).
+        - Доля ошибок (таймауты, 5xx) выше error_threshold или задержка выше
+          latency_factor минимальной наблюдаемой: частота и предел умножаются
+          на sqrt(backoff), магазин начинает не справляться.
+        Уменьшение выполняется не чаще раза за время ответа, чтобы пачка
+        одновременно упавших запросов не обрушила частоту до минимума.
+
+        Аргументы:
+        - rate (float): Начальная частота запросов в секунду (0.4 - как интервал 2-3 секунды).
+        - min_rate, max_rate (float): Границы частоты запросов в секунду.
+        - concurrency (float): Начальный предел одновременных запросов.
+        - max_concurrency (int): Максимальный предел одновременных запросов.
+        - rate_increase (float): Аддитивное увеличение частоты (запросов в секунду) примерно за секунду.
+        - slow_start (float): Время удвоения частоты при медленном старте в секундах.
+        - backoff (float): Множитель уменьшения при блокировке.
+        - latency_factor (float): Во сколько раз задержка может превышать минимальную.
+        - error_threshold (float): Допустимая доля ошибок (скользящее среднее).
+        - cooldown (float): Пауза после блокировки в секундах.
+        - jitter (float): Случайное отклонение интервала между запросами (доля интервала).
+
+        Методы:
+        - wait(): Ожидает токен и место среди одновременных запросов.
+        - done(latency, outcome, retry_after): Освобождает место и учитывает исход запроса.
+        """
+
+        super().__init__()
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+        self.concurrency = concurrency
+        self.max_concurrency = max_concurrency
+        self.rate_increase = rate_increase
+        self.slow_start = slow_start
+        # Частота, после которой медленный старт сменяется аддитивным ростом
+        self.threshold = max_rate
+        self.backoff = backoff
+        self.latency_factor = latency_factor
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self.jitter = jitter
+
+        self.in_flight = 0
+        self.min_latency: Optional[float] = None
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.__next = 0.0
+        self.__paused_until = 0.0
+        self.__last_decrease = 0.0
+        self.__condition = Condition(Lock())
+        self.__publish()
+
+    def __publish(self) -> None:
+        RATE_LIMIT_RATE.set(self.rate)
+        RATE_LIMIT_CONCURRENCY.set(self.concurrency)
+
+    def wait(self) -> None:
+        """Ожидает место среди одновременных запросов и токен и резервирует их."""
+
+        requested = monotonic()
+        with self.__condition:
+            while self.in_flight >= max(1, int(self.concurrency)):
+                self.__condition.wait()
+            self.in_flight += 1
+
+            now = monotonic()
+            interval = 1 / self.rate
+            start = max(now, self.__next, self.__paused_until)
+            self.__next = start + interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+        RATE_LIMIT_WAIT_SECONDS.observe(start - requested)
+        if start > now:
+            sleep(start - now)
+
+    def __decrease(self, factor: float, now: float, reason: str) -> bool:
+        # Ответы запросов, начатых до прошлого уменьшения, уже учтены им
+        if now - self.__last_decrease < max(self.latency, 1.0):
+            return False
+
+        self.__last_decrease = now
+        self.threshold = max(self.min_rate, self.rate * factor)
+        self.rate = max(self.min_rate, self.rate * factor)
+        self.concurrency = max(1.0, self.concurrency * factor)
+        log.warning(f"RateLimit: {reason}, частота {self.rate:.2f}/сек, одновременно {int(self.concurrency)}.")
+        return True
+
+    def done(self, latency: float, outcome: str = OK, retry_after: Optional[float] = None) -> None:
+        RATE_LIMIT_OUTCOMES.labels(outcome).inc()
+
+        with self.__condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            now = monotonic()
+
+            self.error_rate = 0.9 * self.error_rate + 0.1 * (outcome != OK)
+            if outcome == OK:
+                self.latency = latency if not self.latency else 0.8 * self.latency + 0.2 * latency
+                self.min_latency = latency if self.min_latency is None else min(self.min_latency, latency)
+
+            if outcome == BLOCKED:
+                # Пауза продлевается каждой блокировкой, даже если частота уже уменьшена
+                pause = retry_after if retry_after is not None else self.cooldown
+                self.__paused_until = max(self.__paused_until, now + pause)
+                self.__decrease(self.backoff, now, "Магазин ограничивает запросы")
+            elif self.error_rate > self.error_threshold:
+                self.__decrease(self.backoff ** 0.5, now, f"Доля ошибок {self.error_rate:.0%}")
+            elif self.min_latency and self.latency > self.latency_factor * max(self.min_latency, 0.05):
+                self.__decrease(self.backoff ** 0.5, now, f"Задержка ответа {self.latency:.2f}сек")
+            elif outcome == OK:
+                if self.rate < self.threshold:
+                    self.rate = min(self.threshold, self.rate * min(2.0, 2 ** (1 / (self.rate * self.slow_start))))
+                else:
+                    self.rate = min(self.max_rate, self.rate + self.rate_increase / self.rate)
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+            self.__publish()
+            self.__condition.notify()
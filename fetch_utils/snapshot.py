@@ -0,0 +1,245 @@
+from datetime import datetime
+from pathlib import Path
+from threading import RLock, local
+from typing import Iterator, List, Optional, Tuple
+
+import hashlib
+import sqlite3
+import time
+import zstandard
+
+from .base import BaseFetch
+
+
+class SnapshotMissing(KeyError):
+    """Страницы нет в хранилище снимков."""
+
+
+class SnapshotStore:
+    def __init__(self, path: Path = Path("data/snapshots.db"), level: int = 9) -> None:
+        """
+        Хранилище снимков HTML страниц магазина.
+
+        HTML хранится сжатым zstd и адресуется по SHA-256 содержимого (таблица blobs),
+        поэтому одинаковые страницы хранятся один раз. Каждая загрузка страницы
+        записывается в таблицу snapshots как (URL, время загрузки, хеш), так что
+        для URL доступна вся история снимков.
+
+        Аргументы:
+        - path (Path): Путь к файлу базы снимков.
+        - level (int): Уровень сжатия zstd.
+
+        Методы:
+        - put(url, html, fetched_at): Сохраняет снимок страницы и возвращает его хеш.
+        - latest(url, before): Возвращает HTML последнего снимка страницы.
+        - fetched_at(url, before): Возвращает время загрузки последнего снимка страницы.
+        - history(url): Возвращает (время загрузки, хеш) всех снимков страницы.
+        - read(content_hash): Возвращает HTML по хешу.
+        - urls(): Итератор по URL, для которых есть снимки.
+        """
+
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.level = level
+
+        self.__lock = RLock()
+        # Компрессоры zstd не потокобезопасны, у каждого потока свои
+        self.__local = local()
+        self.connection = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                data BLOB NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS snapshots (
+                url TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (url, fetched_at)
+            ) WITHOUT ROWID;
+            """
+        )
+
+    def __enter__(self) -> "SnapshotStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __codecs(self) -> Tuple[zstandard.ZstdCompressor, zstandard.ZstdDecompressor]:
+        if not hasattr(self.__local, "codecs"):
+            self.__local.codecs = (
+                zstandard.ZstdCompressor(level=self.level),
+                zstandard.ZstdDecompressor(),
+            )
+        return self.__local.codecs
+
+    def put(self, url: str, html: str, fetched_at: Optional[float] = None) -> str:
+        """
+        Сохраняет снимок страницы.
+
+        Аргументы:
+        - url (str): URL страницы.
+        - html (str): HTML страницы.
+        - fetched_at (float, опционально): Время загрузки (секунды Unix), по умолчанию текущее.
+
+        Возвращает:
+        - str: SHA-256 содержимого.
+        """
+
+        data = html.encode()
+        content_hash = hashlib.sha256(data).hexdigest()
+        compressed = self.__codecs()[0].compress(data)
+
+        with self.__lock, self.connection:
+            self.connection.execute("BEGIN")
+            self.connection.execute(
+                "INSERT OR IGNORE INTO blobs (hash, data) VALUES (?, ?)",
+                (content_hash, compressed),
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO snapshots (url, fetched_at, hash) VALUES (?, ?, ?)",
+                (url, fetched_at if fetched_at is not None else time.time(), content_hash),
+            )
+
+        return content_hash
+
+    def read(self, content_hash: str) -> str:
+        with self.__lock:
+            row = self.connection.execute(
+                "SELECT data FROM blobs WHERE hash = ?", (content_hash,)
+            ).fetchone()
+
+        if row is None:
+            raise SnapshotMissing(content_hash)
+        return self.__codecs()[1].decompress(row[0]).decode()
+
+    def __latest(self, url: str, before: Optional[datetime]) -> Optional[Tuple[float, str]]:
+        with self.__lock:
+            return self.connection.execute(
+                "SELECT fetched_at, hash FROM snapshots WHERE url = ? AND fetched_at <= ? "
+                "ORDER BY fetched_at DESC LIMIT 1",
+                (url, before.timestamp() if before is not None else float("inf")),
+            ).fetchone()
+
+    def latest(self, url: str, before: Optional[datetime] = None) -> str:
+        """
+        Возвращает HTML последнего снимка страницы.
+
+        Аргументы:
+        - url (str): URL страницы.
+        - before (datetime, опционально): Брать последний снимок не позже этого момента.
+
+        Возвращает:
+        - str: HTML страницы.
+
+        Исключения:
+        - SnapshotMissing: Снимка страницы нет.
+        """
+
+        row = self.__latest(url, before)
+        if row is None:
+            raise SnapshotMissing(url)
+        return self.read(row[1])
+
+    def fetched_at(self, url: str, before: Optional[datetime] = None) -> Optional[float]:
+        """
+        Возвращает время загрузки (секунды Unix) снимка, который отдаст latest(url, before),
+        или None, если снимка нет.
+        """
+
+        row = self.__latest(url, before)
+        return row[0] if row is not None else None
+
+    def history(self, url: str) -> List[Tuple[datetime, str]]:
+        with self.__lock:
+            rows = self.connection.execute(
+                "SELECT fetched_at, hash FROM snapshots WHERE url = ? ORDER BY fetched_at",
+                (url,),
+            ).fetchall()
+
+        return [(datetime.fromtimestamp(fetched_at), content_hash) for fetched_at, content_hash in rows]
+
+    def urls(self) -> Iterator[str]:
+        with self.__lock:
+            rows = self.connection.execute("SELECT DISTINCT url FROM snapshots").fetchall()
+
+        for (url,) in rows:
+            yield url
+
+    def __contains__(self, url: str) -> bool:
+        with self.__lock:
+            return self.connection.execute(
+                "SELECT 1 FROM snapshots WHERE url = ? LIMIT 1", (url,)
+            ).fetchone() is not None
+
+    def close(self) -> None:
+        with self.__lock:
+            self.connection.close()
+
+
+class SnapshotFetch(BaseFetch):
+    def __init__(self, inner: BaseFetch, snapshots: SnapshotStore) -> None:
+        """
+        Загрузка страниц через другой объект загрузки с сохранением каждой
+        загруженной страницы в хранилище снимков.
+
+        Аргументы:
+        - inner (BaseFetch): Объект загрузки (браузер или HTTP-клиент).
+        - snapshots (SnapshotStore): Хранилище снимков.
+        """
+
+        self.inner = inner
+        self.snapshots = snapshots
+
+    def open(self) -> None:
+        self.inner.open()
+
+    def get(self, url: str) -> str:
+        html = self.inner.get(url)
+        self.snapshots.put(url, html)
+        return html
+
+    def close(self) -> None:
+        self.inner.close()
+
+    def alive(self) -> bool:
+        return self.inner.alive()
+
+    def memory_usage(self) -> Optional[int]:
+        return self.inner.memory_usage()
+
+
+class ReplayFetch(BaseFetch):
+    def __init__(
+        self,
+        snapshots: SnapshotStore,
+        before: Optional[datetime] = None,
+        **_,
+    ) -> None:
+        """
+        Загрузка страниц из хранилища снимков без обращения к магазину.
+
+        Отдает последний снимок страницы (не позже момента before), поэтому сбор
+        ссылок и обход игр можно повторить офлайн, например после изменения парсера.
+        Остальные именованные аргументы (rate_limit и т.д.) принимаются для
+        совместимости с другими способами загрузки и игнорируются.
+
+        Хранилище снимков общее для всех объектов пула и закрывается владельцем,
+        а не объектом загрузки.
+
+        Аргументы:
+        - snapshots (SnapshotStore): Хранилище снимков.
+        - before (datetime, опционально): Момент, на который воспроизводятся страницы.
+        """
+
+        self.snapshots = snapshots
+        self.before = before
+
+    def get(self, url: str) -> str:
+        return self.snapshots.latest(url, self.before)
@@ -1,6 +1,7 @@
-from typing import List, Optional, Tuple, Union
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Type, Union, get_args
 from pydantic import BaseModel
 from datetime import datetime
+from functools import lru_cache
 
 
 # Title
@@ -112,6 +113,7 @@ class EditionItem(BaseModel):
 class Game(BaseModel):
     id: str
     product_id: Tuple[str, str]
+    concept_id: Optional[str] = None
     image: Union[List[Tuple[str, str]], str]
     title: Title
     price: Union[List[PriceType1], List[PriceType2]]
@@ -120,3 +122,92 @@ class Game(BaseModel):
     addons: Optional[List[Addon]]
     info: Info
     info_date: str
+
+
+# Быстрая выгрузка доверенных данных парсера без построения объектов pydantic
+class UntrustedData(ValueError):
+    """Данные не подходят для быстрой выгрузки, нужна полная валидация."""
+
+
+_REQUIRED = object()
+
+
+def _models(annotation: Any) -> Tuple[Type[BaseModel], ...]:
+    """Модели, которые могут встретиться в значении поля с аннотацией annotation."""
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return (annotation,)
+    return tuple(model for arg in get_args(annotation) for model in _models(arg))
+
+
+def _is_float(annotation: Any) -> bool:
+    return annotation is float or any(_is_float(arg) for arg in get_args(annotation))
+
+
+@lru_cache(maxsize=None)
+def _plan(model: Type[BaseModel]) -> Tuple[FrozenSet[str], Tuple[Tuple[str, Any, Tuple, bool], ...]]:
+    """Обязательные поля модели и поля: (имя, значение по умолчанию, вложенные модели, приводится ли к float)."""
+
+    fields = tuple(
+        (
+            name,
+            _REQUIRED if field.is_required() else field.get_default(),
+            tuple((model, _plan(model)) for model in _models(field.annotation)),
+            _is_float(field.annotation),
+        )
+        for name, field in model.model_fields.items()
+    )
+    required = frozenset(name for name, default, *_ in fields if default is _REQUIRED)
+    return required, fields
+
+
+def _dump_value(value: Any, models: Tuple, to_float: bool) -> Any:
+    if isinstance(value, dict):
+        for model, (required, fields) in models:
+            if required <= value.keys():
+                return _dump_fields(model, fields, value)
+        raise UntrustedData(f"{value!r:.80} не подходит ни к одной модели поля")
+    if isinstance(value, list):
+        return [_dump_value(item, models, to_float) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_dump_value(item, models, to_float) for item in value)
+    if to_float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if to_float and isinstance(value, str):
+        raise UntrustedData(f"{value!r} - строка вместо числа")
+    return value
+
+
+def _dump_fields(model: Type[BaseModel], fields: Tuple, data: Dict[str, Any]) -> Dict[str, Any]:
+    result = {}
+    for name, default, models, to_float in fields:
+        value = data.get(name, default)
+        if value is _REQUIRED:
+            raise UntrustedData(f"{model.__name__}.{name} отсутствует")
+        # Значения без вложенных моделей и чисел (строки, списки строк) копировать не нужно
+        result[name] = _dump_value(value, models, to_float) if models or to_float else value
+    return result
+
+
+def trusted_dump(model: Type[BaseModel], data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Возвращает то же, что model(**data).model_dump(), без построения объектов pydantic.
+
+    Предназначено для данных, которые собирает PSClient: поля дополняются значениями
+    по умолчанию и упорядочиваются как в модели, вложенная модель выбирается по
+    обязательным полям, целые числа приводятся к float там, где этого ждет модель.
+    Остальные типы не проверяются. Если данные не подходят под структуру модели,
+    выполняется полная валидация (с ValidationError, если данные неверны).
+
+    Аргументы:
+    - model (Type[BaseModel]): Модель (например, Game).
+    - data (Dict[str, Any]): Поля модели.
+
+    Возвращает:
+    - Dict[str, Any]: Данные модели в виде словаря.
+    """
+
+    try:
+        return _dump_fields(model, _plan(model)[1], data)
+    except UntrustedData:
+        return model(**data).model_dump()
@@ -1,29 +1,39 @@
 from datetime import datetime
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 from bs4 import BeautifulSoup
 
-from .game_model import Game
+from metrics import histogram
 
-import json
+from .game_model import Game, trusted_dump
+from .script_index import ScriptIndex
+
+
+# Этапы разбора страницы игры: определение product_id, извлечение полей и валидация (или выгрузка без нее)
+PARSE_STAGE_SECONDS = histogram("psgames_parse_stage_seconds", "Время этапов разбора страницы игры", ("stage",))
 
 
 class PSClient:
-    def __init__(self, soup: BeautifulSoup) -> None:
+    def __init__(self, soup: Optional[BeautifulSoup] = None, html: Optional[str] = None) -> None:
         """
         Класс PSClient для получения и парсинга данных о играх из магазина PlayStation.
 
         Аргументы:
-        - href (str): URL страницы игры в магазине PlayStation.
-        - id (str, опционально): ID игры (по умолчанию None).
+        - soup (BeautifulSoup, опционально): Спарсенный HTML контент страницы игры.
+        - html (str, опционально): Сырой HTML страницы игры. JSON-данные извлекаются
+          из него напрямую, без построения дерева BeautifulSoup; дерево строится
+          только если понадобится разбор страниц старого формата.
 
         Атрибуты:
         - href (str): URL страницы игры в магазине PlayStation.
         - id (str): ID игры.
-        - soup: Спарсенный HTML контент страницы игры.
+        - soup: Спарсенный HTML контент страницы игры (при передаче html строится лениво).
+        - scripts: Индекс JSON-данных страницы по data-mfe-name.
         - product_id: Кортеж, представляющий тип и ID продукта/концепции.
+        - concept_id: ID концепции, к которой относится продукт (None, если на странице его нет).
 
         Методы:
         - __define_product_id(data): Определяет и возвращает тип и ID продукта или концепции игры.
+        - __define_concept_id(data): Определяет ID концепции игры.
         - __get_image(): Получает изображения, связанные с игрой.
         - __get_title(): Получает информацию о названии, включая имя, издателя, дату выпуска и т.д.
         - __get_price(): Получает информацию о цене игры.
@@ -31,22 +41,35 @@ class PSClient:
         - __get_info(): Получает дополнительную информацию, такую как жанры, языки и описания.
         - __load(): Загружает и инициализирует данные из предоставленного URL страницы игры.
         - data(): Получает все необходимые данные и возвращает их в виде объекта Game.
+        - dump(validate): Возвращает данные игры в виде словаря без лишней валидации.
         """
 
+        if soup is None and html is None:
+            raise ValueError("PSClient requires either soup or html.")
+
         self.id = None
-        self.soup = soup
+        self.__soup = soup
+        self.__html = html
+        self.scripts = ScriptIndex(soup) if soup is not None else ScriptIndex.from_html(html)
         self.product_id = None
+        self.concept_id = None
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        if self.__soup is None:
+            self.__soup = BeautifulSoup(self.__html, "html.parser")
+        return self.__soup
 
     def __find_script(self, data_name: str) -> dict:
         """
         Находит и извлекает JSON данные из script-тега в HTML-документе.
 
-        Находит div с указанным значением атрибута data-mfe-name, затем находит script-тег
-        с идентификатором, указанным в атрибуте data-initial этого div, и извлекает из него JSON данные.
+        Script-тег определяется по div с указанным значением атрибута data-mfe-name
+        и его атрибуту data-initial. Данные берутся из индекса страницы, поэтому
+        каждый script-тег декодируется не более одного раза.
 
         Args:
             data_name (str): Значение атрибута data-mfe-name для поиска div.
-            soup (BeautifulSoup): Объект BeautifulSoup, представляющий HTML-документ.
 
         Returns:
             dict: Извлеченные JSON данные.
@@ -55,24 +78,31 @@ class PSClient:
             KeyError: Если div или script не найдены, или отсутствует нужный атрибут.
             json.JSONDecodeError: Если содержимое script не является допустимым JSON.
         """
-        # Получение div с указанным data-mfe-name
-        div = self.soup.find("div", {"data-mfe-name": data_name})
-        if div is None:
-            raise KeyError(f"Div with data-mfe-name='{data_name}' not found.")
-
-        # Получение script с идентификатором, указанным в data-initial
-        script_id = div.get("data-initial")
-        if script_id is None:
-            raise KeyError(
-                f"Div with data-mfe-name='{data_name}' does not have 'data-initial' attribute."
-            )
 
-        script = self.soup.find("script", {"id": script_id})
-        if script is None:
-            raise KeyError(f"Script with id='{script_id}' not found.")
+        return self.scripts.get(data_name)
+
+    def __cache(self, data_name: str) -> Mapping[str, Any]:
+        """
+        Возвращает Apollo cache script-тега с откатом на общий cache страницы.
+
+        Args:
+            data_name (str): Значение атрибута data-mfe-name для поиска div.
+
+        Raises:
+            KeyError: Если div или script не найдены, или отсутствует нужный атрибут.
+        """
+
+        return self.scripts.cache(data_name)
 
-        # Извлечение и возврат JSON данных
-        return json.loads(script.text)
+    @staticmethod
+    def __without_typename(data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Возвращает копию словаря без служебного поля __typename.
+
+        Данные из индекса страницы общие для всех методов, поэтому не изменяются на месте.
+        """
+
+        return {key: value for key, value in data.items() if key != "__typename"}
 
     def __define_product_id(self, data) -> str:
         """
@@ -98,6 +128,34 @@ class PSClient:
             else:
                 return ("concept", f"Concept:{concept_id}")
 
+    def __define_concept_id(self, data) -> Optional[str]:
+        """
+        Определяет ID концепции игры. Для страницы продукта он берется из аргументов
+        ctaWithPrice, а если их нет - из ссылки продукта на концепцию в кэше страницы.
+
+        Аргументы:
+        - data: Данные ctaWithPrice.
+
+        Возвращает:
+        - Optional[str]: ID концепции без префикса Concept: или None.
+        """
+
+        if self.product_id[0] == "concept":
+            return self.product_id[1].split(":", 1)[1]
+        if data["args"].get("conceptId"):
+            return str(data["args"]["conceptId"])
+
+        for data_name in ("ctaWithPrice", "upsell", "gameTitle"):
+            try:
+                product = self.__cache(data_name).get(self.product_id[1]) or {}
+            except KeyError:
+                continue
+            concept = (product.get("concept") or {}).get("__ref")
+            if concept:
+                return concept.split(":", 1)[1]
+
+        return None
+
     def __get_image(self) -> List[Tuple]:
         """
         Получает изображения, связанные с игрой.
@@ -107,14 +165,14 @@ class PSClient:
         """
 
         try:
-            image_data = self.__find_script("gameBackgroundImage")
+            image_cache = self.__cache("gameBackgroundImage")
         except KeyError:
             image = self.soup.select_one('div.media-block__inner picture.media-block__img source')
             return image['srcset']
 
         image = [
                 (item["role"], item["url"])
-                for item in image_data["cache"][self.product_id[1]]["media"]
+                for item in image_cache[self.product_id[1]]["media"]
             ]
 
         return image
@@ -127,7 +185,7 @@ class PSClient:
         - Dict[str, Any]: Словарь, содержащий детали названия.
         """
         try:
-            title_data = self.__find_script("gameTitle")
+            title_cache = self.__cache("gameTitle")
         except KeyError:
             title = {
                 "name": self.soup.select_one('div.box.game-hero__title-content h1.game-title').text,
@@ -141,7 +199,7 @@ class PSClient:
             return title
 
         if self.product_id[0] == "product":
-            title_product = title_data["cache"][self.product_id[1]]
+            title_product = title_cache[self.product_id[1]]
             title = {
                 "edition": (
                     title_product["edition"]["name"]
@@ -159,7 +217,7 @@ class PSClient:
                 "category": title_product["topCategory"],
             }
         else:
-            title_concept = title_data["cache"][self.product_id[1]]
+            title_concept = title_cache[self.product_id[1]]
             title = {
                 "name": title_concept["name"],
                 "publisher": title_concept["publisherName"],
@@ -176,20 +234,19 @@ class PSClient:
         - List: Список деталей о ценах.
         """
 
-        price_data = self.__find_script("ctaWithPrice")
+        price_cache = self.__cache("ctaWithPrice")
         price = []
         if self.product_id[0] == "product":
-            price_product = price_data["cache"][self.product_id[1]]
+            price_product = price_cache[self.product_id[1]]
             for game_cta in price_product["webctas"]:
                 price.append(
                     {
-                        "type": price_data["cache"][game_cta["__ref"]]["type"],
-                        "info": price_data["cache"][game_cta["__ref"]]["price"],
+                        "type": price_cache[game_cta["__ref"]]["type"],
+                        "info": self.__without_typename(price_cache[game_cta["__ref"]]["price"]),
                     }
                 )
-                del price[-1]["info"]["__typename"]
         else:
-            price_concept = price_data["cache"][self.product_id[1]]
+            price_concept = price_cache[self.product_id[1]]
             price.append({"is_announce": price_concept["isAnnounce"]})
 
         return price
@@ -203,11 +260,11 @@ class PSClient:
         """
 
         try:
-            content_rating_data = self.__find_script("contentRating")
+            content_rating_cache = self.__cache("contentRating")
         except KeyError:
             return None
 
-        rating = content_rating_data["cache"][self.product_id[1]]["contentRating"]
+        rating = content_rating_cache[self.product_id[1]]["contentRating"]
         content_rating = {
             "name": rating["description"],
             "image": rating["url"],
@@ -221,24 +278,24 @@ class PSClient:
 
     def __get_editions(self) -> List:
         try:
-            editions_data = self.__find_script("upsell")
+            editions_cache = self.__cache("upsell")
         except KeyError:
             return None
 
         if self.product_id[0] == "concept":
             product_list = [
                 item["__ref"]
-                for item in editions_data["cache"][self.product_id[1]]["products"]
+                for item in editions_cache[self.product_id[1]]["products"]
             ]
         else:
-            product_cusa = editions_data["cache"][
-                editions_data["cache"][self.product_id[1]]["concept"]["__ref"]
+            product_cusa = editions_cache[
+                editions_cache[self.product_id[1]]["concept"]["__ref"]
             ]
             product_list = [item["__ref"] for item in product_cusa["products"]]
 
         editions = []
         for product in product_list:
-            product_data = editions_data["cache"][product]
+            product_data = editions_cache[product]
             edition = {
                 "id": product_data["id"],
                 "category": product_data["topCategory"],
@@ -267,9 +324,10 @@ class PSClient:
             price_list = []
             game_cta_list = [item["__ref"] for item in product_data["webctas"]]
             for game in game_cta_list:
-                game_cta = editions_data["cache"][game]
-                del game_cta["price"]["__typename"]
-                price_list.append({"type": game_cta["type"], "info": game_cta["price"]})
+                game_cta = editions_cache[game]
+                price_list.append(
+                    {"type": game_cta["type"], "info": self.__without_typename(game_cta["price"])}
+                )
 
             edition["price"] = price_list
 
@@ -279,19 +337,19 @@ class PSClient:
 
     def __get_addons(self):
         try:
-            addons_data = self.__find_script("addOns")
+            addons_cache = self.__cache("addOns")
         except KeyError:
             return None
 
         addons = []
         addons_list = [
             item["__ref"]
-            for item in addons_data["cache"]["ROOT_QUERY"][
-                list(addons_data["cache"]["ROOT_QUERY"].keys())[-1]
+            for item in addons_cache["ROOT_QUERY"][
+                list(addons_cache["ROOT_QUERY"].keys())[-1]
             ]["addOnProducts"]
         ]
         for item in addons_list:
-            addon_data = addons_data["cache"][item]
+            addon_data = addons_cache[item]
             addon = {
                 "id": addon_data["id"],
                 "image": addon_data["boxArt"]["url"],
@@ -307,8 +365,7 @@ class PSClient:
             }
 
             if addon_data.get("price"):
-                del addon_data["price"]["__typename"]
-                addon["price"] = addon_data["price"]
+                addon["price"] = self.__without_typename(addon_data["price"])
             else:
                 addon["price"] = None
 
@@ -324,9 +381,9 @@ class PSClient:
         - Dict[str, Any]: Словарь, содержащий дополнительную информацию.
         """
 
-        info_data = self.__find_script("gameInfo")
+        info_cache = self.__cache("gameInfo")
         if self.product_id[0] == "product":
-            info_product = info_data["cache"][self.product_id[1]]
+            info_product = info_cache[self.product_id[1]]
             info = {
                 "genres": (
                     [item["value"] for item in info_product["localizedGenres"]]
@@ -348,7 +405,7 @@ class PSClient:
                 "type": info_product["type"],
             }
         else:
-            info_concept = info_data["cache"][self.product_id[1]]
+            info_concept = info_cache[self.product_id[1]]
             info = {
                 "genres": (
                     [item["value"] for item in info_concept["localizedGenres"]]
@@ -374,9 +431,9 @@ class PSClient:
         Вызывает URLError, если предоставлен неверный URL.
         """
 
-        self.product_id = self.__define_product_id(
-            self.__find_script("ctaWithPrice")
-        )
+        cta = self.__find_script("ctaWithPrice")
+        self.product_id = self.__define_product_id(cta)
+        self.concept_id = self.__define_concept_id(cta)
 
         if self.product_id[0] == "concept":
             self.id = self.product_id[1].replace(
@@ -387,6 +444,25 @@ class PSClient:
                 "Product:", ""
             )
 
+    def __fields(self) -> Dict[str, Any]:
+        with PARSE_STAGE_SECONDS.labels("load").time():
+            self.__load()
+
+        with PARSE_STAGE_SECONDS.labels("extract").time():
+            return dict(
+                id=self.id,
+                product_id=self.product_id,
+                concept_id=self.concept_id,
+                image=self.__get_image(),
+                title=self.__get_title(),
+                price=self.__get_price(),
+                content_rating=self.__get_content_rating(),
+                addons=self.__get_addons(),
+                editions=self.__get_editions(),
+                info=self.__get_info(),
+                info_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            )
+
     def data(self) -> Game:
         """
         Получает все необходимые данные и возвращает их в виде объекта Game.
@@ -395,17 +471,27 @@ class PSClient:
         - Game: Объект Game, содержащий полученные данные.
         """
 
-        self.__load()
-
-        return Game(
-            id=self.id,
-            product_id=self.product_id,
-            image=self.__get_image(),
-            title=self.__get_title(),
-            price=self.__get_price(),
-            content_rating=self.__get_content_rating(),
-            addons=self.__get_addons(),
-            editions=self.__get_editions(),
-            info=self.__get_info(),
-            info_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        )
+        fields = self.__fields()
+        with PARSE_STAGE_SECONDS.labels("validate").time():
+            return Game(**fields)
+
+    def dump(self, validate: bool = False) -> Dict[str, Any]:
+        """
+        Получает все необходимые данные и возвращает их в виде словаря, как Game.model_dump().
+
+        Без validate данные парсера не проверяются pydantic повторно (trusted_dump),
+        что заметно дешевле построения и выгрузки объекта Game.
+
+        Аргументы:
+        - validate (bool): Выполнить полную валидацию моделью Game.
+
+        Возвращает:
+        - Dict[str, Any]: Данные игры.
+        """
+
+        if validate:
+            return self.data().model_dump()
+
+        fields = self.__fields()
+        with PARSE_STAGE_SECONDS.labels("dump").time():
+            return trusted_dump(Game, fields)
@@ -0,0 +1,290 @@
+from collections import ChainMap
+from html import unescape
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Union
+
+from bs4 import BeautifulSoup, Tag
+
+from metrics import histogram
+
+import json
+import re
+
+
+# Атрибуты тега до ">". Как и в html.parser, кавычки открывают значение только сразу
+# после "=", а кавычка внутри значения без кавычек (class=don't) - обычный символ
+_ATTRS = r"""((?:=\s*+(?:"[^"]*"|'[^']*'|[^\s>]*+)|[^>=])*)"""
+
+# Токены сырого HTML, которые нужны индексу: комментарии и raw-text теги пропускаются,
+# чтобы не находить div и script внутри них, как и html.parser
+_TAG_RE = re.compile(
+    r"<!--.*?-->"
+    r"|<(script|style)\b" + _ATTRS + r">(.*?)</\1\s*>"
+    r"|<(div)\b" + _ATTRS + r">",
+    re.IGNORECASE | re.DOTALL,
+)
+_ATTR_RE = re.compile(
+    r"""([^\s=/>"']+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>"'][^\s>]*)))?"""
+)
+
+# Декодирование JSON script-тегов страницы игры
+JSON_DECODE_SECONDS = histogram("psgames_json_decode_seconds", "Время декодирования JSON script-тега")
+
+
+def parse_attrs(source: str) -> Dict[str, str]:
+    """
+    Разбирает строку атрибутов тега так же, как html.parser: имена в нижнем регистре,
+    значения с раскрытыми HTML-сущностями, при повторе побеждает последний атрибут.
+    """
+
+    attrs = {}
+    for match in _ATTR_RE.finditer(source):
+        name, double, single, bare = match.groups()
+        value = double if double is not None else single if single is not None else bare
+        attrs[name.lower()] = unescape(value) if value else ""
+
+    return attrs
+
+
+class ScriptIndex:
+    def __init__(self, soup: Optional[BeautifulSoup] = None) -> None:
+        """
+        Индекс JSON-данных страницы игры: data-mfe-name -> содержимое script-тега.
+
+        Индекс строится за один проход по документу. JSON каждого script-тега
+        декодируется лениво и не более одного раза.
+
+        Аргументы:
+        - soup (BeautifulSoup): Объект BeautifulSoup, представляющий HTML-документ.
+          Для разбора сырого HTML без BeautifulSoup используется ScriptIndex.from_html.
+
+        Методы:
+        - from_html(html): Создает индекс поверх сырого HTML без построения дерева.
+        - get(data_name): Возвращает декодированные JSON данные по data-mfe-name.
+        - cache(data_name): Возвращает Apollo cache данных с откатом на общий cache страницы.
+        - entity(key): Возвращает сущность общего cache страницы по ключу.
+        - merged: Общий Apollo cache всех script-тегов страницы.
+        """
+
+        # data-mfe-name -> значение data-initial первого div с таким именем
+        self.__initial: Dict[str, Optional[str]] = {}
+        # id -> первый script-тег с таким идентификатором (Tag или его текст)
+        self.__scripts: Dict[str, Union[Tag, str]] = {}
+        self.__decoded: Dict[str, dict] = {}
+        self.__merged: Optional[Dict[str, Any]] = None
+        # Ключ -> сущность общего cache, найденная без сборки всего merged
+        self.__entities: Dict[str, Any] = {}
+        # Итератор по токенам сырого HTML, разбирается по мере необходимости
+        self.__tokens: Optional[Iterator[re.Match]] = None
+
+        if soup is not None:
+            for tag in soup.find_all(["div", "script"]):
+                if tag.name == "div":
+                    self.__add_div(tag.get("data-mfe-name"), tag.get("data-initial"))
+                else:
+                    self.__add_script(tag.get("id"), tag)
+
+    @classmethod
+    def from_html(cls, html: str) -> "ScriptIndex":
+        """
+        Создает индекс поверх сырого HTML без построения дерева BeautifulSoup.
+
+        Документ просматривается регулярным выражением лениво: разбор останавливается,
+        как только найдены div и script, нужные для запрошенных данных.
+
+        Аргументы:
+        - html (str): HTML страницы игры.
+        """
+
+        index = cls()
+        index.__tokens = _TAG_RE.finditer(html)
+        return index
+
+    def __add_div(self, data_name: Optional[str], script_id: Optional[str]) -> None:
+        if data_name is not None and data_name not in self.__initial:
+            self.__initial[data_name] = script_id
+
+    def __add_script(self, script_id: Optional[str], script: Union[Tag, str]) -> None:
+        if script_id is not None and script_id not in self.__scripts:
+            self.__scripts[script_id] = script
+
+    def __scan(self, found: Callable[[], bool]) -> None:
+        """
+        Разбирает сырой HTML, пока условие found не выполнится или документ не закончится.
+        """
+
+        if self.__tokens is None:
+            return
+
+        while not found():
+            match = next(self.__tokens, None)
+            if match is None:
+                self.__tokens = None
+                return
+
+            raw_name, raw_attrs, text, div, div_attrs = match.groups()
+            if div is not None:
+                attrs = parse_attrs(div_attrs)
+                self.__add_div(attrs.get("data-mfe-name"), attrs.get("data-initial"))
+            elif raw_name is not None and raw_name.lower() == "script":
+                self.__add_script(parse_attrs(raw_attrs).get("id"), text)
+
+    def __contains__(self, data_name: str) -> bool:
+        self.__scan(lambda: data_name in self.__initial)
+        return data_name in self.__initial
+
+    def get(self, data_name: str) -> dict:
+        """
+        Возвращает JSON данные script-тега, на который ссылается div с указанным data-mfe-name.
+
+        Args:
+            data_name (str): Значение атрибута data-mfe-name.
+
+        Returns:
+            dict: Извлеченные JSON данные. Результат общий для всех вызовов и не должен изменяться.
+
+        Raises:
+            KeyError: Если div или script не найдены, или отсутствует нужный атрибут.
+            json.JSONDecodeError: Если содержимое script не является допустимым JSON.
+        """
+
+        if data_name in self.__decoded:
+            return self.__decoded[data_name]
+
+        if data_name not in self:
+            raise KeyError(f"Div with data-mfe-name='{data_name}' not found.")
+
+        script_id = self.__initial[data_name]
+        if script_id is None:
+            raise KeyError(
+                f"Div with data-mfe-name='{data_name}' does not have 'data-initial' attribute."
+            )
+
+        self.__scan(lambda: script_id in self.__scripts)
+        script = self.__scripts.get(script_id)
+        if script is None:
+            raise KeyError(f"Script with id='{script_id}' not found.")
+
+        with JSON_DECODE_SECONDS.time():
+            data = json.loads(script if isinstance(script, str) else script.text)
+        self.__decoded[data_name] = data
+        return data
+
+    @property
+    def merged(self) -> Dict[str, Any]:
+        """
+        Общий Apollo cache страницы, собранный из всех script-тегов.
+
+        Поля одной и той же сущности из разных script-тегов объединяются,
+        при совпадении полей остается значение из первого по документу тега.
+        """
+
+        if self.__merged is None:
+            self.__scan(lambda: False)
+
+            merged = {}
+            for data_name in self.__initial:
+                try:
+                    data = self.get(data_name)
+                except (KeyError, ValueError):
+                    continue
+
+                cache = data.get("cache") if isinstance(data, dict) else None
+                if not isinstance(cache, dict):
+                    continue
+
+                for key, entity in cache.items():
+                    if not isinstance(entity, dict):
+                        merged.setdefault(key, entity)
+                        continue
+                    target = merged.setdefault(key, {})
+                    if isinstance(target, dict):
+                        for field, value in entity.items():
+                            target.setdefault(field, value)
+
+            self.__merged = merged
+
+        return self.__merged
+
+    def entity(self, key: str) -> Any:
+        """
+        Возвращает сущность общего Apollo cache страницы по ключу, как merged[key].
+
+        Декодируются только script-теги, в тексте которых встречается ключ, поэтому
+        промах не разбирает JSON всех тегов страницы.
+
+        Raises:
+            KeyError: Если сущности нет ни в одном script-теге.
+        """
+
+        if self.__merged is not None:
+            return self.__merged[key]
+
+        if key not in self.__entities:
+            self.__entities[key] = self.__find_entity(key)
+
+        entity = self.__entities[key]
+        if entity is _MISSING:
+            raise KeyError(key)
+        return entity
+
+    def __find_entity(self, key: str) -> Any:
+        needle = json.dumps(key)
+        # Ключ с экранируемыми символами может быть записан в JSON по-разному
+        if needle[1:-1] != key or "/" in key:
+            return self.merged.get(key, _MISSING)
+
+        self.__scan(lambda: False)
+
+        found = _MISSING
+        for data_name, script_id in self.__initial.items():
+            script = self.__scripts.get(script_id) if script_id is not None else None
+            if script is None or needle not in (script if isinstance(script, str) else script.text):
+                continue
+
+            try:
+                data = self.get(data_name)
+            except (KeyError, ValueError):
+                continue
+
+            cache = data.get("cache") if isinstance(data, dict) else None
+            if not isinstance(cache, dict) or key not in cache:
+                continue
+
+            entity = cache[key]
+            if found is _MISSING:
+                found = dict(entity) if isinstance(entity, dict) else entity
+            elif isinstance(found, dict) and isinstance(entity, dict):
+                for field, value in entity.items():
+                    found.setdefault(field, value)
+
+        return found
+
+    def cache(self, data_name: str) -> Mapping[str, Any]:
+        """
+        Возвращает Apollo cache script-тега с указанным data-mfe-name.
+
+        Ключи, которых нет в cache этого тега, ищутся в общем cache страницы
+        через entity: декодируются только теги, в которых встречается ключ.
+        """
+
+        return ChainMap(self.get(data_name)["cache"], _MergedView(self))
+
+
+# Отметка отсутствующей сущности в кэше ScriptIndex.entity
+_MISSING = object()
+
+
+class _MergedView(Mapping):
+    """Ленивое представление общего cache страницы для ChainMap."""
+
+    def __init__(self, index: ScriptIndex) -> None:
+        self.index = index
+
+    def __getitem__(self, key: str) -> Any:
+        return self.index.entity(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.index.merged)
+
+    def __len__(self) -> int:
+        return len(self.index.merged)
@@ -1,6 +1,6 @@
 from .get_all_games import get_all_game_links
 from .get_deals_games import get_deal_game_links
-from .get_game_links import get_game_links
+from .get_game_links import get_game_links, parse_game_tiles
 from .get_new_games import get_new_game_links
 from .get_preorder_games import get_preorder_game_links
 
@@ -11,4 +11,5 @@ __all__ = [
     get_game_links,
     get_new_game_links,
     get_preorder_game_links,
+    parse_game_tiles,
 ]
@@ -0,0 +1,185 @@
+from configs import configure_logging
+
+from pathlib import Path
+from threading import Lock
+from time import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import json
+import logging
+import os
+
+
+log = logging.getLogger(__name__)
+configure_logging()
+
+# Журнал старше этого срока не продолжается: каталог за это время успевает измениться
+MAX_AGE = 24 * 3600
+
+
+def _write_array(file, tiles: Iterator[Dict[str, str]]) -> int:
+    """
+    Пишет плитки JSON-массивом в том же виде, что json.dump(tiles, file, indent=2),
+    не собирая массив в памяти. Возвращает количество записанных плиток.
+    """
+
+    count = 0
+    for tile in tiles:
+        file.write("[\n  " if not count else ",\n  ")
+        file.write(json.dumps(tile, indent=2).replace("\n", "\n  "))
+        count += 1
+    file.write("\n]" if count else "[]")
+    return count
+
+
+class PageCheckpoint:
+    def __init__(self, data_path: Path, href: str, max_age: float = MAX_AGE) -> None:
+        """
+        Журнал обхода страниц каталога, из которого собирается файл со ссылками.
+
+        Плитки каждой загруженной страницы сразу дописываются в журнал рядом с
+        файлом (data_path + ".pages") строкой JSON и сбрасываются на диск, поэтому
+        в памяти плитки не накапливаются. Если обход прервался (например, упал
+        браузер), следующий обход того же каталога продолжает с загруженных страниц.
+        Журнал другого каталога, старше max_age секунд или оставшийся от
+        завершенного обхода не используется. Недописанная последняя строка после
+        падения отбрасывается.
+
+        В конце обхода commit() склеивает страницы в порядке номеров без повторов
+        во временный файл и атомарно переименовывает его в data_path, после чего
+        журнал удаляется. Поэтому data_path всегда содержит либо старый, либо
+        полностью новый список.
+
+        Аргументы:
+        - data_path (Path): Путь к файлу со ссылками.
+        - href (str): Ссылка на каталог без номера страницы.
+        - max_age (float): Максимальный возраст журнала для продолжения в секундах.
+
+        Методы:
+        - add(page, tiles): Записывает плитки загруженной страницы.
+        - set_page_count(count): Записывает количество страниц каталога.
+        - commit(): Собирает файл со ссылками и удаляет журнал.
+        """
+
+        self.data_path = data_path
+        self.path = data_path.with_name(data_path.name + ".pages")
+        self.href = href
+
+        # Номер страницы -> (смещение строки в журнале, количество плиток)
+        self.pages: Dict[int, Tuple[int, int]] = {}
+        self.page_count: Optional[int] = None
+        self.__lock = Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        end = self.__load(max_age)
+        self.file = open(self.path, "r+b" if end else "wb")
+        if end:
+            # Хвост недописанной строки обрезается, чтобы новые строки не склеились с ним
+            self.file.truncate(end)
+            self.file.seek(end)
+            log.info(f"Resume: {self.data_path.name}: загружено страниц {len(self.pages)}.")
+        else:
+            self.__append({"href": href, "started": time()})
+
+    def __load(self, max_age: float) -> int:
+        """Читает журнал прошлого обхода и возвращает смещение конца последней целой строки."""
+
+        if not self.path.exists():
+            return 0
+
+        with open(self.path, "rb") as file:
+            header_line = file.readline()
+            try:
+                header = json.loads(header_line)
+            except ValueError:
+                return 0
+            if header.get("href") != self.href or time() - header.get("started", 0) > max_age:
+                return 0
+
+            end = file.tell()
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+
+                if "page" in record:
+                    self.pages[record["page"]] = (end, len(record["tiles"]))
+                elif "page_count" in record:
+                    self.page_count = record["page_count"]
+                end += len(line)
+
+        return end
+
+    def __append(self, record: dict) -> int:
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode()
+        with self.__lock:
+            offset = self.file.tell()
+            self.file.write(line)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        return offset
+
+    def __contains__(self, page: int) -> bool:
+        return page in self.pages
+
+    def tile_count(self, page: int) -> int:
+        return self.pages[page][1]
+
+    def add(self, page: int, tiles: List[Dict[str, str]]) -> None:
+        offset = self.__append({"page": page, "tiles": tiles})
+        self.pages[page] = (offset, len(tiles))
+
+    def set_page_count(self, count: int) -> None:
+        self.__append({"page_count": count})
+        self.page_count = count
+
+    def __tiles(self) -> Iterator[Dict[str, str]]:
+        """
+        Плитки страниц в порядке номеров. Если игра сместилась между страницами
+        во время обхода и встретилась дважды, остается ее первое вхождение.
+        """
+
+        seen = set()
+        with open(self.path, "rb") as file:
+            for page in sorted(self.pages):
+                file.seek(self.pages[page][0])
+                for tile in json.loads(file.readline())["tiles"]:
+                    if tile["id"] in seen:
+                        continue
+                    seen.add(tile["id"])
+                    yield tile
+
+    def commit(self) -> int:
+        """
+        Собирает файл со ссылками из журнала и атомарно заменяет им data_path.
+
+        Возвращает:
+        - int: Количество игр в файле.
+        """
+
+        with self.__lock:
+            self.file.close()
+
+        temp_path = self.data_path.with_name(self.data_path.name + ".tmp")
+        try:
+            with open(temp_path, "w") as file:
+                count = _write_array(file, self.__tiles())
+                file.flush()
+                os.fsync(file.fileno())
+
+            os.replace(temp_path, self.data_path)
+        finally:
+            # После ошибки недописанный файл не остается рядом со списком, журнал сохраняется
+            temp_path.unlink(missing_ok=True)
+
+        self.path.unlink()
+        return count
+
+    def close(self) -> None:
+        """Закрывает журнал без сборки файла (обход можно будет продолжить)."""
+
+        with self.__lock:
+            self.file.close()
@@ -1,8 +1,10 @@
 from configs import configure_logging
+from fetch_utils import FetchPool
 from .get_game_links import get_game_links
 
 from pathlib import Path
 from time import time
+from typing import Optional
 
 import logging
 
@@ -11,10 +13,10 @@ log = logging.getLogger(__name__)
 configure_logging()
 
 
-def get_deal_game_links() -> None:
+def get_deal_game_links(pool: Optional[FetchPool] = None, concurrency: int = 1, parsers: int = 0) -> None:
     log.info("Function: get_deals_games()")
     start_time = time()
     href = "https://store.playstation.com/en-us/category/b2d586f8-d4a1-4c45-8e23-27d580936d5b/"
     data_path = Path("data/deals_game_links.json")
-    get_game_links(href, data_path)
+    get_game_links(href, data_path, pool, concurrency=concurrency, parsers=parsers)
     log.info(f"Successfully: {data_path.name} {(time() - start_time):.3f}sec")
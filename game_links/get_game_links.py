@@ -1,56 +1,207 @@
 from configs import configure_logging
-from fetch_utils import Fetch
+from fetch_utils import BaseFetch, FetchPool, default_pool, run_pipeline
+from metrics import counter, histogram
+from .checkpoint import PageCheckpoint
+from .paginator import find_page_count, probe_page_count
 
 from bs4 import BeautifulSoup
+from functools import partial
 from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
 
+import lxml.html
 import logging
 import json
+import re
 
 
 log = logging.getLogger(__name__)
 configure_logging()
 
+# data-qa картинки плитки игры, группа - индекс плитки на странице
+TILE_IMAGE_RE = re.compile(r"#productTile(\d+)#game-art#image#image$")
+
+# Разбор страниц каталога и запись списков ссылок
+TILE_PARSE_SECONDS = histogram("psgames_tile_parse_seconds", "Время извлечения плиток со страницы каталога", ("engine",))
+CATALOG_PAGES = counter("psgames_catalog_pages_total", "Разобранные страницы каталога", ("result",))
+LINKS_WRITE_SECONDS = histogram("psgames_links_write_seconds", "Время записи файла со ссылками на игры")
+
+
+def _make_tile(data_json: dict, href: str, images: Dict[int, str]) -> Dict[str, str]:
+    """
+    Собирает плитку игры из data-telemetry-meta ссылки и индекса картинок страницы.
+    Если картинки для плитки нет, поле image равно None.
+    """
+
+    image = images.get(int(data_json["index"]))
+    if image is None:
+        log.warning(f"Image: У плитки {data_json["id"]} нет картинки.")
+
+    return {
+        "id": data_json["id"],
+        "name": data_json["name"],
+        "url": f"https://store.playstation.com{href}",
+        "image": image[:-6] if image is not None else None,
+    }
+
+
+def _index_images(images: Iterable[Tuple[Optional[str], Optional[str]]]) -> Dict[int, str]:
+    """
+    Индексирует картинки плиток по индексу плитки из data-qa за один проход.
+    Первая картинка с индексом побеждает, как и при поиске через select_one.
+    """
+
+    index = {}
+    for data_qa, src in images:
+        match = TILE_IMAGE_RE.search(data_qa or "")
+        if match and src is not None:
+            index.setdefault(int(match.group(1)), src)
+
+    return index
+
+
+def _parse_tiles_soup(html: str) -> List[Dict[str, str]]:
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Получаем элементы в которых хранятся ссылки на игры
+    games = soup.select('div[id="__next"] > main[id="main"] ul li a')
+    images = _index_images(
+        (image.get("data-qa"), image.get("src"))
+        for image in soup.select('div[id="__next"] > main[id="main"] ul li a img[data-qa]')
+    )
+
+    # Прохожимся по всем элементам и получаем данные
+    return [
+        _make_tile(json.loads(item["data-telemetry-meta"]), item["href"], images)
+        for item in games
+    ]
+
+
+def _parse_tiles_fast(html: str) -> List[Dict[str, str]]:
+    tree = lxml.html.document_fromstring(html)
+
+    # Те же элементы, что и 'div[id="__next"] > main[id="main"] ul li a'
+    games = tree.xpath('//div[@id="__next"]/main[@id="main"]//ul//li//a')
+    images = _index_images(
+        (image.get("data-qa"), image.get("src"))
+        for image in tree.xpath('//div[@id="__next"]/main[@id="main"]//ul//li//a//img[@data-qa]')
+    )
+
+    return [
+        _make_tile(json.loads(item.attrib["data-telemetry-meta"]), item.attrib["href"], images)
+        for item in games
+    ]
 
-def get_game_links(href: str, data_path: Path) -> None:
-    ans = []
-    browser = Fetch()
-
-    # Открываем брузер
-    browser.open()
-
-    # Цикл для прохода по всем страницам ссылки
-    page = 1
-    while True:
-        # Получение html страницы
-        html = browser.get(f"{href}{page}")
-        soup = BeautifulSoup(html, "html.parser")
-
-        # Получаем элементы в которых хранятся ссылки на игры
-        games = soup.select('div[id="__next"] > main[id="main"] ul li a')
-
-        # Если на странице нет игр цикл заканчивается
-        if not games:
-            break
-
-        # Прохожимся по всем элементам и получаем данные
-        for item in games:
-            data_json = json.loads(item["data-telemetry-meta"])
-            ans.append(
-                {
-                    "id": data_json["id"],
-                    "name": data_json["name"],
-                    "url": f"https://store.playstation.com{item["href"]}",
-                    "image": soup.select_one(f'div[id="__next"] > main[id="main"] ul li a img[data-qa$="#productTile{data_json["index"]}#game-art#image#image"]')["src"][:-6]
-                }
-            )
 
+# Способы разбора страниц каталога: soup - BeautifulSoup и html.parser, fast - lxml
+PARSE_ENGINES = {
+    "soup": _parse_tiles_soup,
+    "fast": _parse_tiles_fast,
+}
+
+
+def parse_game_tiles(html: str, engine: str = "soup") -> List[Dict[str, str]]:
+    """
+    Извлекает плитки игр (ID, название, ссылку и картинку) из HTML страницы каталога.
+
+    Аргументы:
+    - html (str): HTML страницы каталога.
+    - engine (str): Способ разбора HTML: "soup" или "fast".
+
+    Возвращает:
+    - List[Dict[str, str]]: Плитки игр в порядке их следования на странице.
+    """
+
+    with TILE_PARSE_SECONDS.labels(engine).time():
+        tiles = PARSE_ENGINES[engine](html)
+
+    CATALOG_PAGES.labels("tiles" if tiles else "empty").inc()
+    return tiles
+
+
+def get_game_links(
+    href: str,
+    data_path: Path,
+    pool: Optional[FetchPool] = None,
+    engine: str = "soup",
+    concurrency: int = 1,
+    parsers: int = 0,
+) -> None:
+    """
+    Собирает ссылки на игры со всех страниц каталога и записывает их в файл.
+
+    Количество страниц определяется по пагинатору первой страницы (или поиском
+    последней непустой страницы), после чего остальные страницы загружаются
+    конвейером run_pipeline (параллельная загрузка, разбор в процессах-парсерах)
+    и склеиваются в порядке номеров без повторов.
+
+    Плитки каждой страницы сразу пишутся в журнал (PageCheckpoint), а файл со
+    ссылками заменяется целиком только в конце обхода. Прерванный обход при
+    следующем запуске продолжается с загруженных страниц.
+
+    Аргументы:
+    - href (str): Ссылка на каталог без номера страницы.
+    - data_path (Path): Путь к файлу для записи ссылок.
+    - pool (FetchPool, опционально): Пул объектов загрузки, по умолчанию общий пул браузеров.
+    - engine (str): Способ разбора HTML: "soup" или "fast".
+    - concurrency (int): Количество параллельных загрузчиков страниц.
+    - parsers (int): Количество процессов-парсеров, 0 - разбор в потоках-загрузчиках.
+    """
+
+    pool = pool or default_pool()
+    checkpoint = PageCheckpoint(data_path, href)
+
+    def write(page: int, tiles: Optional[List[Dict[str, str]]], error: Optional[BaseException]) -> None:
+        # Страница с ошибкой останавливает обход, следующий запуск продолжит с нее
+        if error is not None:
+            raise error
+        checkpoint.add(page, tiles)
         log.info(f"Page: {page}")
-        page += 1
 
-    # Закрываем браузер
-    browser.close()
+    def has_tiles(browser: BaseFetch, page: int) -> bool:
+        if page not in checkpoint:
+            # Получение html страницы
+            write(page, parse_game_tiles(browser.get(f"{href}{page}"), engine), None)
+        return bool(checkpoint.tile_count(page))
+
+    try:
+        page_count = checkpoint.page_count
+        if page_count is None:
+            with pool.fetch() as browser:
+                html = browser.get(f"{href}1")
+                tiles = parse_game_tiles(html, engine)
+                checkpoint.add(1, tiles)
+                log.info("Page: 1")
+
+                page_count = 0
+                if tiles:
+                    page_count = find_page_count(html) or probe_page_count(partial(has_tiles, browser))
+                    log.info(f"Pages: {page_count}")
+                checkpoint.set_page_count(page_count)
+
+        if page_count:
+            # Остальные страницы загружаются параллельно
+            run_pipeline(
+                pool,
+                [page for page in range(1, page_count + 1) if page not in checkpoint],
+                url=lambda page: f"{href}{page}",
+                parse=partial(parse_game_tiles, engine=engine),
+                write=write,
+                fetchers=concurrency,
+                parsers=parsers,
+            )
+
+            # Каталог мог вырасти во время обхода: дочитываем страницы до первой пустой
+            with pool.fetch() as browser:
+                page = page_count + 1
+                while has_tiles(browser, page):
+                    page += 1
+    except BaseException:
+        # Журнал остается на диске, следующий обход продолжит с загруженных страниц
+        checkpoint.close()
+        raise
 
     # Запись полученных ссылок игр в файл
-    with open(data_path.absolute(), "w") as file:
-        json.dump(ans, file, indent=2)
+    with LINKS_WRITE_SECONDS.time():
+        count = checkpoint.commit()
+    log.info(f"Links: {data_path.name}: {count} игр.")
@@ -0,0 +1,58 @@
+from typing import Callable, Optional
+
+import re
+
+
+# Кнопки пагинатора каталога: data-qa="...paginator-root#page-N"
+PAGER_RE = re.compile(r'data-qa="[^"]*paginator-root#page-(\d+)"')
+
+# Граница поиска количества страниц, если пагинатора на странице нет
+MAX_PAGES = 1000
+
+
+def find_page_count(html: str) -> Optional[int]:
+    """
+    Определяет количество страниц каталога по кнопкам пагинатора.
+
+    Возвращает:
+    - Optional[int]: Номер последней страницы или None, если пагинатор не найден.
+    """
+
+    pages = [int(page) for page in PAGER_RE.findall(html)]
+    return max(pages) if pages else None
+
+
+def probe_page_count(
+    has_tiles: Callable[[int], bool],
+    known: int = 1,
+    limit: int = MAX_PAGES,
+) -> int:
+    """
+    Находит последнюю непустую страницу каталога без пагинатора.
+
+    Сначала номер страницы удваивается, пока страницы не пусты, затем
+    граница уточняется бинарным поиском. Загружается O(log n) страниц.
+
+    Аргументы:
+    - has_tiles (Callable[[int], bool]): Проверяет, есть ли на странице игры.
+    - known (int): Номер страницы, про которую известно, что она не пуста.
+    - limit (int): Максимальный номер страницы.
+
+    Возвращает:
+    - int: Номер последней непустой страницы.
+    """
+
+    low, high = known, known * 2
+    while high <= limit and has_tiles(high):
+        low, high = high, high * 2
+    high = min(high, limit + 1)
+
+    # low - непустая страница, high - пустая (или за границей поиска)
+    while high - low > 1:
+        middle = (low + high) // 2
+        if has_tiles(middle):
+            low = middle
+        else:
+            high = middle
+
+    return low
@@ -0,0 +1,6 @@
+from .ids import GameIds
+from .prices import PriceHistory
+from .search import SearchIndex
+from .store import GameStore
+
+__all__ = [GameIds, GameStore, PriceHistory, SearchIndex]
@@ -0,0 +1,157 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .store import GameStore
+
+import sqlite3
+
+
+def game_ids(game_id: str, game: Dict[str, Any]) -> Iterator[Tuple[str, str]]:
+    """
+    ID, под которыми игра встречается в списках ссылок: (тип, ID) для ключа
+    хранилища, продукта или концепции страницы, концепции продукта и всех изданий.
+    ID концепций хранятся без префикса Concept:, как в all_game_links.json.
+    """
+
+    yield ("concept" if game_id.isdigit() else "product"), game_id
+
+    product_id = game.get("product_id")
+    if product_id:
+        yield product_id[0], product_id[1].split(":", 1)[-1]
+    if game.get("concept_id"):
+        yield "concept", str(game["concept_id"])
+    for edition in game.get("editions") or []:
+        if edition.get("id"):
+            yield "product", edition["id"]
+
+
+class GameIds:
+    def __init__(self, store: GameStore) -> None:
+        """
+        Соответствие концепций и продуктов играм хранилища.
+
+        Одна и та же игра попадает в списки ссылок под разными ID: в all_game_links.json
+        под ID концепции, в deals_game_links.json под ID продукта, а в других
+        списках под ID одного из изданий. Таблица game_ids связывает каждый
+        известный ID (концепцию, продукт страницы и продукты всех изданий, которые
+        извлекает PSClient) с ключом, под которым игра сохранена в хранилище.
+        Соответствие пишется в той же транзакции, что и игра (hook хранилища).
+
+        ID, уже связанный с игрой, не переназначается: ключ игры остается тем,
+        под которым она была сохранена первой. По этому соответствию планировщик
+        обхода объединяет ссылки разных списков на одну игру (collapse_links).
+
+        Аргументы:
+        - store (GameStore): Хранилище игр.
+
+        Методы:
+        - record_game(connection, game_id, game): Записывает ID игры (hook хранилища).
+        - rebuild(): Записывает ID всех игр хранилища.
+        - key(game_id, game): Возвращает ключ хранилища для записи игры.
+        - resolve(game_id): Возвращает ключ хранилища игры по любому ее ID.
+        - aliases(): Возвращает соответствие всех известных ID ключам хранилища.
+        - related(game_id): Возвращает все ID игры по типам.
+        """
+
+        self.store = store
+        self.store.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS game_ids (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                game_id TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS game_ids_game ON game_ids (game_id);
+            """
+        )
+        self.store.hooks.append(self.record_game)
+
+    @staticmethod
+    def __known(connection: sqlite3.Connection, game_id: str, game: Dict[str, Any]) -> Optional[str]:
+        """Ключ хранилища, с которым уже связан один из ID игры (первым - сам game_id)."""
+
+        for _, alias in game_ids(game_id, game):
+            row = connection.execute("SELECT game_id FROM game_ids WHERE id = ?", (alias,)).fetchone()
+            if row is not None:
+                return row[0]
+        return None
+
+    @staticmethod
+    def record_game(connection: sqlite3.Connection, game_id: str, game: Dict[str, Any]) -> None:
+        """Связывает ID игры с ключом хранилища. Вызывается хранилищем внутри транзакции записи."""
+
+        # Если игра уже известна под другим ключом (дубль, записанный до появления
+        # соответствия), новые ID связываются с тем же ключом
+        key = GameIds.__known(connection, game_id, game) or game_id
+        connection.executemany(
+            "INSERT INTO game_ids (id, kind, game_id) VALUES (?, ?, ?) ON CONFLICT (id) DO NOTHING",
+            ((alias, kind, key) for kind, alias in game_ids(game_id, game)),
+        )
+
+    def __len__(self) -> int:
+        with self.store.lock:
+            return self.store.connection.execute("SELECT COUNT(*) FROM game_ids").fetchone()[0]
+
+    def rebuild(self) -> int:
+        """
+        Записывает ID всех игр хранилища одной транзакцией в порядке записи игр
+        и возвращает количество игр.
+        """
+
+        count = 0
+        with self.store.lock, self.store.connection:
+            self.store.connection.execute("BEGIN")
+            for _, game_id, game in self.store.changed_since(0):
+                self.record_game(self.store.connection, game_id, game)
+                count += 1
+
+        return count
+
+    def key(self, game_id: str, game: Dict[str, Any]) -> str:
+        """
+        Возвращает ключ, под которым нужно сохранить игру, загруженную по ссылке game_id:
+        ключ уже сохраненной игры с одним из ее ID или сам game_id для новой игры.
+        """
+
+        with self.store.lock:
+            return self.__known(self.store.connection, game_id, game) or game_id
+
+    def resolve(self, game_id: str) -> Optional[str]:
+        """Возвращает ключ хранилища игры по ID концепции или любого ее продукта."""
+
+        with self.store.lock:
+            row = self.store.connection.execute(
+                "SELECT game_id FROM game_ids WHERE id = ?", (game_id,)
+            ).fetchone()
+
+        return row[0] if row is not None else None
+
+    def aliases(self) -> Dict[str, str]:
+        """Соответствие всех известных ID ключам хранилища (для планирования обхода целиком)."""
+
+        with self.store.lock:
+            return dict(self.store.connection.execute("SELECT id, game_id FROM game_ids"))
+
+    def related(self, game_id: str) -> Dict[str, List[str]]:
+        """
+        Возвращает все ID игры по типам: {"concept": [...], "product": [...]}.
+
+        Аргументы:
+        - game_id (str): Любой ID игры.
+
+        Возвращает:
+        - Dict[str, List[str]]: ID концепций и продуктов игры (пусто, если ID неизвестен).
+        """
+
+        key = self.resolve(game_id)
+        if key is None:
+            return {}
+
+        with self.store.lock:
+            rows = self.store.connection.execute(
+                "SELECT kind, id FROM game_ids WHERE game_id = ? ORDER BY kind, id", (key,)
+            ).fetchall()
+
+        related: Dict[str, List[str]] = {}
+        for kind, alias in rows:
+            related.setdefault(kind, []).append(alias)
+        return related
@@ -0,0 +1,259 @@
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .store import GameStore
+
+import sqlite3
+
+
+# Поля цены, изменение которых записывается в историю
+PRICE_FIELDS = ("base", "discounted", "discount_text", "end_time")
+
+# Формат Game.info_date
+INFO_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _timestamp(info_date: Optional[str]) -> int:
+    """Переводит Game.info_date в секунды Unix (текущее время, если даты нет)."""
+
+    if info_date:
+        try:
+            return int(datetime.strptime(info_date, INFO_DATE_FORMAT).timestamp())
+        except ValueError:
+            pass
+    return int(datetime.now().timestamp())
+
+
+def _end_time(value: Optional[str]) -> Optional[int]:
+    """endTime приходит строкой с миллисекундами Unix, в истории хранится числом."""
+
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def price_points(game: Dict[str, Any]) -> Iterator[Tuple[str, str, Tuple]]:
+    """
+    Цены игры и ее изданий: (ID продукта, тип CTA, (base, discounted, discount_text, end_time)).
+    Игры без цены (анонсы) и цены без числовых значений пропускаются, если продукт
+    встречается и в игре, и в изданиях, берется первая цена.
+    """
+
+    product_id = game.get("product_id") or ("", game.get("id"))
+    products = [(product_id[1].split(":", 1)[-1], game.get("price") or [])]
+    products += [
+        (edition["id"], edition.get("price") or [])
+        for edition in game.get("editions") or []
+    ]
+
+    seen = set()
+    for product, prices in products:
+        for price in prices:
+            info = price.get("info") if isinstance(price, dict) else None
+            if not info or (info.get("basePriceValue") is None and info.get("discountedValue") is None):
+                continue
+            if (product, price["type"]) in seen:
+                continue
+            seen.add((product, price["type"]))
+            yield product, price["type"], (
+                info.get("basePriceValue"),
+                info.get("discountedValue"),
+                info.get("discountText"),
+                _end_time(info.get("endTime")),
+            )
+
+
+class PriceHistory:
+    def __init__(self, store: GameStore) -> None:
+        """
+        История цен игр: для каждого продукта и типа CTA хранятся только изменения
+        цены (базовая цена, цена со скидкой, текст скидки и окончание скидки).
+
+        Ряды (продукт, CTA) хранятся в таблице price_series и нумеруются целыми
+        числами, изменения - в таблице price_changes без rowid с целочисленными
+        ценами и временем, поэтому одно изменение занимает несколько десятков байт,
+        а повторные обходы без изменения цены не увеличивают базу.
+        История пишется в той же транзакции, что и игра (hook хранилища).
+
+        Аргументы:
+        - store (GameStore): Хранилище игр.
+
+        Методы:
+        - record_game(connection, game_id, game): Записывает изменения цен игры (hook хранилища).
+        - rebuild(): Записывает текущие цены всех игр хранилища.
+        - history(game_id): Возвращает историю цен игры по рядам.
+        - change_stats(since): Возвращает количество изменений цен каждой игры с момента since.
+        - changes(since, limit): Возвращает изменения цен всех игр начиная с момента since.
+        """
+
+        self.store = store
+        self.store.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS price_series (
+                id INTEGER PRIMARY KEY,
+                game_id TEXT NOT NULL,
+                product TEXT NOT NULL,
+                cta TEXT NOT NULL,
+                UNIQUE (product, cta)
+            );
+            CREATE INDEX IF NOT EXISTS price_series_game ON price_series (game_id);
+            CREATE TABLE IF NOT EXISTS price_changes (
+                series INTEGER NOT NULL,
+                ts INTEGER NOT NULL,
+                base INTEGER,
+                discounted INTEGER,
+                discount_text TEXT,
+                end_time INTEGER,
+                PRIMARY KEY (series, ts)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS price_changes_ts ON price_changes (ts);
+            """
+        )
+        self.store.hooks.append(self.record_game)
+
+    @staticmethod
+    def record_game(connection: sqlite3.Connection, game_id: str, game: Dict[str, Any]) -> None:
+        """Записывает изменившиеся цены игры. Вызывается хранилищем внутри транзакции записи."""
+
+        ts = _timestamp(game.get("info_date"))
+        for product, cta, values in price_points(game):
+            connection.execute(
+                "INSERT INTO price_series (game_id, product, cta) VALUES (?, ?, ?) "
+                "ON CONFLICT (product, cta) DO UPDATE SET game_id = excluded.game_id",
+                (game_id, product, cta),
+            )
+            series = connection.execute(
+                "SELECT id FROM price_series WHERE product = ? AND cta = ?", (product, cta)
+            ).fetchone()[0]
+
+            last = connection.execute(
+                "SELECT ts, base, discounted, discount_text, end_time FROM price_changes "
+                "WHERE series = ? ORDER BY ts DESC LIMIT 1",
+                (series,),
+            ).fetchone()
+            # Повторный обход без изменений и старые данные не записываются
+            if last is not None and (last[1:] == values or last[0] >= ts):
+                continue
+
+            connection.execute(
+                "INSERT INTO price_changes (series, ts, base, discounted, discount_text, end_time) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (series, ts, *values),
+            )
+
+    def __len__(self) -> int:
+        with self.store.lock:
+            return self.store.connection.execute("SELECT COUNT(*) FROM price_changes").fetchone()[0]
+
+    def rebuild(self) -> int:
+        """Записывает текущие цены всех игр хранилища одной транзакцией и возвращает количество игр."""
+
+        count = 0
+        with self.store.lock, self.store.connection:
+            self.store.connection.execute("BEGIN")
+            for game_id, game in self.store.items():
+                self.record_game(self.store.connection, game_id, game)
+                count += 1
+
+        return count
+
+    def history(self, game_id: str) -> List[Dict[str, Any]]:
+        """
+        Возвращает историю цен игры и ее изданий.
+
+        Аргументы:
+        - game_id (str): ID игры.
+
+        Возвращает:
+        - List[Dict[str, Any]]: Ряды {product, cta, changes}, изменения по возрастанию времени.
+        """
+
+        with self.store.lock:
+            rows = self.store.connection.execute(
+                """
+                SELECT s.product, s.cta, c.ts, c.base, c.discounted, c.discount_text, c.end_time
+                FROM price_series s JOIN price_changes c ON c.series = s.id
+                WHERE s.game_id = ?
+                ORDER BY s.product, s.cta, c.ts
+                """,
+                (game_id,),
+            ).fetchall()
+
+        series: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for product, cta, ts, *values in rows:
+            series.setdefault((product, cta), []).append(
+                {"time": datetime.fromtimestamp(ts).strftime(INFO_DATE_FORMAT), **dict(zip(PRICE_FIELDS, values))}
+            )
+
+        return [
+            {"product": product, "cta": cta, "changes": changes}
+            for (product, cta), changes in series.items()
+        ]
+
+    def change_stats(self, since: datetime) -> Dict[str, Tuple[int, datetime]]:
+        """
+        Возвращает для каждой игры количество изменений цен начиная с момента since
+        и начало наблюдения (since или первая запись истории, если она позже).
+        Первая запись ряда изменением не считается.
+        """
+
+        since_ts = int(since.timestamp())
+        with self.store.lock:
+            rows = self.store.connection.execute(
+                """
+                SELECT s.game_id, SUM(c.ts >= ? AND c.ts > f.first), MIN(f.first)
+                FROM price_series s
+                JOIN (SELECT series, MIN(ts) AS first FROM price_changes GROUP BY series) f ON f.series = s.id
+                JOIN price_changes c ON c.series = s.id
+                GROUP BY s.game_id
+                """,
+                (since_ts,),
+            ).fetchall()
+
+        return {
+            game_id: (changes, datetime.fromtimestamp(max(first, since_ts)))
+            for game_id, changes, first in rows
+        }
+
+    def changes(self, since: datetime, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Возвращает изменения цен всех игр начиная с момента since вместе с предыдущими значениями.
+        Первая запись ряда (новая игра) идет с previous равным None.
+
+        Аргументы:
+        - since (datetime): Начало периода.
+        - limit (int): Максимальное количество изменений.
+
+        Возвращает:
+        - List[Dict[str, Any]]: Изменения по возрастанию времени.
+        """
+
+        with self.store.lock:
+            rows = self.store.connection.execute(
+                """
+                SELECT s.game_id, s.product, s.cta, c.ts, c.base, c.discounted, c.discount_text, c.end_time,
+                    p.base, p.discounted, p.discount_text, p.end_time
+                FROM price_changes c
+                JOIN price_series s ON s.id = c.series
+                LEFT JOIN price_changes p ON p.series = c.series AND p.ts = (
+                    SELECT MAX(ts) FROM price_changes WHERE series = c.series AND ts < c.ts
+                )
+                WHERE c.ts >= ?
+                ORDER BY c.ts, c.series
+                LIMIT ?
+                """,
+                (int(since.timestamp()), limit),
+            ).fetchall()
+
+        return [
+            {
+                "game_id": game_id,
+                "product": product,
+                "cta": cta,
+                "time": datetime.fromtimestamp(ts).strftime(INFO_DATE_FORMAT),
+                **dict(zip(PRICE_FIELDS, row[:4])),
+                "previous": dict(zip(PRICE_FIELDS, row[4:])) if any(value is not None for value in row[4:]) else None,
+            }
+            for game_id, product, cta, ts, *row in rows
+        ]
@@ -0,0 +1,391 @@
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from .store import GameStore
+
+import heapq
+import math
+import orjson
+import re
+import sqlite3
+import sys
+import unicodedata
+
+
+# Вес совпадения по полю игры
+FIELD_WEIGHTS = {
+    "name": 10.0,
+    "publisher": 3.0,
+    "genres": 2.0,
+    "description": 1.0,
+}
+
+# Множители оценки для точного, префиксного и нечеткого совпадения
+EXACT, PREFIX, FUZZY = 1.0, 0.6, 0.4
+
+# Сколько терминов просматривается и берется для префикса, с какой длины разрешена опечатка
+PREFIX_SCAN = 2000
+PREFIX_EXPANSIONS = 50
+FUZZY_MIN_LENGTH = 4
+
+# Сколько строк search_docs читается из базы за раз
+ROWS_BATCH = 500
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into",
+    "is", "it", "its", "of", "on", "or", "that", "the", "this", "to", "with",
+    "you", "your",
+}
+
+TOKEN_RE = re.compile(r"\w+")
+TAG_RE = re.compile(r"<[^>]+>")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Разбивает текст на термины: нижний регистр, без диакритики и HTML-тегов."""
+
+    if not text:
+        return []
+
+    text = unicodedata.normalize("NFKD", TAG_RE.sub(" ", text).casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return [token for token in TOKEN_RE.findall(text) if token not in STOP_WORDS]
+
+
+def deletes(term: str) -> Set[str]:
+    """Все варианты термина с одним удаленным символом (для поиска с опечаткой)."""
+
+    return {term[:index] + term[index + 1:] for index in range(len(term))}
+
+
+def within_one_edit(first: str, second: str) -> bool:
+    """Проверяет, что строки отличаются не более чем на одну правку (с перестановкой соседних символов)."""
+
+    if first == second:
+        return True
+    if abs(len(first) - len(second)) > 1:
+        return False
+
+    if len(first) == len(second):
+        diff = [index for index, (a, b) in enumerate(zip(first, second)) if a != b]
+        if len(diff) == 1:
+            return True
+        return (
+            len(diff) == 2
+            and diff[1] == diff[0] + 1
+            and first[diff[0]] == second[diff[1]]
+            and first[diff[1]] == second[diff[0]]
+        )
+
+    if len(first) > len(second):
+        first, second = second, first
+    for index in range(len(second)):
+        if second[:index] + second[index + 1:] == first:
+            return True
+    return False
+
+
+def game_terms(game: Dict[str, Any]) -> Dict[str, float]:
+    """Термины игры с весами: сумма весов полей, в которых встретился термин."""
+
+    title = game.get("title") or {}
+    info = game.get("info") or {}
+
+    fields = {
+        "name": [title.get("name")],
+        "publisher": [title.get("publisher") or info.get("publisher")],
+        "genres": info.get("genres") or [],
+        "description": [text for _, text in info.get("description") or []],
+    }
+
+    weights: Dict[str, float] = {}
+    for field, texts in fields.items():
+        counts = Counter(token for text in texts for token in tokenize(text))
+        for term, count in counts.items():
+            weights[term] = weights.get(term, 0.0) + FIELD_WEIGHTS[field] * (1 + math.log(count))
+
+    return {term: round(weight, 3) for term, weight in weights.items()}
+
+
+def game_document(game_id: str, game: Dict[str, Any]) -> Dict[str, Any]:
+    """Краткое описание игры для выдачи поиска."""
+
+    title = game.get("title") or {}
+    image = game.get("image")
+    if isinstance(image, list):
+        image = next((url for role, url in image if role == "MASTER"), image[0][1] if image else None)
+
+    return {
+        "id": game_id,
+        "name": title.get("name"),
+        "publisher": title.get("publisher"),
+        "image": image,
+    }
+
+
+class SearchIndex:
+    def __init__(self, store: GameStore) -> None:
+        """
+        Полнотекстовый поиск игр по названию, издателю, жанрам и описанию.
+
+        Термины каждой игры хранятся в базе хранилища (таблица search_docs) и
+        обновляются в той же транзакции, что и сама игра, поэтому индекс растет
+        вместе с хранилищем и не перестраивается после перезапуска сервера.
+        Для запросов индекс загружается в память лениво и догружает только
+        изменившиеся игры.
+
+        Поиск поддерживает префиксы (последнее слово запроса) и одну опечатку в слове.
+
+        Аргументы:
+        - store (GameStore): Хранилище игр.
+
+        Методы:
+        - index_game(connection, game_id, game): Сохраняет термины игры (hook хранилища).
+        - rebuild(): Переиндексирует все игры хранилища.
+        - refresh(): Догружает в память игры, измененные с прошлой загрузки.
+        - query(text, limit): Возвращает найденные игры по убыванию релевантности.
+        """
+
+        self.store = store
+        self.store.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS search_docs (
+                id TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                doc TEXT NOT NULL,
+                terms TEXT NOT NULL
+            )
+            """
+        )
+        self.store.connection.execute(
+            "CREATE INDEX IF NOT EXISTS search_docs_seq ON search_docs (seq)"
+        )
+        self.store.hooks.append(self.index_game)
+
+        self.__lock = Lock()
+        self.__loaded = False
+        self.__seq = 0
+        self.__version = None
+
+        # Игры нумеруются, списки игр термина хранятся массивами номеров, весов и
+        # позиций термина в doc_terms игры, а строки терминов и издателей интернируются,
+        # чтобы не хранить копии. doc_positions - место игры в списке каждого ее термина:
+        # по нему игра удаляется из списка за O(1), на ее место переносится последняя
+        self.numbers: Dict[str, int] = {}
+        self.docs: Dict[int, Dict[str, Any]] = {}
+        self.doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self.doc_positions: Dict[int, array] = {}
+        self.doc_seq: Dict[int, int] = {}
+        self.postings: Dict[str, Tuple[array, array, array]] = {}
+        self.terms: List[str] = []
+        self.fuzzy: Dict[str, Tuple[str, ...]] = {}
+
+    @staticmethod
+    def index_game(connection: sqlite3.Connection, game_id: str, game: Dict[str, Any]) -> None:
+        """Сохраняет термины игры. Вызывается хранилищем внутри транзакции записи."""
+
+        connection.execute(
+            """
+            INSERT INTO search_docs (id, seq, doc, terms)
+            VALUES (?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM search_docs), ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                seq = excluded.seq,
+                doc = excluded.doc,
+                terms = excluded.terms
+            """,
+            (
+                game_id,
+                orjson.dumps(game_document(game_id, game)).decode(),
+                orjson.dumps(game_terms(game)).decode(),
+            ),
+        )
+
+    def __len__(self) -> int:
+        with self.store.lock:
+            return self.store.connection.execute("SELECT COUNT(*) FROM search_docs").fetchone()[0]
+
+    def rebuild(self) -> int:
+        """Переиндексирует все игры хранилища одной транзакцией и возвращает их количество."""
+
+        count = 0
+        with self.store.lock, self.store.connection:
+            self.store.connection.execute("BEGIN")
+            for game_id, game in self.store.items():
+                self.index_game(self.store.connection, game_id, game)
+                count += 1
+
+        return count
+
+    def __rows(self) -> Iterator[Tuple[str, int, str, str]]:
+        # Строки читаются пачками, чтобы первая загрузка не держала в памяти всю таблицу
+        with self.store.lock:
+            cursor = self.store.connection.execute(
+                "SELECT id, seq, doc, terms FROM search_docs WHERE seq > ? ORDER BY seq",
+                (self.__seq,),
+            )
+
+        while True:
+            with self.store.lock:
+                rows = cursor.fetchmany(ROWS_BATCH)
+            if not rows:
+                return
+            yield from rows
+
+    def __remove(self, number: int) -> None:
+        positions = self.doc_positions.pop(number, ())
+        for term, position in zip(self.doc_terms.pop(number, ()), positions):
+            numbers, weights, slots = self.postings[term]
+            last = len(numbers) - 1
+            if position != last:
+                numbers[position] = numbers[last]
+                weights[position] = weights[last]
+                slots[position] = slots[last]
+                self.doc_positions[numbers[position]][slots[position]] = position
+            numbers.pop()
+            weights.pop()
+            slots.pop()
+            if not numbers:
+                del self.postings[term]
+                del self.terms[bisect_left(self.terms, term)]
+                for variant in deletes(term) | {term}:
+                    remaining = tuple(item for item in self.fuzzy[variant] if item != term)
+                    if remaining:
+                        self.fuzzy[variant] = remaining
+                    else:
+                        del self.fuzzy[variant]
+
+    def __add(self, number: int, doc: Dict[str, Any], terms: Dict[str, float], bulk: bool = False) -> None:
+        if doc.get("publisher"):
+            doc["publisher"] = sys.intern(doc["publisher"])
+        self.docs[number] = doc
+        self.doc_terms[number] = tuple(sys.intern(term) for term in terms)
+        positions = self.doc_positions[number] = array("I")
+        for slot, (term, weight) in enumerate(zip(self.doc_terms[number], terms.values())):
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = (array("I"), array("d"), array("I"))
+                # При первой загрузке словарь сортируется один раз в конце
+                if not bulk:
+                    insort(self.terms, term)
+                    self.__add_fuzzy(term)
+            positions.append(len(posting[0]))
+            posting[0].append(number)
+            posting[1].append(weight)
+            posting[2].append(slot)
+
+    def __add_fuzzy(self, term: str) -> None:
+        for variant in deletes(term) | {term}:
+            self.fuzzy[variant] = self.fuzzy.get(variant, ()) + (term,)
+
+    def refresh(self) -> None:
+        """
+        Догружает в память игры, измененные с прошлой загрузки.
+        База проверяется только если ее изменило другое подключение (data_version)
+        или подключение самого хранилища (total_changes: data_version его не учитывает).
+        """
+
+        with self.__lock:
+            version = (self.store.data_version(), self.store.connection.total_changes)
+            if self.__loaded and version == self.__version:
+                return
+
+            bulk = not self.__loaded
+            for game_id, seq, doc, terms in self.__rows():
+                number = self.numbers.setdefault(game_id, len(self.numbers))
+                self.__remove(number)
+                self.__add(number, orjson.loads(doc), orjson.loads(terms), bulk)
+                self.doc_seq[number] = seq
+                self.__seq = max(self.__seq, seq)
+
+            if bulk:
+                self.terms = sorted(self.postings)
+                for term in self.terms:
+                    self.__add_fuzzy(term)
+
+            self.__loaded = True
+            self.__version = version
+
+    def __expand(self, token: str, last: bool) -> Dict[str, float]:
+        """Термины индекса, подходящие под слово запроса, с множителями совпадения. Вызывается под блокировкой."""
+
+        matches = {}
+        if token in self.postings:
+            matches[token] = EXACT
+
+        if last:
+            # Продолжения слова, которое пользователь еще печатает: самые частые термины
+            start = bisect_left(self.terms, token)
+            end = start
+            while end < min(start + PREFIX_SCAN, len(self.terms)) and self.terms[end].startswith(token):
+                end += 1
+            candidates = heapq.nlargest(
+                PREFIX_EXPANSIONS,
+                self.terms[start:end],
+                key=lambda term: len(self.postings[term][0]),
+            )
+            for term in candidates:
+                matches.setdefault(term, PREFIX)
+
+        if len(token) >= FUZZY_MIN_LENGTH:
+            candidates = set()
+            for variant in deletes(token) | {token}:
+                candidates.update(self.fuzzy.get(variant, ()))
+            for term in candidates:
+                if term not in matches and within_one_edit(token, term):
+                    matches[term] = FUZZY
+
+        return matches
+
+    def query(self, text: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Ищет игры по запросу.
+
+        Игры, в которых нашлись все слова запроса, идут первыми, внутри группы -
+        по убыванию суммы весов (вес термина в игре * idf * множитель совпадения).
+        Индекс читается под той же блокировкой, под которой refresh() изменяет его
+        на месте, поэтому запрос не видит наполовину обновленные списки терминов.
+
+        Аргументы:
+        - text (str): Текст запроса.
+        - limit (int): Максимальное количество результатов.
+
+        Возвращает:
+        - List[Dict[str, Any]]: Игры с полем score.
+        """
+
+        self.refresh()
+
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+
+        with self.__lock:
+            total = len(self.docs) or 1
+            scores: Dict[int, float] = {}
+            matched: Dict[int, int] = {}
+            for index, token in enumerate(tokens):
+                best: Dict[int, float] = {}
+                for term, factor in self.__expand(token, index == len(tokens) - 1).items():
+                    numbers, weights, _ = self.postings[term]
+                    idf = math.log(1 + total / len(numbers))
+                    for number, weight in zip(numbers, weights):
+                        score = weight * idf * factor
+                        if score > best.get(number, 0.0):
+                            best[number] = score
+
+                for number, score in best.items():
+                    scores[number] = scores.get(number, 0.0) + score
+                    matched[number] = matched.get(number, 0) + 1
+
+            # Порядок игр в списках меняется при удалении, поэтому при равной оценке
+            # раньше идет игра, раньше записанная в индекс, как после полной загрузки
+            ranked = heapq.nlargest(
+                limit, scores, key=lambda number: (matched[number], scores[number], -self.doc_seq[number])
+            )
+            return [
+                {**self.docs[number], "score": round(scores[number], 3)}
+                for number in ranked
+            ]
@@ -0,0 +1,249 @@
+from pathlib import Path
+from threading import RLock
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import json
+import sqlite3
+
+from metrics import histogram
+
+
+# Сколько игр читается из базы за раз при обходе всего хранилища
+ITEMS_BATCH = 500
+
+# Время записи в хранилище вместе с ожиданием блокировки и хуками (история цен, поиск)
+STORE_WRITE_SECONDS = histogram("psgames_store_write_seconds", "Время записи игр в хранилище", ("operation",))
+
+
+class GameStore:
+    def __init__(self, path: Path = Path("data/games.db")) -> None:
+        """
+        Хранилище данных об играх на базе SQLite.
+
+        Каждая игра хранится отдельной записью, поэтому добавление или обновление
+        одной игры не требует перезаписи всего каталога. Каждое изменение выполняется
+        в отдельной транзакции, так что падение процесса посреди записи не портит
+        уже сохраненные данные.
+
+        Аргументы:
+        - path (Path): Путь к файлу базы данных.
+
+        Атрибуты:
+        - hooks: Функции hook(connection, game_id, game), которые вызываются внутри
+          транзакции записи игры. Через них дополнительные индексы (поиск и т.д.)
+          обновляются атомарно вместе с данными игры.
+
+        Методы:
+        - get(game_id): Возвращает данные игры или None.
+        - upsert(game_id, game): Добавляет или обновляет данные игры.
+        - import_json(path): Импортирует игры из старого games.json.
+        - data_version(): Возвращает счетчик изменений базы другими подключениями.
+        - last_seq(): Возвращает номер последнего изменения игр.
+        - changed_since(seq): Итератор по играм, измененным после изменения seq.
+        - ids(): Возвращает множество ID сохраненных игр.
+        - items(): Итератор по всем сохраненным играм.
+        """
+
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.__lock = RLock()
+        self.hooks: List[Callable[[sqlite3.Connection, str, Dict[str, Any]], None]] = []
+        self.connection = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        # WAL позволяет API читать базу, пока краулер в нее пишет
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS games (
+                id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                info_date TEXT
+            )
+            """
+        )
+
+        # Номер последнего изменения игры, по нему читатели догружают только измененные игры
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(games)")}
+        if "seq" not in columns:
+            with self.connection:
+                self.connection.execute("BEGIN")
+                self.connection.execute("ALTER TABLE games ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+                self.connection.execute("UPDATE games SET seq = rowid")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS games_seq ON games (seq)")
+
+        # Множество ID в памяти для проверки наличия игры за O(1) без запроса к базе
+        self.__ids = {
+            row[0] for row in self.connection.execute("SELECT id FROM games")
+        }
+
+    def __contains__(self, game_id: str) -> bool:
+        if game_id in self.__ids:
+            return True
+
+        # Игры, записанные другим подключением (краулером в другом процессе), в множестве
+        # еще нет: при промахе наличие проверяется в базе
+        with self.__lock:
+            found = self.connection.execute(
+                "SELECT 1 FROM games WHERE id = ?", (game_id,)
+            ).fetchone() is not None
+        if found:
+            self.__ids.add(game_id)
+        return found
+
+    def __len__(self) -> int:
+        return len(self.__ids)
+
+    def __enter__(self) -> "GameStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def get(self, game_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает данные игры по ID.
+
+        Аргументы:
+        - game_id (str): ID игры.
+
+        Возвращает:
+        - Optional[Dict[str, Any]]: Данные игры или None, если игры нет в хранилище.
+        """
+
+        with self.__lock:
+            row = self.connection.execute(
+                "SELECT data FROM games WHERE id = ?", (game_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def upsert(self, game_id: str, game: Dict[str, Any]) -> None:
+        """
+        Добавляет игру в хранилище или обновляет уже существующую запись.
+
+        Аргументы:
+        - game_id (str): ID игры.
+        - game (Dict[str, Any]): Данные игры (результат Game.model_dump()).
+        """
+
+        with STORE_WRITE_SECONDS.labels("upsert").time(), self.__lock, self.connection:
+            self.connection.execute("BEGIN")
+            self.connection.execute(
+                """
+                INSERT INTO games (id, data, info_date, seq)
+                VALUES (?, ?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM games))
+                ON CONFLICT(id) DO UPDATE SET
+                    data = excluded.data,
+                    info_date = excluded.info_date,
+                    seq = excluded.seq
+                """,
+                (game_id, json.dumps(game, ensure_ascii=False), game.get("info_date")),
+            )
+            for hook in self.hooks:
+                hook(self.connection, game_id, game)
+        self.__ids.add(game_id)
+
+    def import_json(self, path: Path) -> int:
+        """
+        Импортирует игры из JSON-файла формата {id: game} одной транзакцией.
+
+        Аргументы:
+        - path (Path): Путь к JSON-файлу.
+
+        Возвращает:
+        - int: Количество импортированных игр.
+        """
+
+        with open(path, "r") as file:
+            games = json.load(file)
+
+        with STORE_WRITE_SECONDS.labels("import").time(), self.__lock, self.connection:
+            self.connection.execute("BEGIN")
+            self.connection.executemany(
+                """
+                INSERT INTO games (id, data, info_date, seq)
+                VALUES (?, ?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM games))
+                ON CONFLICT(id) DO UPDATE SET
+                    data = excluded.data,
+                    info_date = excluded.info_date,
+                    seq = excluded.seq
+                """,
+                (
+                    (game_id, json.dumps(game, ensure_ascii=False), game.get("info_date"))
+                    for game_id, game in games.items()
+                ),
+            )
+            for game_id, game in games.items():
+                for hook in self.hooks:
+                    hook(self.connection, game_id, game)
+        self.__ids.update(games)
+
+        return len(games)
+
+    def data_version(self) -> int:
+        """
+        Возвращает счетчик изменений базы, сделанных другими подключениями
+        (например, краулером в другом процессе).
+        """
+
+        with self.__lock:
+            return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def last_seq(self) -> int:
+        with self.__lock:
+            return self.connection.execute("SELECT COALESCE(MAX(seq), 0) FROM games").fetchone()[0]
+
+    def changed_since(self, seq: int) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+        """
+        Итератор по играм, измененным после изменения с номером seq, в порядке изменений.
+
+        Аргументы:
+        - seq (int): Номер изменения, уже известного читателю (0 - все игры).
+
+        Возвращает:
+        - Iterator[Tuple[int, str, Dict[str, Any]]]: Тройки (номер изменения, ID, данные игры).
+        """
+
+        with self.__lock:
+            cursor = self.connection.execute(
+                "SELECT seq, id, data FROM games WHERE seq > ? ORDER BY seq", (seq,)
+            )
+
+        while True:
+            with self.__lock:
+                rows = cursor.fetchmany(ITEMS_BATCH)
+            if not rows:
+                return
+            for row_seq, game_id, data in rows:
+                yield row_seq, game_id, json.loads(data)
+
+    def ids(self) -> Set[str]:
+        return set(self.__ids)
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        # Игры читаются пачками, чтобы обход не держал в памяти весь каталог
+        with self.__lock:
+            cursor = self.connection.execute("SELECT id, data FROM games")
+
+        while True:
+            with self.__lock:
+                rows = cursor.fetchmany(ITEMS_BATCH)
+            if not rows:
+                return
+            for game_id, data in rows:
+                yield game_id, json.loads(data)
+
+    @property
+    def lock(self) -> RLock:
+        """Блокировка подключения для расширений, которые читают базу напрямую."""
+
+        return self.__lock
+
+    def close(self) -> None:
+        with self.__lock:
+            self.connection.close()
@@ -1,7 +1,16 @@
-import json
 from game_links import get_deal_game_links, get_all_game_links, get_new_game_links, get_preorder_game_links
-from fastapi import FastAPI
+from game_store import GameIds, GameStore, PriceHistory, SearchIndex
+from api import CachedFile, CatalogCache, PriceAnalytics
+from api.cache import LINK_FIELDS, parse_fields, project
+from api.catalog import CATALOG_FIELDS
+from metrics import REGISTRY, gauge, histogram
+from datetime import date, datetime
+from pathlib import Path
+from time import perf_counter
+from typing import List, Optional, Tuple
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 
 app = FastAPI()
@@ -19,38 +28,220 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-with open("data/games.json") as file:
-    data = json.load(file)
+# Задержка ответов по шаблону пути (/games/{game_id}), а не по конкретному URL
+REQUEST_SECONDS = histogram("psgames_http_request_seconds", "Время обработки запроса API", ("method", "route", "status"))
+REQUESTS_IN_FLIGHT = gauge("psgames_http_requests_in_flight", "Запросы API, которые обрабатываются прямо сейчас")
+
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    start = perf_counter()
+    status = 500
+    with REQUESTS_IN_FLIGHT.track():
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            REQUEST_SECONDS.labels(
+                request.method,
+                route.path if route is not None else "unmatched",
+                str(status),
+            ).observe(perf_counter() - start)
+
+store = GameStore(Path("data/games.db"))
+
+# Поисковый индекс хранится в той же базе, строится заново только если его еще нет
+search = SearchIndex(store)
+if len(store) and not len(search):
+    search.rebuild()
+search.refresh()
+
+# История цен пишется краулером при каждом обходе, при первом запуске заполняется текущими ценами
+prices = PriceHistory(store)
+if len(store) and not len(prices):
+    prices.rebuild()
+
+# Соответствие концепций и продуктов играм: ссылка из любого списка ведет к данным игры
+ids = GameIds(store)
+if len(store) and not len(ids):
+    ids.rebuild()
+
+# Списки ссылок отдаются из памяти и перечитываются только при изменении файлов
+all_games = CachedFile(Path("data/all_game_links.json"))
+new_games = CachedFile(Path("data/new_game_links.json"))
+preorder_games = CachedFile(Path("data/preorder_game_links.json"))
+deal_games = CachedFile(Path("data/deals_game_links.json"))
+
+# Каталог с индексами для фильтрации и постраничной выдачи
+catalog = CatalogCache(
+    {"all": all_games, "new": new_games, "preorder": preorder_games, "deals": deal_games},
+    store,
+    ids=ids,
+)
+
+# Колоночное представление цен для /stats/*, догружает только измененные игры
+analytics = PriceAnalytics(store)
+analytics.refresh()
+
+# Параметры выдачи полных списков: они не включают фильтрацию каталога
+LIST_PARAMS = {"fields", "format", "stream"}
+
+
+def fields_param(fields: Optional[str], known: Tuple[str, ...] = LINK_FIELDS) -> Optional[Tuple[str, ...]]:
+    """Проверяет параметр fields: неизвестные поля - ответ 400."""
+
+    try:
+        return parse_fields(fields, known)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
 
 
 @app.get("/games")
-def get_game_links():
-    with open("data/all_game_links.json") as file:
-        data = json.load(file)
-    return data
+def get_game_links(
+    request: Request,
+    platform: Optional[List[str]] = Query(None),
+    genre: Optional[List[str]] = Query(None),
+    category: Optional[str] = None,
+    in_list: Optional[str] = Query(None, alias="list"),
+    price_min: Optional[int] = None,
+    price_max: Optional[int] = None,
+    discount_min: Optional[int] = None,
+    released_after: Optional[date] = None,
+    released_before: Optional[date] = None,
+    sort: str = "name",
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    fmt: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    stream: bool = False,
+):
+    # Без фильтров отдается полный список, как и раньше
+    if request.query_params.keys() <= LIST_PARAMS:
+        return all_games.response(request, fields_param(fields), fmt, stream)
+
+    # Выборка каталога отдается страницами с курсором только в JSON
+    if fmt != "json" or stream:
+        raise HTTPException(status_code=400, detail="format=ndjson and stream are not supported with catalog filters")
+
+    projection = fields_param(fields, CATALOG_FIELDS)
+    try:
+        page = catalog.get().query(
+            platforms=platform,
+            genres=genre,
+            category=category,
+            list_name=in_list,
+            price_min=price_min,
+            price_max=price_max,
+            discount_min=discount_min,
+            released_after=int(released_after.strftime("%Y%m%d")) if released_after else None,
+            released_before=int(released_before.strftime("%Y%m%d")) if released_before else None,
+            sort=sort.removeprefix("-"),
+            descending=sort.startswith("-"),
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    page["items"] = project(page["items"], projection)
+    return page
 
 
 @app.get("/games/new")
-def get_new_games():
-    with open("data/deals_game_links.json") as file:
-        data = json.load(file)
-    return data
+def get_new_games(
+    request: Request,
+    fields: Optional[str] = None,
+    fmt: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    stream: bool = False,
+):
+    return new_games.response(request, fields_param(fields), fmt, stream)
 
 
 @app.get("/games/preorder")
-def get_preorder_games():
-    with open("data/preorder_game_links.json") as file:
-        data = json.load(file)
-    return data
+def get_preorder_games(
+    request: Request,
+    fields: Optional[str] = None,
+    fmt: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    stream: bool = False,
+):
+    return preorder_games.response(request, fields_param(fields), fmt, stream)
 
 
 @app.get("/games/deals")
-def get_deal_games():
-    with open("data/deals_game_links.json") as file:
-        data = json.load(file)
-    return data
+def get_deal_games(
+    request: Request,
+    fields: Optional[str] = None,
+    fmt: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    stream: bool = False,
+):
+    return deal_games.response(request, fields_param(fields), fmt, stream)
+
+
+@app.get("/games/search")
+def search_games(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=100)):
+    return search.query(q, limit)
+
+
+@app.get("/games/prices/changes")
+def get_price_changes(since: datetime, limit: int = Query(1000, ge=1, le=10000)):
+    return prices.changes(since, limit)
 
 
 @app.get("/games/{game_id}")
 def get_game(game_id):
-    return data[game_id]
+    game = store.get(ids.resolve(game_id) or game_id)
+    if game is None:
+        raise HTTPException(status_code=404, detail="Game not found")
+    return game
+
+
+@app.get("/games/{game_id}/prices")
+def get_game_prices(game_id):
+    game_id = ids.resolve(game_id) or game_id
+    if game_id not in store:
+        raise HTTPException(status_code=404, detail="Game not found")
+    return prices.history(game_id)
+
+
+@app.get("/stats/top-discounts")
+def get_top_discounts(
+    platform: Optional[str] = None,
+    price_min: Optional[int] = None,
+    price_max: Optional[int] = None,
+    released_after: Optional[date] = None,
+    publisher: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+):
+    return analytics.top_discounts(
+        platform=platform,
+        price_min=price_min,
+        price_max=price_max,
+        released_after=int(released_after.strftime("%Y%m%d")) if released_after else None,
+        publisher=publisher,
+        limit=limit,
+    )
+
+
+@app.get("/stats/publishers")
+def get_publisher_stats(
+    platform: Optional[str] = None,
+    min_games: int = Query(1, ge=1),
+    sort: str = "discount",
+    limit: int = Query(100, ge=1, le=1000),
+):
+    try:
+        return analytics.publishers(platform=platform, min_games=min_games, sort=sort, limit=limit)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+
+@app.get("/stats/platforms")
+def get_platform_stats():
+    return analytics.platforms()
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
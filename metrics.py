@@ -0,0 +1,373 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Границы корзин гистограмм по умолчанию в секундах: от 50 мкс (декодирование JSON) до 30 с (загрузка браузером)
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Timer:
+    """Замер времени блока with. Обычный класс дешевле генератора contextmanager на горячем пути."""
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: "_HistogramValue") -> None:
+        self.histogram = histogram
+
+    def __enter__(self) -> None:
+        self.start = perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(perf_counter() - self.start)
+
+
+class _Tracker:
+    __slots__ = ("gauge",)
+
+    def __init__(self, gauge: "_GaugeValue") -> None:
+        self.gauge = gauge
+
+    def __enter__(self) -> None:
+        self.gauge.inc()
+
+    def __exit__(self, *exc) -> None:
+        self.gauge.dec()
+
+
+class _CounterValue:
+    __slots__ = ("value", "lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self.lock = Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value += amount
+
+
+class _GaugeValue(_CounterValue):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def track(self) -> _Tracker:
+        """Увеличивает значение на время выполнения блока (количество выполняемых операций)."""
+
+        return _Tracker(self)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "lock")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> _Timer:
+        """Замеряет время выполнения блока, в том числе завершившегося исключением."""
+
+        return _Timer(self)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Оценка квантиля линейной интерполяцией внутри корзины, как histogram_quantile."""
+
+        with self.lock:
+            counts = list(self.counts)
+        total = sum(counts)
+        if not total:
+            return None
+
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                low = self.buckets[index - 1] if index else 0.0
+                return low + (self.buckets[index] - low) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> None:
+        """
+        Метрика с набором меток. Значение для каждого набора значений меток
+        создается при первом обращении через labels() и дальше переиспользуется.
+
+        Аргументы:
+        - name (str): Имя метрики в формате Prometheus.
+        - documentation (str): Описание метрики (строка HELP).
+        - labelnames (Tuple[str, ...]): Имена меток.
+        """
+
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[Tuple[str, ...], object] = {}
+        self.__lock = Lock()
+        if not self.labelnames:
+            self.children[()] = self._new_child()
+
+    @abstractmethod
+    def _new_child(self):
+        pass
+
+    def labels(self, *values: str):
+        """Возвращает значение метрики для значений меток в порядке labelnames."""
+
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {values}.")
+            with self.__lock:
+                child = self.children.setdefault(tuple(str(value) for value in values), self._new_child())
+        return child
+
+    def items(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self.__lock:
+            return sorted(self.children.items())
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        pass
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterValue:
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.children[()].inc(amount)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+            for values, child in self.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeValue:
+        return _GaugeValue()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.children[()].dec(amount)
+
+    def set(self, value: float) -> None:
+        self.children[()].set(value)
+
+    def track(self):
+        return self.children[()].track()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.children[()].observe(value)
+
+    def time(self):
+        return self.children[()].time()
+
+    def render(self) -> List[str]:
+        lines = []
+        for values, child in self.items():
+            with child.lock:
+                counts, total = list(child.counts), child.sum
+
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        """
+        Набор метрик процесса.
+
+        Методы:
+        - counter(...), gauge(...), histogram(...): Регистрируют метрику или возвращают уже зарегистрированную.
+        - render(): Возвращает все метрики в текстовом формате Prometheus.
+        - summary(): Возвращает краткую сводку метрик для логов.
+        - drain(), merge(values): Передают значения метрик из дочернего процесса в родительский.
+        """
+
+        self.metrics: Dict[str, Metric] = {}
+        self.__lock = Lock()
+
+    def __register(self, cls, name: str, *args, **kwargs) -> Metric:
+        with self.__lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"Metric {name} is already registered as {metric.kind}.")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.__register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self.__register(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.__register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def drain(self) -> List[Tuple[str, Tuple[str, ...], Any]]:
+        """
+        Забирает накопленные значения счетчиков и гистограмм и обнуляет их.
+
+        Процесс-парсер пишет метрики в свою копию реестра, которая в родительский
+        процесс не попадает, поэтому значения возвращаются вместе с результатом
+        разбора и добавляются в реестр родителя через merge(). Gauge описывают
+        состояние процесса и не передаются.
+        """
+
+        with self.__lock:
+            metrics = sorted(self.metrics.items())
+
+        values = []
+        for name, metric in metrics:
+            if isinstance(metric, Gauge):
+                continue
+            for labels, child in metric.items():
+                with child.lock:
+                    if isinstance(child, _HistogramValue):
+                        if any(child.counts):
+                            values.append((name, labels, (child.counts, child.sum)))
+                            child.counts = [0] * len(child.counts)
+                            child.sum = 0.0
+                    elif child.value:
+                        values.append((name, labels, child.value))
+                        child.value = 0.0
+        return values
+
+    def merge(self, values: List[Tuple[str, Tuple[str, ...], Any]]) -> None:
+        """Добавляет значения, полученные drain() в другом процессе. Неизвестные метрики пропускаются."""
+
+        for name, labels, value in values:
+            metric = self.metrics.get(name)
+            if metric is None:
+                continue
+            child = metric.labels(*labels)
+            with child.lock:
+                if isinstance(child, _HistogramValue):
+                    counts, total = value
+                    child.counts = [own + other for own, other in zip(child.counts, counts)]
+                    child.sum += total
+                else:
+                    child.value += value
+
+    def render(self) -> str:
+        with self.__lock:
+            metrics = sorted(self.metrics.items())
+
+        lines = []
+        for name, metric in metrics:
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> List[str]:
+        """
+        Сводка ненулевых метрик: значения счетчиков, а для гистограмм количество,
+        суммарное и среднее время и оценки p50 и p95.
+        """
+
+        with self.__lock:
+            metrics = sorted(self.metrics.items())
+
+        lines = []
+        for name, metric in metrics:
+            for values, child in metric.items():
+                labels = _format_labels(metric.labelnames, values)
+                if isinstance(child, _HistogramValue):
+                    count = child.count
+                    if not count:
+                        continue
+                    lines.append(
+                        f"{name}{labels}: count={count} total={child.sum:.3f}s mean={child.sum / count * 1000:.2f}ms "
+                        f"p50={child.quantile(0.5) * 1000:.2f}ms p95={child.quantile(0.95) * 1000:.2f}ms"
+                    )
+                elif child.value:
+                    lines.append(f"{name}{labels}: {_format_value(child.value)}")
+        return lines
+
+
+# Метрики процесса: краулер и API регистрируют свои метрики здесь
+REGISTRY = Registry()
+
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
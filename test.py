@@ -1,46 +1,203 @@
-import json
-from game_links import get_deal_game_links, get_all_game_links, get_new_game_links, get_preorder_game_links
+from crawler import RecrawlScheduler, check_snapshots, collapse_links, crawl_games, load_list_membership, load_links
+from game_store import GameIds, GameStore, PriceHistory, SearchIndex
+from fetch_utils import FETCH_BACKENDS, AdaptiveRateLimiter, FetchPool, RateLimiter, SnapshotFetch, SnapshotStore
+from game_links import get_all_game_links, get_deal_game_links, get_new_game_links, get_preorder_game_links
+from metrics import REGISTRY
 from pathlib import Path
-from game_info import PSClient
-from fetch_utils import Fetch
-from bs4 import BeautifulSoup
 from configs import configure_logging
+from datetime import timedelta
+from functools import partial
+import argparse
 import logging
+import os
 
 
 log = logging.getLogger(__name__)
 configure_logging()
 
 
-with open("data/all_game_links.json", "r") as file:
-    data = json.load(file)
-    log.info("ReadDB: Ссылки на все игры получены.")
+parser = argparse.ArgumentParser(description="Загрузка данных об играх в хранилище.")
+parser.add_argument("--workers", type=int, default=4, help="Количество параллельных воркеров")
+parser.add_argument(
+    "--backend",
+    choices=FETCH_BACKENDS,
+    default="http",
+    help="Способ загрузки страниц: http (без браузера), browser (Chrome) или replay (из снимков страниц)",
+)
+parser.add_argument(
+    "--parsers",
+    type=int,
+    default=os.cpu_count() or 1,
+    help="Количество процессов-парсеров страниц (0 - разбор в потоках загрузки)",
+)
+parser.add_argument(
+    "--queue-size",
+    type=int,
+    default=16,
+    help="Сколько загруженных страниц может ждать разбора, прежде чем загрузка приостановится",
+)
+parser.add_argument("--http2", action="store_true", help="Использовать HTTP/2 для backend http")
+parser.add_argument(
+    "--interval",
+    type=float,
+    nargs=2,
+    default=(2.0, 3.0),
+    metavar=("MIN", "MAX"),
+    help="Интервал между запросами одного воркера в секундах",
+)
+parser.add_argument(
+    "--adaptive",
+    action="store_true",
+    help="Общий для воркеров адаптивный ограничитель: частота подстраивается под задержку, ошибки и блокировки",
+)
+parser.add_argument(
+    "--links",
+    type=Path,
+    nargs="+",
+    default=None,
+    help="Файлы со ссылками на игры, по умолчанию data/*_game_links.json",
+)
+parser.add_argument(
+    "--recrawl",
+    action="store_true",
+    help="Повторно обойти игры из хранилища, у которых вероятнее всего изменились данные",
+)
+parser.add_argument(
+    "--pages-per-hour",
+    type=float,
+    default=None,
+    help="Бюджет повторного обхода: страниц в час (ограничивает и скорость, и объем обхода)",
+)
+parser.add_argument("--hours", type=float, default=1.0, help="Длительность повторного обхода в часах")
+parser.add_argument(
+    "--snapshots",
+    action=argparse.BooleanOptionalAction,
+    default=True,
+    help="Сохранять загруженные страницы (каталог и игры) в хранилище снимков data/snapshots.db (по умолчанию включено)",
+)
+parser.add_argument(
+    "--collect-links",
+    action="store_true",
+    help="Перед обходом игр собрать ссылки со страниц каталога тем же способом загрузки (с replay - из снимков)",
+)
+parser.add_argument(
+    "--check-snapshots",
+    action="store_true",
+    help="Разобрать снимки страниц текущим парсером и сравнить с хранилищем, ничего не загружая",
+)
+args = parser.parse_args()
 
-data_path = Path("data/games.json")
-if not data_path.exists():
-    with open(data_path, "w") as file:
-        file.write("{}")
+store = GameStore(Path("data/games.db"))
+SearchIndex(store)
+prices = PriceHistory(store)
+ids = GameIds(store)
 
-browser = Fetch()
+# Перенос данных из старого games.json в хранилище
+legacy_path = Path("data/games.json")
+if legacy_path.exists() and not len(store):
+    count = store.import_json(legacy_path)
+    log.info(f"ImportDB: Из {legacy_path.name} импортировано игр: {count}.")
 
-browser.open()
-for item in data:
-    with open(data_path, "r") as file:
-        games = json.load(file)
+# Соответствие концепций и продуктов играм пишется при каждой записи, при первом запуске заполняется по хранилищу
+if len(store) and not len(ids):
+    count = ids.rebuild()
+    log.info(f"ReadDB: Соответствие ID заполнено по играм хранилища: {count}.")
 
-    if games.get(item["id"]):
-        log.info(f"Skip: Игра {item["name"]} присутствует в списке игр.")
-        continue
+# Каждая загруженная страница сохраняется снимком, чтобы после изменения парсера
+# сбор ссылок и обход игр можно было повторить офлайн (--backend replay)
+record = args.snapshots and args.backend != "replay"
+snapshots = None
+if record or args.check_snapshots or args.backend == "replay":
+    snapshots = SnapshotStore(Path("data/snapshots.db"))
 
-    html = browser.get(item["url"])
-    soup = BeautifulSoup(html, "html.parser")
-    game = PSClient(soup)
-    game_info = game.data()
+# Бюджет страниц в час делится между воркерами
+interval = tuple(args.interval)
+if args.pages_per_hour:
+    budget_interval = args.workers * 3600 / args.pages_per_hour
+    interval = (max(interval[0], budget_interval), max(interval[1], budget_interval))
 
-    games[item["id"]] = game_info.model_dump()
-    log.info(f"AddDB: Игра {item["name"]} добавлена.")
+fetch_factory = FETCH_BACKENDS[args.backend]
+if args.backend == "http":
+    fetch_factory = partial(fetch_factory, http2=args.http2)
+elif args.backend == "browser":
+    fetch_factory = partial(fetch_factory, profile="scrape")
+else:
+    fetch_factory = partial(fetch_factory, snapshots)
 
-    with open(data_path, "w") as file:
-        json.dump(games, file, indent=2)
+# Адаптивный ограничитель один на все воркеры, бюджет страниц в час задает его потолок
+shared_limit = None
+if args.adaptive:
+    shared_limit = AdaptiveRateLimiter(
+        max_rate=args.pages_per_hour / 3600 if args.pages_per_hour else 5.0,
+        max_concurrency=args.workers,
+    )
 
-browser.close()
+
+def make_fetch():
+    fetch = fetch_factory(rate_limit=shared_limit or RateLimiter(*interval))
+    if record:
+        fetch = SnapshotFetch(fetch, snapshots)
+    return fetch
+
+
+# Ссылки собираются тем же пулом: страницы каталога тоже попадают в снимки или берутся из них
+with FetchPool(make_fetch, size=args.workers) as pool:
+    if args.collect_links and not args.check_snapshots:
+        for collect in (get_all_game_links, get_deal_game_links, get_new_game_links, get_preorder_game_links):
+            collect(pool, concurrency=args.workers, parsers=args.parsers)
+
+    # Файлы по умолчанию ищутся после сбора ссылок: он мог их создать
+    links = args.links or sorted(Path("data").glob("*_game_links.json"))
+    data = load_links(links)
+    log.info(f"ReadDB: Ссылки на игры получены: {len(data)}.")
+
+    # Ссылки разных списков на одну игру (концепция, продукт, издания) загружаются и проверяются один раз
+    aliases = ids.aliases()
+    data = collapse_links(data, aliases)
+
+    if args.check_snapshots:
+        stats = check_snapshots(data, store, snapshots, ids)
+        log.info(
+            f"Done: Совпало {stats["same"]}, отличается {stats["changed"]}, "
+            f"ошибок {stats["errors"]}, без снимка {stats["missing"]}."
+        )
+    else:
+        budget = None
+        if args.recrawl:
+            if args.pages_per_hour:
+                budget = int(args.pages_per_hour * args.hours)
+            plan = RecrawlScheduler(store, prices).plan(
+                data,
+                load_list_membership(links, aliases),
+                budget,
+                # Скидки, которые закончатся за время обхода, тоже обходятся первыми
+                horizon=timedelta(hours=args.hours),
+            )
+            data = [task.item for task in plan]
+
+        # При воспроизведении из снимков все игры разбираются заново
+        refresh = args.recrawl or args.backend == "replay"
+        stats = crawl_games(
+            data,
+            store,
+            workers=args.workers,
+            pool=pool,
+            refresh=refresh,
+            parsers=args.parsers,
+            queue_size=args.queue_size,
+            ids=ids,
+            # Игры из снимков датируются временем загрузки снимка, а не разбора
+            fetched_at=snapshots.fetched_at if args.backend == "replay" else None,
+        )
+        log.info(
+            f"Done: Добавлено {stats["added"]}, обновлено {stats["updated"]}, "
+            f"пропущено {stats["skipped"]}, ошибок {stats["errors"]}."
+        )
+
+# Сводка метрик обхода: где было потрачено время загрузки, разбора и записи
+for line in REGISTRY.summary():
+    log.info(f"Metrics: {line}")
+
+if snapshots is not None:
+    snapshots.close()
+store.close()
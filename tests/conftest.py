@@ -0,0 +1,38 @@
+from pathlib import Path
+from typing import Dict
+
+import sys
+
+import pytest
+
+
+ROOT = Path(__file__).resolve().parent.parent
+PAGES = Path(__file__).resolve().parent / "fixtures" / "pages"
+
+# Модули проекта лежат в корне репозитория, а не в пакете
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def read_pages(prefix: str = "") -> Dict[str, str]:
+    """Сохраненные страницы магазина из tests/fixtures/pages: имя файла -> HTML."""
+
+    return {
+        path.name: path.read_text(encoding="utf-8")
+        for path in sorted(PAGES.glob(f"{prefix}*.html"))
+    }
+
+
+# Страницы игр (продукты и концепции) и страницы каталога
+DETAIL_PAGES = {name: html for name, html in read_pages().items() if not name.startswith("browse")}
+BROWSE_PAGES = read_pages("browse")
+
+
+@pytest.fixture(params=sorted(DETAIL_PAGES))
+def detail_page(request) -> str:
+    return DETAIL_PAGES[request.param]
+
+
+@pytest.fixture(params=sorted(BROWSE_PAGES))
+def browse_page(request) -> str:
+    return BROWSE_PAGES[request.param]
@@ -0,0 +1,65 @@
+from threading import Thread
+
+from api.cache import STANDARD_VARIANTS, TILE_FIELDS, CachedFile, parse_fields
+
+import brotli
+import orjson
+import pytest
+import zlib
+
+
+LINKS = [
+    {"id": str(number), "name": f"Game {number}", "url": f"https://store/product/{number}", "image": "img"}
+    for number in range(2000)
+]
+
+
+@pytest.fixture
+def links_file(tmp_path):
+    path = tmp_path / "links.json"
+    path.write_bytes(orjson.dumps(LINKS))
+    return CachedFile(path)
+
+
+def test_parse_fields_normalizes_order():
+    assert parse_fields("name,id") == parse_fields("id, name,,id") == ("id", "name")
+    assert parse_fields("image,url,name,id") is None
+    assert parse_fields(None) is None
+
+
+def test_parse_fields_rejects_unknown():
+    with pytest.raises(ValueError):
+        parse_fields("id,name,x1")
+
+
+def test_standard_variants_built_on_load(links_file):
+    version = links_file.load()
+    assert set(version.standard) == set(STANDARD_VARIANTS)
+    assert not version.variants
+
+    tiles = links_file.variant(version, TILE_FIELDS, "json", "br")
+    assert orjson.loads(brotli.decompress(b"".join(tiles))) == [
+        {name: item[name] for name in TILE_FIELDS} for item in LINKS
+    ]
+    full = links_file.variant(version, None, "json", "gzip")
+    assert orjson.loads(zlib.decompress(b"".join(full), 31)) == LINKS
+    assert not version.variants
+
+
+def test_lazy_variant_built_once(links_file):
+    version = links_file.load()
+    results = []
+    threads = [
+        Thread(target=lambda: results.append(links_file.variant(version, ("id",), "ndjson", "gzip")))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(chunks is results[0] for chunks in results)
+    assert set(version.variants) == {(("id",), "ndjson", "identity"), (("id",), "ndjson", "gzip")}
+    assert not version.building
+    lines = zlib.decompress(b"".join(results[0]), 31).splitlines()
+    assert [orjson.loads(line) for line in lines] == [{"id": item["id"]} for item in LINKS]
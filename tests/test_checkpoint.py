@@ -0,0 +1,94 @@
+from game_links import checkpoint as checkpoint_module
+from game_links.checkpoint import PageCheckpoint
+
+import json
+import pytest
+
+
+HREF = "https://store.playstation.com/en-us/pages/browse/"
+
+
+def tiles(*ids):
+    return [{"id": game_id, "name": game_id, "url": f"https://store/product/{game_id}"} for game_id in ids]
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    return tmp_path / "all_game_links.json"
+
+
+def test_commit_merges_pages_in_order(data_path):
+    checkpoint = PageCheckpoint(data_path, HREF)
+    checkpoint.add(2, tiles("c", "b"))
+    checkpoint.add(1, tiles("a", "b"))
+    checkpoint.set_page_count(2)
+
+    assert checkpoint.commit() == 3
+    assert [tile["id"] for tile in json.loads(data_path.read_text())] == ["a", "b", "c"]
+    # Формат файла как у json.dump(..., indent=2)
+    assert data_path.read_text() == json.dumps(tiles("a", "b", "c"), indent=2)
+    assert not checkpoint.path.exists()
+    assert not data_path.with_name(data_path.name + ".tmp").exists()
+
+
+def test_resume_from_truncated_journal(data_path):
+    checkpoint = PageCheckpoint(data_path, HREF)
+    checkpoint.set_page_count(3)
+    checkpoint.add(1, tiles("a"))
+    checkpoint.add(2, tiles("b"))
+    checkpoint.close()
+    # Процесс упал посреди записи третьей страницы
+    with open(checkpoint.path, "ab") as file:
+        file.write(b'{"page": 3, "tiles": [{"id": "x"')
+
+    resumed = PageCheckpoint(data_path, HREF)
+    assert resumed.page_count == 3
+    assert sorted(resumed.pages) == [1, 2]
+    assert resumed.tile_count(2) == 1
+
+    resumed.add(3, tiles("c"))
+    assert resumed.commit() == 3
+    assert [tile["id"] for tile in json.loads(data_path.read_text())] == ["a", "b", "c"]
+
+
+@pytest.mark.parametrize(
+    "href, max_age",
+    [("https://store.playstation.com/en-us/category/deals/", 3600), (HREF, -1)],
+)
+def test_journal_of_other_crawl_is_not_resumed(data_path, href, max_age):
+    checkpoint = PageCheckpoint(data_path, HREF)
+    checkpoint.add(1, tiles("a"))
+    checkpoint.close()
+
+    fresh = PageCheckpoint(data_path, href, max_age=max_age)
+    assert not fresh.pages and fresh.page_count is None
+    fresh.add(1, tiles("b"))
+    fresh.commit()
+    assert [tile["id"] for tile in json.loads(data_path.read_text())] == ["b"]
+
+
+def test_failed_commit_keeps_old_file_and_journal(data_path, monkeypatch):
+    data_path.write_text("[]")
+    checkpoint = PageCheckpoint(data_path, HREF)
+    checkpoint.add(1, tiles("a"))
+
+    replaced = []
+
+    def failing_replace(source, target):
+        replaced.append((source, target))
+        raise OSError("disk full")
+
+    monkeypatch.setattr(checkpoint_module.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        checkpoint.commit()
+
+    assert replaced == [(data_path.with_name(data_path.name + ".tmp"), data_path)]
+    assert data_path.read_text() == "[]"
+    assert not data_path.with_name(data_path.name + ".tmp").exists()
+    assert checkpoint.path.exists()
+
+    # Следующий обход продолжает с журнала
+    monkeypatch.undo()
+    resumed = PageCheckpoint(data_path, HREF)
+    assert sorted(resumed.pages) == [1]
+    assert resumed.commit() == 1
@@ -0,0 +1,27 @@
+from pydantic import ValidationError
+
+from game_info import PSClient
+from game_info.game_model import Game, trusted_dump
+
+import pytest
+
+
+def without_date(game: dict) -> dict:
+    return {key: value for key, value in game.items() if key != "info_date"}
+
+
+def test_dump_matches_model_dump(detail_page):
+    fast = PSClient(html=detail_page).dump()
+    validated = PSClient(html=detail_page).dump(validate=True)
+
+    assert without_date(fast) == without_date(validated)
+    # Порядок полей и типы значений (float вместо int) тоже как у pydantic
+    assert list(fast) == list(validated)
+    assert repr(without_date(fast)) == repr(without_date(validated))
+
+
+def test_trusted_dump_falls_back_to_validation(detail_page):
+    game = PSClient(html=detail_page).dump(validate=True)
+    del game["title"]
+    with pytest.raises(ValidationError):
+        trusted_dump(Game, game)
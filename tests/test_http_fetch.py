@@ -0,0 +1,132 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from time import monotonic
+
+from fetch_utils import AdaptiveRateLimiter, FetchPool, HttpFetch
+from fetch_utils.rate_limit import BLOCKED
+from crawler.engine import crawl_games
+from game_store import GameStore
+
+from conftest import DETAIL_PAGES
+
+import pytest
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """
+    Отдает сохраненные страницы по ссылкам вида /en-us/product/<имя файла без .html>.
+    В режиме "429" отвечает 429 с Retry-After, в режиме "challenge" - страницей проверки.
+    """
+
+    mode = "ok"
+
+    def do_GET(self) -> None:
+        if self.mode == "429":
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        html = DETAIL_PAGES.get(self.path.rsplit("/", 1)[-1] + ".html")
+        if self.mode == "challenge":
+            html = "<html><body>Checking your browser</body></html>"
+        if html is None:
+            self.send_error(404)
+            return
+
+        body = html.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server():
+    PageHandler.mode = "ok"
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    thread = Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_port}/en-us"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def links(base: str, names):
+    return [{"id": name, "name": name, "url": f"{base}/product/{name}"} for name in names]
+
+
+def test_http_fetch_returns_page(server):
+    with HttpFetch() as fetch:
+        assert fetch.get(f"{server}/product/product0") == DETAIL_PAGES["product0.html"]
+        with pytest.raises(Exception):
+            fetch.get(f"{server}/product/missing")
+
+
+def test_crawl_games_over_http(server, tmp_path):
+    names = sorted(name.removesuffix(".html") for name in DETAIL_PAGES)
+    store = GameStore(tmp_path / "games.db")
+    try:
+        with FetchPool(HttpFetch, size=2) as pool:
+            stats = crawl_games(links(server, names + ["missing"]), store, workers=2, pool=pool)
+
+        assert stats == {"added": len(names), "updated": 0, "skipped": 0, "errors": 1}
+        assert store.ids() == set(names)
+        assert all(store.get(name)["title"] for name in names)
+    finally:
+        store.close()
+
+
+def timed_get(fetch: HttpFetch, url: str) -> float:
+    start = monotonic()
+    fetch.get(url)
+    return monotonic() - start
+
+
+@pytest.mark.parametrize("mode, pause", [("429", 1.0), ("challenge", 0.5)])
+def test_adaptive_limit_backs_off_and_recovers(server, mode, pause):
+    limiter = AdaptiveRateLimiter(rate=100.0, max_rate=400.0, cooldown=0.5, jitter=0.0)
+    url = f"{server}/product/product0"
+
+    with HttpFetch(rate_limit=limiter) as fetch:
+        for _ in range(5):
+            fetch.get(url)
+        rate, concurrency = limiter.rate, limiter.concurrency
+
+        PageHandler.mode = mode
+        try:
+            fetch.get(url)
+        except Exception:
+            assert mode == "429"
+        assert limiter.rate == pytest.approx(rate * limiter.backoff)
+        assert limiter.concurrency == pytest.approx(max(1.0, concurrency * limiter.backoff))
+
+        # Следующий запрос ждет Retry-After или cooldown
+        PageHandler.mode = "ok"
+        assert timed_get(fetch, url) >= pause - 0.05
+
+        reduced = limiter.rate
+        for _ in range(10):
+            fetch.get(url)
+        assert limiter.rate > reduced
+
+
+def test_blocked_response_extends_pause():
+    limiter = AdaptiveRateLimiter(rate=20.0, cooldown=0.1, jitter=0.0)
+    limiter.wait()
+    limiter.done(0.01, BLOCKED, 0.1)
+    # Вторая блокировка приходит в окне уменьшения, но ее Retry-After больше
+    limiter.wait()
+    limiter.done(0.01, BLOCKED, 0.6)
+
+    start = monotonic()
+    limiter.wait()
+    limiter.done(0.01)
+    assert monotonic() - start >= 0.55
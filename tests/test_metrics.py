@@ -0,0 +1,124 @@
+from conftest import DETAIL_PAGES
+from crawler.engine import parse_game
+from fetch_utils import BaseFetch, FetchPool, run_pipeline
+from game_info.script_index import JSON_DECODE_SECONDS
+from metrics import Registry
+
+import pytest
+
+
+class PageFetch(BaseFetch):
+    def get(self, url: str) -> str:
+        return url
+
+
+def test_quantile_interpolates_within_bucket():
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(1.0, 2.0, 4.0))
+    child = latency.children[()]
+    assert child.quantile(0.5) is None
+
+    for value in (0.5, 1.5, 1.5, 3.0):
+        latency.observe(value)
+
+    assert child.counts == [1, 2, 1, 0]
+    assert child.quantile(0.25) == pytest.approx(1.0)
+    assert child.quantile(0.5) == pytest.approx(1.5)
+    assert child.quantile(0.75) == pytest.approx(2.0)
+    assert child.quantile(1.0) == pytest.approx(4.0)
+
+
+def test_quantile_above_last_bucket():
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(1.0, 2.0))
+    latency.observe(10.0)
+    assert latency.children[()].quantile(0.99) == 2.0
+
+
+def test_drain_resets_and_merge_adds():
+    child = Registry()
+    pages = child.counter("pages_total", "Pages", ("status",))
+    queued = child.gauge("queued", "Queued")
+    latency = child.histogram("latency_seconds", "Latency", buckets=(1.0,))
+    pages.labels("ok").inc(3)
+    pages.labels("error").inc()
+    queued.set(5)
+    latency.observe(0.5)
+    latency.observe(2.0)
+
+    values = child.drain()
+    assert values == [
+        ("latency_seconds", (), ([1, 1], 2.5)),
+        ("pages_total", ("error",), 1.0),
+        ("pages_total", ("ok",), 3.0),
+    ]
+    # Значения обнулены, gauge описывает состояние процесса и не передается
+    assert child.drain() == []
+    assert queued.children[()].value == 5
+
+    parent = Registry()
+    parent.counter("pages_total", "Pages", ("status",)).labels("ok").inc()
+    parent_latency = parent.histogram("latency_seconds", "Latency", buckets=(1.0,))
+    parent.merge(values)
+    parent.merge(values + [("unknown_total", (), 1.0)])
+
+    assert parent.metrics["pages_total"].labels("ok").value == 7
+    assert parent.metrics["pages_total"].labels("error").value == 2
+    assert parent_latency.children[()].counts == [2, 2]
+    assert parent_latency.children[()].sum == 5.0
+    assert "unknown_total" not in parent.metrics
+
+
+@pytest.mark.parametrize("parsers", [0, 1])
+def test_parser_process_metrics_reach_parent(parsers):
+    pages = sorted(DETAIL_PAGES.values())
+    decoded = JSON_DECODE_SECONDS.children[()]
+    # Значение, которое процесс-парсер наследует при fork и не должен вернуть повторно
+    JSON_DECODE_SECONDS.observe(0.001)
+    start = decoded.count
+
+    written = {}
+    with FetchPool(PageFetch, size=2) as pool:
+        run_pipeline(
+            pool,
+            pages,
+            url=str,
+            parse=parse_game,
+            write=lambda item, result, error: written.__setitem__(item, error),
+            parsers=parsers,
+        )
+
+    assert list(written.values()) == [None] * len(pages)
+    # Каждая страница декодирует JSON нескольких script-тегов, и в процессе-парсере тоже
+    assert decoded.count - start >= 2 * len(pages)
+    if parsers:
+        expected = decoded.count - start
+        start = decoded.count
+        for html in pages:
+            parse_game(html)
+        assert decoded.count - start == expected
+
+
+def test_render_prometheus_text():
+    registry = Registry()
+    registry.counter("requests_total", "Requests", ("route",)).labels('say "hi"\n').inc(3)
+    registry.gauge("in_flight", "In flight").set(1.5)
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.25, 0.5, 2.0):
+        latency.observe(value)
+
+    assert registry.render() == "\n".join([
+        "# HELP in_flight In flight",
+        "# TYPE in_flight gauge",
+        "in_flight 1.5",
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 0',
+        'latency_seconds_bucket{le="1"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        "latency_seconds_sum 2.75",
+        "latency_seconds_count 3",
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        r'requests_total{route="say \"hi\"\n"} 3',
+    ]) + "\n"
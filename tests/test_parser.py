@@ -0,0 +1,74 @@
+from bs4 import BeautifulSoup
+
+from game_info import PSClient
+from game_info.script_index import JSON_DECODE_SECONDS, ScriptIndex
+from game_links import parse_game_tiles
+
+import pytest
+
+
+def parse_soup(html: str) -> dict:
+    return PSClient(BeautifulSoup(html, "html.parser")).data().model_dump(exclude={"info_date"})
+
+
+def parse_fast(html: str) -> dict:
+    return PSClient(html=html).data().model_dump(exclude={"info_date"})
+
+
+def test_fast_path_matches_soup(detail_page):
+    assert parse_fast(detail_page) == parse_soup(detail_page)
+
+
+def test_tiles_fast_matches_soup(browse_page):
+    tiles = parse_game_tiles(browse_page, engine="soup")
+    assert tiles
+    assert parse_game_tiles(browse_page, engine="fast") == tiles
+
+
+@pytest.mark.parametrize(
+    "div",
+    [
+        "<div class=don't data-mfe-name=x data-initial=s>",
+        "<div title='a > b' data-mfe-name=\"x\" data-initial='s'>",
+        "<div data-mfe-name = x data-initial = \"s\" hidden>",
+        "<DIV DATA-MFE-NAME=\"x\" DATA-INITIAL=\"s\">",
+        "<div data-mfe-name=\"w\" data-initial=\"s\" data-mfe-name=\"x\">",
+    ],
+)
+def test_script_index_attributes_match_soup(div):
+    html = f"<html><body>{div}</div><script id=\"s\">{{\"a\": 1}}</script></body></html>"
+    expected = ScriptIndex(BeautifulSoup(html, "html.parser")).get("x")
+    assert ScriptIndex.from_html(html).get("x") == expected == {"a": 1}
+
+
+def test_script_index_skips_comments():
+    html = (
+        "<html><body><!-- <div data-mfe-name=\"x\" data-initial=\"bogus\"></div> -->"
+        "<div data-mfe-name=\"x\" data-initial=\"s\"></div><script id=\"s\">{\"a\": 1}</script></body></html>"
+    )
+    assert ScriptIndex.from_html(html).get("x") == ScriptIndex(BeautifulSoup(html, "html.parser")).get("x")
+
+
+def decoded_count() -> int:
+    return JSON_DECODE_SECONDS.children[()].count
+
+
+def test_entity_matches_merged(detail_page):
+    merged = ScriptIndex.from_html(detail_page).merged
+    assert merged
+
+    index = ScriptIndex.from_html(detail_page)
+    for key, entity in merged.items():
+        assert index.entity(key) == entity
+    with pytest.raises(KeyError):
+        index.entity("Product:MISSING")
+
+
+def test_cache_miss_decodes_only_matching_scripts(detail_page):
+    index = ScriptIndex.from_html(detail_page)
+    start = decoded_count()
+
+    assert index.cache("gameTitle").get("Product:MISSING") is None
+    assert "Product:MISSING" not in index.cache("gameTitle")
+    # Декодирован только сам gameTitle: ни в одном другом теге ключа нет
+    assert decoded_count() - start == 1
@@ -0,0 +1,42 @@
+from fetch_utils import BaseFetch, FetchPool, run_pipeline
+
+import pytest
+
+
+class PageFetch(BaseFetch):
+    def get(self, url: str) -> str:
+        return url
+
+
+class BrokenFetch(BaseFetch):
+    def open(self) -> None:
+        raise ConnectionError("no browser")
+
+    def get(self, url: str) -> str:
+        raise AssertionError("not opened")
+
+
+def collect(pool: FetchPool, items, parsers: int = 0) -> dict:
+    written = {}
+
+    def write(item, result, error):
+        written[item] = (result, error)
+
+    run_pipeline(pool, items, url=str, parse=str.upper, write=write, fetchers=3, parsers=parsers)
+    return written
+
+
+@pytest.mark.parametrize("parsers", [0, 1])
+def test_pipeline_parses_every_item(parsers):
+    with FetchPool(PageFetch, size=3) as pool:
+        written = collect(pool, ["a", "b", "c", "d"], parsers)
+    assert written == {item: (item.upper(), None) for item in "abcd"}
+
+
+@pytest.mark.parametrize("parsers", [0, 1])
+def test_pipeline_reports_items_when_pool_fails(parsers):
+    with FetchPool(BrokenFetch, size=3) as pool:
+        written = collect(pool, range(10), parsers)
+
+    assert sorted(written) == list(range(10))
+    assert all(result is None and isinstance(error, ConnectionError) for result, error in written.values())
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from crawler import RecrawlScheduler
+from game_store import GameStore
+from game_store.prices import INFO_DATE_FORMAT
+
+import pytest
+
+
+NOW = datetime(2026, 1, 10, 12, 0)
+
+
+def game(crawled: datetime, end: datetime = None) -> dict:
+    info = {"endTime": str(int(end.timestamp() * 1000))} if end else {}
+    return {"info_date": crawled.strftime(INFO_DATE_FORMAT), "price": [{"info": info}]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = GameStore(tmp_path / "games.db")
+    yield store
+    store.close()
+
+
+def link(game_id: str) -> dict:
+    return {"id": game_id, "name": game_id, "url": f"https://store/product/{game_id}"}
+
+
+def test_discounts_ending_go_before_new_games(store):
+    store.upsert("ended", game(NOW - timedelta(days=1), NOW - timedelta(hours=2)))
+    store.upsert("ending", game(NOW - timedelta(days=1), NOW + timedelta(minutes=30)))
+    store.upsert("later", game(NOW - timedelta(days=1), NOW + timedelta(hours=5)))
+    links = [link(f"new{number}") for number in range(5)] + [link("later"), link("ending"), link("ended")]
+
+    plan = RecrawlScheduler(store).plan(links, {}, budget=3, now=NOW, horizon=timedelta(hours=1))
+
+    assert [(task.item["id"], task.reason) for task in plan] == [
+        ("ended", "discount_ended"),
+        ("ending", "discount_ending"),
+        ("new0", "new"),
+    ]
+
+
+def test_without_horizon_only_ended_discounts_go_first(store):
+    store.upsert("ending", game(NOW - timedelta(days=1), NOW + timedelta(minutes=30)))
+    plan = RecrawlScheduler(store, min_probability=0.0).plan([link("ending"), link("new")], {}, now=NOW)
+    assert [task.reason for task in plan] == ["new", "stale"]
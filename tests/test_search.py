@@ -0,0 +1,113 @@
+from game_store import GameStore, SearchIndex
+
+import pytest
+
+
+GAMES = {
+    "knight": {
+        "title": {"name": "Hollow Knight", "publisher": "Team Cherry"},
+        "info": {"genres": ["Action"], "description": [["", "Descend into a ruined kingdom."]]},
+    },
+    "kingdom": {
+        "title": {"name": "Kingdom Hearts", "publisher": "Square Enix"},
+        "info": {"genres": ["Role Playing Games"], "description": [["", "A hollow world of hearts."]]},
+    },
+    "racer": {
+        "title": {"name": "Gran Turismo 7", "publisher": "Sony"},
+        "info": {"genres": ["Driving/Racing"], "description": [["", "Real driving simulator."]]},
+    },
+}
+
+
+def names(results):
+    return [result["id"] for result in results]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = GameStore(tmp_path / "games.db")
+    SearchIndex(store)
+    for game_id, game in GAMES.items():
+        store.upsert(game_id, game)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def search(store):
+    return SearchIndex(store)
+
+
+def test_prefix_only_on_last_token(search):
+    assert names(search.query("hollow kni")) == ["knight", "kingdom"]
+    assert names(search.query("tur")) == ["racer"]
+    # Не последнее слово запроса ищется целиком
+    assert names(search.query("tur driving")) == ["racer"]
+    assert search.query("tur driving")[0]["score"] < search.query("turismo driving")[0]["score"]
+
+
+def test_fuzzy_single_edit(search):
+    assert names(search.query("knigth")) == ["knight"]
+    assert names(search.query("knigt")) == ["knight"]
+    assert names(search.query("turismp")) == ["racer"]
+    assert search.query("kxnigth") == []
+    assert names(search.query("soyn")) == ["racer"]
+    # Слова короче FUZZY_MIN_LENGTH опечаток не допускают
+    assert search.query("sny") == []
+
+
+def test_ranking_by_matched_terms(search):
+    # kingdom содержит оба слова (hollow в описании), knight - только hollow, зато в названии
+    assert names(search.query("hollow hearts"))[0] == "kingdom"
+    assert names(search.query("hollow")) == ["knight", "kingdom"]
+
+
+def test_refresh_after_upsert(store, search):
+    assert search.query("silksong") == []
+    store.upsert("silk", {"title": {"name": "Hollow Knight Silksong"}})
+    assert names(search.query("silksong")) == ["silk"]
+
+    # Изменение названия убирает старые термины
+    store.upsert("silk", {"title": {"name": "Silksong"}})
+    assert "silk" not in names(search.query("hollow"))
+
+
+def test_refresh_after_write_by_other_connection(store, search, tmp_path):
+    assert search.query("stray") == []
+    other = GameStore(tmp_path / "games.db")
+    SearchIndex(other)
+    other.upsert("cat", {"title": {"name": "Stray"}})
+    other.close()
+    assert names(search.query("stray")) == ["cat"]
+
+
+def test_index_persists_across_stores(store, tmp_path):
+    store.close()
+    reopened = GameStore(tmp_path / "games.db")
+    try:
+        search = SearchIndex(reopened)
+        assert len(search) == len(GAMES)
+        assert names(search.query("hollow kni")) == ["knight", "kingdom"]
+    finally:
+        reopened.close()
+
+
+def test_updates_match_fresh_index(store, search):
+    queries = ["hollow", "kingdom", "hearts", "driving", "knight", "sony", "gran turismo"]
+    search.query("hollow")
+
+    # Первая игра удаляется из середины списков, на ее место переносятся последние
+    store.upsert("knight", {"title": {"name": "Hollow Knight"}, "info": {"genres": ["Driving/Racing"]}})
+    store.upsert("extra", {"title": {"name": "Kingdom Knight", "publisher": "Sony"}})
+    store.upsert("racer", GAMES["racer"])
+    for query in queries:
+        search.query(query)
+
+    fresh = SearchIndex(store)
+    for query in queries:
+        assert search.query(query) == fresh.query(query)
+
+    for term, (numbers, weights, slots) in search.postings.items():
+        for position, (number, slot) in enumerate(zip(numbers, slots)):
+            assert search.doc_terms[number][slot] == term
+            assert search.doc_positions[number][slot] == position